@@ -23,7 +23,7 @@ def main():
     # Configuration de la page
     setup_page_config()
     
-    # Chargement des données
+    # Chargement des données (lignes ajoutées intégrées incrémentalement)
     df = load_data()
     df = validate_data(df)
     
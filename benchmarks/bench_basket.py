@@ -0,0 +1,49 @@
+"""
+Benchmark de l'analyse de panier (incidence CSR et co-occurrences par blocs).
+
+Le dataset est répliqué (commandes distinctes par copie) ; --catalogues
+multiplie le nombre de produits distincts pour exercer le chemin creux :
+
+    python -m benchmarks.bench_basket --rows 5000000 --catalogues 100
+"""
+import argparse
+import time
+import pandas as pd
+from config import get_data_path
+from utils.basket import association_rules, build_incidence, cooccurrences
+from benchmarks.bench_group_kernels import replicate
+
+def reference_cooccurrences(commandes, articles):
+    """Co-occurrences par auto-jointure pandas (référence, petits volumes)"""
+    paires = pd.DataFrame({'c': commandes, 'a': articles}).drop_duplicates()
+    jointure = paires.merge(paires, on='c')
+    jointure = jointure[jointure['a_x'] < jointure['a_y']]
+    return jointure.groupby(['a_x', 'a_y']).size()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--catalogues', type=int, default=1)
+    args = parser.parse_args()
+
+    source = pd.read_csv(get_data_path())
+    attendu = reference_cooccurrences(source['Numéro_Commande'], source['Code_Produit'])
+    indptr, indices, uniques, _ = build_incidence(source['Numéro_Commande'], source['Code_Produit'])
+    i, j, comptes = cooccurrences(indptr, indices, len(uniques))
+    obtenu = pd.Series(comptes, index=pd.MultiIndex.from_arrays([uniques.take(i), uniques.take(j)])).sort_index()
+    pd.testing.assert_series_equal(obtenu, attendu, check_names=False, check_index_type=False)
+    print("co-occurrences identiques à l'auto-jointure pandas")
+
+    df = replicate(source, args.rows)
+    produits = df['Code_Produit']
+    if args.catalogues > 1:
+        catalogue = (df['Numéro_Commande'] // 100000) % args.catalogues
+        produits = produits + '_' + catalogue.astype(str)
+    print(f"{len(df):,} lignes, {df['Numéro_Commande'].nunique():,} commandes, {produits.nunique():,} produits")
+
+    debut = time.perf_counter()
+    regles, _ = association_rules(df['Numéro_Commande'], produits)
+    print(f"règles d'association : {time.perf_counter() - debut:.2f}s ({len(regles):,} règles)")
+
+if __name__ == "__main__":
+    main()
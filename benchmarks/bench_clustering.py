@@ -0,0 +1,42 @@
+"""
+Benchmark du clustering k-means mini-batch sur des clients synthétiques.
+
+Mesure l'ajustement d'un modèle et la recherche complète du nombre de groupes
+(silhouette échantillonnée) pour un nombre de clients donné :
+
+    python -m benchmarks.bench_clustering --customers 300000
+"""
+import argparse
+import time
+import numpy as np
+from utils.clustering import minibatch_kmeans, fit_customer_clusters, silhouette_score
+
+def synthetic_customers(n_clients, n_features, n_groupes, seed=0):
+    """Clients synthétiques tirés autour de n_groupes profils"""
+    rng = np.random.default_rng(seed)
+    profils = rng.normal(0, 3, size=(n_groupes, n_features))
+    groupes = rng.integers(n_groupes, size=n_clients)
+    return profils[groupes] + rng.normal(size=(n_clients, n_features)), groupes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=300_000)
+    parser.add_argument('--features', type=int, default=11)  # 4 indicateurs + 7 gammes
+    parser.add_argument('--groups', type=int, default=5)
+    args = parser.parse_args()
+
+    X, _ = synthetic_customers(args.customers, args.features, args.groups)
+    print(f"{len(X):,} clients, {X.shape[1]} caractéristiques")
+
+    debut = time.perf_counter()
+    _, labels, _ = minibatch_kmeans(X, args.groups)
+    print(f"k-means mini-batch (k={args.groups}) : {time.perf_counter() - debut:.2f}s, "
+          f"silhouette {silhouette_score(X, labels):.3f}")
+
+    debut = time.perf_counter()
+    resultat = fit_customer_clusters(X)
+    print(f"recherche de k ({len(resultat['modeles'])} modèles) : {time.perf_counter() - debut:.2f}s, "
+          f"k retenu = {resultat['k']}")
+
+if __name__ == "__main__":
+    main()
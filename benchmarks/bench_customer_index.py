@@ -0,0 +1,63 @@
+"""
+Benchmark de la fiche client : lignes d'un client résolues par l'index
+client -> plage (positions triées par client) comparées à un filtre
+booléen sur tout le dataset, et intégration d'un ajout de lignes par
+fusion comparée à une reconstruction complète :
+
+    python -m benchmarks.bench_customer_index --rows 5000000 --customers 50000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.customer_index import build_customer_layout, merge_customer_layouts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--append', type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    noms = np.array([f"Client {i:06d}" for i in range(args.customers)], dtype=object)
+    df = pd.DataFrame({
+        'Nom_du_Client': noms[rng.integers(args.customers, size=args.rows)],
+        'Date_Commande': pd.Timestamp('2003-01-01') + pd.to_timedelta(rng.integers(0, 900, size=args.rows), unit='D'),
+        'Numéro_Commande': rng.integers(10000, 10000 + args.rows // 10, size=args.rows),
+        'Numéro_Ligne_Commande': rng.integers(1, 18, size=args.rows),
+        "Chiffre d'Affaires": rng.lognormal(8, 0.5, size=args.rows)
+    })
+
+    debut = time.perf_counter()
+    disposition = build_customer_layout(df)
+    duree_construction = time.perf_counter() - debut
+
+    cibles = noms[rng.integers(args.customers, size=args.lookups)]
+    debut = time.perf_counter()
+    for nom in cibles:
+        d, f = disposition['plages'][nom]
+        df.take(disposition['positions'][d:f])
+    duree_index = (time.perf_counter() - debut) / args.lookups
+
+    debut = time.perf_counter()
+    for nom in cibles[:10]:
+        df[df['Nom_du_Client'] == nom]
+    duree_filtre = (time.perf_counter() - debut) / 10
+
+    # Ajout de lignes : fusion des deux dispositions triées vs reconstruction
+    base, ajout = df.iloc[:-args.append], df.iloc[-args.append:]
+    disposition_base = build_customer_layout(base)
+    debut = time.perf_counter()
+    fusion = merge_customer_layouts(disposition_base, build_customer_layout(ajout))
+    duree_fusion = time.perf_counter() - debut
+    assert np.array_equal(fusion['positions'], disposition['positions'])
+
+    print(f"{args.rows} lignes, {args.customers} clients : index construit en {duree_construction:.2f}s")
+    print(f"ajout de {args.append} lignes : fusion {duree_fusion:.2f}s, reconstruction {duree_construction:.2f}s")
+    print(f"lignes d'un client : index {duree_index * 1e6:.0f} µs, filtre booléen {duree_filtre * 1000:.1f} ms "
+          f"(x{duree_filtre / duree_index:.0f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark des prévisions Holt-Winters par lot sur des séries mensuelles
+synthétiques (tendance, saisonnalité annuelle et bruit) :
+
+    python -m benchmarks.bench_forecasting --series 500 --months 36
+"""
+import argparse
+import time
+import numpy as np
+from utils.forecasting import holt_winters_batch
+
+def synthetic_series(n_series, n_mois, seed=0):
+    """Séries mensuelles positives avec tendance et saisonnalité propres"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_mois)
+    niveaux = rng.uniform(50, 500, size=(n_series, 1))
+    tendances = rng.normal(0, 2, size=(n_series, 1))
+    amplitudes = rng.uniform(0, 0.5, size=(n_series, 1)) * niveaux
+    saisons = amplitudes * np.sin(2 * np.pi * (t[None, :] + rng.integers(12, size=(n_series, 1))) / 12)
+    bruit = rng.normal(0, 0.05, size=(n_series, n_mois)) * niveaux
+    return np.maximum(niveaux + tendances * t + saisons + bruit, 0)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--series', type=int, default=500)
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--horizon', type=int, default=12)
+    args = parser.parse_args()
+
+    Y = synthetic_series(args.series, args.months + args.horizon)
+    historique, futur = Y[:, :args.months], Y[:, args.months:]
+
+    debut = time.perf_counter()
+    resultat = holt_winters_batch(historique, args.horizon)
+    duree = time.perf_counter() - debut
+
+    couverture = np.mean((futur >= resultat['bas']) & (futur <= resultat['haut']))
+    erreur = np.abs(resultat['previsions'] - futur).sum() / futur.sum()  # WAPE
+    print(f"{args.series} séries x {args.months} mois : {duree:.3f}s")
+    print(f"erreur absolue pondérée (WAPE) {erreur:.1%}, couverture de l'intervalle à 95 % : {couverture:.1%}")
+
+if __name__ == "__main__":
+    main()
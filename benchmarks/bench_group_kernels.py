@@ -0,0 +1,80 @@
+"""
+Benchmark des noyaux d'agrégation bincount contre groupby pandas.
+
+Les agrégations mesurées sont celles des onglets (clients, pays, villes,
+gammes, périodes), sur un sous-ensemble filtré comme dans l'application :
+noyaux avec factorisation à la volée, puis avec les codes du dataset
+(maintenus par l'ingestion). Le dataset est répliqué pour atteindre la
+taille voulue :
+
+    python -m benchmarks.bench_group_kernels --rows 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from config import get_data_path
+from utils.kernels import build_column_codes, kernel_aggregate
+
+AGREGATIONS_ONGLETS = [
+    ('Nom_du_Client', {"Chiffre d'Affaires": 'sum', 'Numéro_Commande': 'nunique', 'Pays': 'first'}),
+    ('Pays', {"Chiffre d'Affaires": 'sum', 'Numéro_Commande': 'nunique', 'Nom_du_Client': 'nunique', 'Quantité_Commandée': 'sum'}),
+    (['Ville', 'Pays'], {"Chiffre d'Affaires": 'sum', 'Numéro_Commande': 'nunique', 'Nom_du_Client': 'nunique'}),
+    ('Code_Produit', {'Quantité_Commandée': 'sum', 'Gamme_de_Produits': 'first', 'Prix Conseil': 'first'}),
+    (['Année', 'Trimestre_ID', 'Gamme_de_Produits'], {"Chiffre d'Affaires": 'sum', 'Numéro_Commande': 'nunique', 'Quantité_Commandée': 'sum'}),
+    (['Code_Produit', 'Gamme_de_Produits'], {'Prix_Unitaire': 'std', 'Prix Conseil': 'first'}),
+    ('Statut', {'Numéro_Commande': 'nunique', "Chiffre d'Affaires": 'sum'}),
+]
+
+def replicate(df, n_rows):
+    """Réplique le dataset (numéros de commande décalés pour rester distincts)"""
+    repetitions = int(np.ceil(n_rows / len(df)))
+    blocs = []
+    for i in range(repetitions):
+        bloc = df.copy()
+        bloc['Numéro_Commande'] = bloc['Numéro_Commande'] + i * 100000
+        blocs.append(bloc)
+    return pd.concat(blocs, ignore_index=True).iloc[:n_rows]
+
+def best_time(fonction, repetitions):
+    """Meilleur temps d'exécution sur plusieurs répétitions"""
+    temps = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        temps.append(time.perf_counter() - debut)
+    return min(temps)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    dataset = replicate(pd.read_csv(get_data_path()), args.rows)
+    codes = build_column_codes(dataset)
+    # Filtre type barre latérale : positions des lignes retenues dans le dataset
+    masque = dataset['Année'].isin([2003, 2004]).to_numpy()
+    df, positions = dataset[masque], np.flatnonzero(masque)
+    print(f"{len(df):,} lignes filtrées sur {len(dataset):,}")
+    print(f"{'Regroupement':<45} {'pandas':>10} {'noyaux':>10} {'codes':>10} {'gain':>7}")
+
+    totaux = np.zeros(3)
+    for by, aggs in AGREGATIONS_ONGLETS:
+        attendu = df.groupby(by).agg(aggs)
+        for dictionnaire, positions_codes in ((None, None), (codes, positions)):
+            obtenu = kernel_aggregate(df, by, aggs, dictionnaire, positions_codes)
+            pd.testing.assert_frame_equal(obtenu, attendu, check_dtype=False, rtol=1e-9)
+
+        temps = np.array([
+            best_time(lambda: df.groupby(by).agg(aggs), args.repeat),
+            best_time(lambda: kernel_aggregate(df, by, aggs), args.repeat),
+            best_time(lambda: kernel_aggregate(df, by, aggs, codes, positions), args.repeat)
+        ])
+        totaux += temps
+        print(f"{str(by):<45} " + " ".join(f"{t * 1000:>8.1f}ms" for t in temps) + f" {temps[0] / temps[2]:>6.1f}x")
+
+    print(f"{'TOTAL':<45} " + " ".join(f"{t * 1000:>8.1f}ms" for t in totaux) + f" {totaux[0] / totaux[2]:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
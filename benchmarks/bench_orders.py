@@ -0,0 +1,63 @@
+"""
+Benchmark de la table des commandes : intégration d'un ajout de lignes
+(dernières commandes par date) par fusion comparée à une reconstruction
+complète, avec vérification que les deux tables sont identiques :
+
+    python -m benchmarks.bench_orders --rows 2000000 --append 50000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.customers import build_order_table, merge_order_tables
+
+GAMMES = ['Classic Cars', 'Motorcycles', 'Planes', 'Ships', 'Trains', 'Trucks and Buses', 'Vintage Cars']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--append', type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Numéros de commande croissants avec la date, comme dans le dataset
+    commandes = np.sort(rng.integers(10000, 10000 + args.rows // 10, size=args.rows))
+    dates = pd.Timestamp('2003-01-01') + pd.to_timedelta((commandes - 10000) * 900 // (args.rows // 10), unit='D')
+    df = pd.DataFrame({
+        'Numéro_Commande': commandes,
+        'Nom_du_Client': (commandes % 5000).astype(str),
+        'Pays': (commandes % 19).astype(str),
+        'Année': dates.year,
+        'Date_Commande': dates,
+        'Statut': 'Shipped',
+        'Taille de Transaction': rng.choice(['Small', 'Medium', 'Large'], size=args.rows),
+        'Gamme_de_Produits': np.array(GAMMES)[rng.integers(len(GAMMES), size=args.rows)],
+        'Quantité_Commandée': rng.integers(1, 100, size=args.rows),
+        'Numéro_Ligne_Commande': rng.integers(1, 18, size=args.rows),
+        "Chiffre d'Affaires": rng.lognormal(8, 0.5, size=args.rows)
+    })
+
+    debut = time.perf_counter()
+    reference = build_order_table(df)
+    duree_construction = time.perf_counter() - debut
+
+    # Ajout des dernières lignes, puis ajout limité à une gamme (colonnes
+    # absentes du bloc ajouté pour les autres gammes)
+    scenarios = {
+        'dernières lignes': df.index[-args.append:],
+        'une seule gamme': df.index[-args.append:][df['Gamme_de_Produits'].iloc[-args.append:] == GAMMES[0]]
+    }
+    for libelle, ajout in scenarios.items():
+        base = df.drop(ajout)
+        table = build_order_table(base)
+        debut = time.perf_counter()
+        fusion = merge_order_tables(table, build_order_table(df.loc[ajout]))
+        duree_fusion = time.perf_counter() - debut
+        attendu = reference if libelle == 'dernières lignes' else build_order_table(pd.concat([base, df.loc[ajout]]))
+        for nom, partie in attendu.items():
+            pd.testing.assert_frame_equal(fusion[nom], partie)
+        print(f"ajout ({libelle}, {len(ajout)} lignes) : fusion {duree_fusion:.2f}s, "
+              f"reconstruction {duree_construction:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark de l'agrégation map-reduce multi-cœur.
+
+Construit à froid le cube et les agrégats des onglets sur un dataset répliqué,
+pour plusieurs nombres de processus, et vérifie le résultat contre pandas
+(comptages distincts exacts, et erreur relative des sketches HyperLogLog) :
+
+    python -m benchmarks.bench_parallel --rows 50000000 --workers 1 2 4 8
+"""
+import argparse
+import pandas as pd
+from config import get_data_path
+from utils.cube import CUBE_DIMENSIONS, CUBE_MESURES
+from utils.kernels import kernel_aggregate
+from utils.parallel import parallel_aggregate
+from utils.partitions import build_partition_index, sort_by_partitions
+from benchmarks.bench_group_kernels import AGREGATIONS_ONGLETS, best_time, replicate
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    df = sort_by_partitions(replicate(pd.read_csv(get_data_path()), args.rows))
+    bornes = build_partition_index(df)['bornes']
+    agregations = [(CUBE_DIMENSIONS, CUBE_MESURES)] + AGREGATIONS_ONGLETS
+    print(f"{len(df):,} lignes, {len(agregations)} agrégats")
+
+    for by, aggs in agregations:
+        attendu = df.groupby(by).agg(aggs)
+        obtenu = parallel_aggregate(df, by, aggs, n_workers=max(args.workers), bornes=bornes)
+        pd.testing.assert_frame_equal(obtenu, attendu, check_dtype=False, rtol=1e-9)
+        distincts = [c for c, f in aggs.items() if f == 'nunique']
+        if distincts:
+            approche = parallel_aggregate(df, by, aggs, n_workers=max(args.workers), distinct='sketch', bornes=bornes)
+            erreurs = (approche[distincts] / attendu[distincts] - 1).abs().to_numpy()
+            print(f"  {str(by):<45} erreur HLL moyenne {erreurs.mean():.2%}, max {erreurs.max():.2%}")
+
+    def tout_calculer(n_workers):
+        for by, aggs in agregations:
+            if n_workers == 1:
+                kernel_aggregate(df, by, aggs)
+            else:
+                parallel_aggregate(df, by, aggs, n_workers=n_workers, bornes=bornes)
+
+    print(f"{'Processus':>10} {'temps':>10} {'accélération':>13}")
+    reference = None
+    for n_workers in args.workers:
+        tout_calculer(n_workers)  # démarrage du pool hors mesure
+        temps = best_time(lambda: tout_calculer(n_workers), args.repeat)
+        reference = reference or temps
+        print(f"{n_workers:>10} {temps:>9.2f}s {reference / temps:>12.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark des sketches de quantiles : construction par cellule, requête sur
+une union de cellules et erreur de rang mesurée, comparées au tri complet
+des valeurs sélectionnées :
+
+    python -m benchmarks.bench_quantiles --rows 5000000 --cells 2000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.quantiles import build_sketch_table, weighted_quantiles, rank_error_bound, PROBABILITES
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--cells', type=int, default=2000)
+    parser.add_argument('--selected', type=float, default=0.5, help="part des cellules sélectionnées")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cellules = pd.DataFrame({'Cellule': rng.integers(args.cells, size=args.rows)})
+    valeurs = rng.lognormal(8, 1, size=args.rows)
+
+    debut = time.perf_counter()
+    table = build_sketch_table(cellules, valeurs)
+    duree_construction = time.perf_counter() - debut
+
+    selection = rng.choice(args.cells, int(args.cells * args.selected), replace=False)
+    debut = time.perf_counter()
+    elements = table[table['Cellule'].isin(selection)]
+    niveaux = elements['niveau'].to_numpy(dtype=np.int64)
+    estimes = weighted_quantiles(elements['valeur'].to_numpy(), np.ldexp(1.0, niveaux), PROBABILITES)
+    duree_sketch = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    selectionnees = np.sort(valeurs[cellules['Cellule'].isin(selection).to_numpy()])
+    exacts = np.quantile(selectionnees, PROBABILITES, method='inverted_cdf')
+    duree_tri = time.perf_counter() - debut
+
+    rangs = np.searchsorted(selectionnees, estimes, side='right') / len(selectionnees)
+    print(f"{args.rows} lignes, {args.cells} cellules : sketches construits en {duree_construction:.2f}s "
+          f"({len(table)} éléments conservés)")
+    print(f"requête sur {len(selection)} cellules : sketches {duree_sketch * 1000:.1f} ms, tri complet {duree_tri * 1000:.1f} ms")
+    for p, estime, exact, rang in zip(PROBABILITES, estimes, exacts, rangs):
+        print(f"  P{round(p * 100)} : {estime:,.1f} (exact {exact:,.1f}), erreur de rang {abs(rang - p):.3%}")
+    print(f"borne d'erreur de rang : {rank_error_bound(niveaux):.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark des métriques glissantes (cumuls, moyennes mobiles, variations N-1)
+sur une matrice de séries mensuelles, comparées à pandas rolling fenêtre par
+fenêtre :
+
+    python -m benchmarks.bench_rolling --series 10000 --months 60
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.rolling import rolling_metrics, FENETRES_GLISSANTES
+
+def pandas_reference(series, fenetres):
+    """Cumuls glissants et variations N-1 avec pandas, une passe par fenêtre"""
+    resultats = {}
+    transposee = series.T
+    for w in fenetres:
+        cumuls = transposee.rolling(w).sum()
+        n1 = cumuls.shift(12)
+        resultats[w] = (cumuls.T, ((cumuls - n1) / n1 * 100).T)
+    return resultats
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--series', type=int, default=10000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    mois = pd.period_range('2000-01', periods=args.months, freq='M')
+    series = pd.DataFrame(rng.uniform(1, 1000, size=(args.series, args.months)), columns=mois)
+
+    def mesure(fonction):
+        durees = []
+        for _ in range(args.repeat):
+            debut = time.perf_counter()
+            resultat = fonction()
+            durees.append(time.perf_counter() - debut)
+        return min(durees), resultat
+
+    t_pandas, reference = mesure(lambda: pandas_reference(series, FENETRES_GLISSANTES))
+    t_moteur, resultat = mesure(lambda: rolling_metrics(series, FENETRES_GLISSANTES))
+
+    for w in FENETRES_GLISSANTES:
+        cumuls, variations = reference[w]
+        assert np.allclose(resultat['cumuls'][w].to_numpy(), cumuls.to_numpy(), equal_nan=True)
+        assert np.allclose(resultat['variations_n1'][w].to_numpy(), variations.to_numpy(), equal_nan=True)
+
+    print(f"{args.series} séries x {args.months} mois, fenêtres {FENETRES_GLISSANTES}")
+    print(f"pandas rolling : {t_pandas:.3f}s")
+    print(f"sommes cumulées : {t_moteur:.3f}s ({t_pandas / t_moteur:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark de la recherche par index inversé : construction sur des centaines
+de milliers d'entités synthétiques puis requêtes par préfixes, comparées au
+filtre par sous-chaîne sur tous les libellés :
+
+    python -m benchmarks.bench_search --entities 300000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.search import build_inverted_index, search, normalize
+
+SYLLABES = ['ma', 'ri', 'to', 'ka', 'lo', 'ne', 'su', 'da', 'vi', 'po', 'ge', 'ru']
+SUFFIXES = ['Gifts', 'Collectables', 'Models', 'Co.', 'Ltd', 'Imports', 'Store', 'Replicas']
+
+def _words(rng, n, syllabes=3):
+    """Mots synthétiques formés de syllabes"""
+    return pd.Series([''.join(s) for s in rng.choice(SYLLABES, size=(n, syllabes))]).str.capitalize()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entities', type=int, default=300_000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.entities
+    libelles = _words(rng, n) + ' ' + _words(rng, n, 2) + ' ' + pd.Series(rng.choice(SUFFIXES, n))
+    entites = pd.DataFrame({
+        'Type': 'Client',
+        'Libelle': libelles,
+        'Nb_Lignes': rng.integers(1, 500, n)
+    })
+
+    debut = time.perf_counter()
+    index = build_inverted_index(entites)
+    duree_construction = time.perf_counter() - debut
+
+    requetes = [' '.join(m[:k] for m, k in zip(libelle.split()[:2], rng.integers(2, 6, 2)))
+                for libelle in libelles.sample(args.queries, random_state=0)]
+    debut = time.perf_counter()
+    nb_resultats = [len(search(index, requete)) for requete in requetes]
+    duree_index = (time.perf_counter() - debut) / args.queries
+
+    normalises = normalize(libelles)
+    debut = time.perf_counter()
+    for requete in requetes[:10]:
+        masque = np.ones(n, dtype=bool)
+        for terme in requete.lower().split():
+            masque &= normalises.str.contains(terme, regex=False).to_numpy()
+    duree_balayage = (time.perf_counter() - debut) / 10
+
+    print(f"{n} entités, {len(index['vocabulaire'])} tokens : index construit en {duree_construction:.2f}s")
+    print(f"requête : index {duree_index * 1000:.2f} ms ({np.mean(nb_resultats):.1f} résultats affichés en moyenne), "
+          f"balayage par sous-chaîne {duree_balayage * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -191,15 +191,8 @@ def create_product_comparison(df_filtered, metric='quantité'):
     
     return fig
 
-def create_price_variability_chart(df_filtered, top_n=15):
-    """Crée un graphique de variabilité des prix"""
-    prix_par_produit = df_filtered.groupby(['Code_Produit', 'Gamme_de_Produits']).agg({
-        'Prix_Unitaire': ['mean', 'std', 'min', 'max', 'count'],
-        'Prix Conseil': 'first'
-    }).round(2)
-    
-    prix_par_produit.columns = ['Prix_Moyen', 'Ecart_Type', 'Prix_Min', 'Prix_Max', 'Nb_Ventes', 'Prix_Conseil']
-    
+def create_price_variability_chart(prix_par_produit, top_n=15):
+    """Crée un graphique de variabilité des prix (statistiques par produit de utils.moments)"""
     fig = px.bar(
         prix_par_produit.nlargest(top_n, 'Ecart_Type').reset_index(),
         x='Code_Produit',
@@ -274,4 +267,38 @@ def create_behavior_charts(df_filtered, chart_type='ca'):
         )
         fig.update_layout(height=400)
     
-    return fig
\ No newline at end of file
+    return fig
+
+def create_lorenz_chart(courbe, titre, libelle_elements):
+    """Crée une courbe de Lorenz avec la diagonale d'égalité parfaite"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=courbe['Part_Elements'], y=courbe['Part_Montant'],
+        mode='lines', fill='tonexty', name='Courbe de Lorenz'
+    ))
+    fig.add_trace(go.Scatter(
+        x=[0, 100], y=[0, 100], mode='lines', name='Égalité parfaite',
+        line=dict(dash='dash', color='grey')
+    ))
+    fig.update_layout(
+        title=titre,
+        xaxis_title=f"Part cumulée des {libelle_elements} (%)",
+        yaxis_title="Part cumulée du CA (%)",
+        height=400
+    )
+    return fig
+
+def create_correlation_heatmap(matrice, titre, libelle_valeur='Corrélation', bornee=True):
+    """Crée une heatmap annotée d'une matrice centrée sur 0 (bornée à [-1, 1] pour des corrélations)"""
+    bornes = dict(zmin=-1, zmax=1) if bornee else dict(color_continuous_midpoint=0)
+    fig = px.imshow(
+        matrice,
+        text_auto='.2f',
+        aspect="auto",
+        color_continuous_scale='RdBu_r',
+        title=titre,
+        labels=dict(color=libelle_valeur),
+        **bornes
+    )
+    fig.update_layout(height=max(400, 28 * len(matrice)))
+    return fig
@@ -154,38 +154,21 @@ def render_product_kpis(performance_gammes):
         )
 
 def render_behavior_kpis(taille_transactions):
-    """Affiche les KPIs de comportement d'achat"""
-    ca_medium = taille_transactions[taille_transactions['Taille de Transaction'] == 'Medium']['Chiffre d\'Affaires'].sum()
-    ca_small = taille_transactions[taille_transactions['Taille de Transaction'] == 'Small']['Chiffre d\'Affaires'].sum()
-    ca_large = taille_transactions[taille_transactions['Taille de Transaction'] == 'Large']['Chiffre d\'Affaires'].sum()
+    """Affiche les KPIs de comportement d'achat (CA et part du total de chaque tranche)"""
     total_ca_comportement = taille_transactions['Chiffre d\'Affaires'].sum()
     
-    pourcentage_medium = (ca_medium / total_ca_comportement * 100) if total_ca_comportement > 0 else 0
-    pourcentage_small = (ca_small / total_ca_comportement * 100) if total_ca_comportement > 0 else 0
-    pourcentage_large = (ca_large / total_ca_comportement * 100) if total_ca_comportement > 0 else 0
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.metric(
-            "💰 CA - Transactions Medium",
-            f"{ca_medium:,.0f} €",
-            f"{pourcentage_medium:.1f}% du total"
-        )
-    
-    with col2:
-        st.metric(
-            "💰 CA - Transactions Small", 
-            f"{ca_small:,.0f} €",
-            f"{pourcentage_small:.1f}% du total"
-        )
-    
-    with col3:
-        st.metric(
-            "💰 CA - Transactions Large",
-            f"{ca_large:,.0f} €", 
-            f"{pourcentage_large:.1f}% du total"
-        )
+    # Au plus 5 tranches par rangée
+    for debut in range(0, len(taille_transactions), 5):
+        bloc = taille_transactions.iloc[debut:debut + 5]
+        for colonne, (_, tranche) in zip(st.columns(len(bloc)), bloc.iterrows()):
+            ca_tranche = tranche['Chiffre d\'Affaires']
+            pourcentage = (ca_tranche / total_ca_comportement * 100) if total_ca_comportement > 0 else 0
+            with colonne:
+                st.metric(
+                    f"💰 CA - Transactions {tranche['Taille de Transaction']}",
+                    f"{ca_tranche:,.0f} €",
+                    f"{pourcentage:.1f}% du total"
+                )
 
 def render_operational_status_kpis(statuts_commandes):
     """Affiche les KPIs de statut opérationnel"""
@@ -1,5 +1,10 @@
 import streamlit as st
 import pandas as pd
+from utils.search import search_options
+
+ICONES_RECHERCHE = {
+    'Client': '👤', 'Pays': '🌍', 'Ville': '🏙️', 'Code postal': '📮', 'Adresse': '📍', 'Produit': '🏷️'
+}
 
 def _update_filter(filter_name, filter_value):
     """Met à jour le filtre dans la session_state"""
@@ -17,6 +22,9 @@ def create_sidebar(df):
     st.sidebar.markdown(f"- **Gammes:** {len(df['Gamme_de_Produits'].unique())}")
     st.sidebar.markdown("---")
     
+    # Recherche (clients, villes, produits, adresses)
+    _create_search_section()
+    
     # Filtres
     selected_years = _create_year_filters(df)
     selected_countries = _create_country_filters(df)
@@ -28,6 +36,40 @@ def create_sidebar(df):
     # Indicateurs de filtres actifs
     _create_active_filters_indicator(df)
 
+def _search_label(entite):
+    """Libellé d'un résultat de recherche (icône, libellé, détail)"""
+    detail = f" · {entite['Detail']}" if entite['Detail'] else ""
+    return f"{ICONES_RECHERCHE[entite['Type']]} {entite['Libelle']}{detail}"
+
+def _select_search_result(entites):
+    """Programme le saut vers le résultat choisi et vide la recherche"""
+    choix = st.session_state.recherche_globale
+    if choix is None:
+        return
+    st.session_state.search_target = entites.iloc[choix].to_dict()
+    st.session_state.pending_action = "search_jump"
+    st.session_state.recherche_globale = None
+
+def _create_search_section():
+    """Crée la recherche pendant la frappe, avec saut vers un filtre ou une fiche client"""
+    st.sidebar.subheader("🔎 Recherche")
+    entites = search_options()
+    libelles = [_search_label(entite) for entite in entites.to_dict('records')]
+    # Liste filtrée par le navigateur à chaque frappe ; le choix déclenche le saut
+    st.sidebar.selectbox(
+        "Client, ville, code postal, adresse, produit, pays",
+        options=range(len(entites)),
+        index=None,
+        format_func=libelles.__getitem__,
+        key="recherche_globale",
+        placeholder="ex. mini gifts, madrid, S18_...",
+        on_change=_select_search_result,
+        args=(entites,)
+    )
+    if st.session_state.get('search_message'):
+        st.sidebar.success(st.session_state.search_message)
+        st.session_state.search_message = None
+
 def _create_year_filters(df):
     """Crée les filtres pour les années"""
     st.sidebar.subheader("📅 Période")
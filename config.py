@@ -18,9 +18,29 @@ DATA_PATHS = [
     "sales_data_cleaned.csv",           # Dans le même dossier que app.py
 ]
 
+# Jeu de données partitionné (data/partitions/Année=2003/Mois=01.csv)
+PARTITIONS_DIR = "data/partitions"
+PARTITION_KEYS = ['Année', 'Mois']
+
+# Moteur de requêtes : 'pandas' (par défaut, en mémoire) ou 'sql' (base embarquée
+# DuckDB si installé, SQLite sinon), choisi via la variable DASHBOARD_BACKEND
+QUERY_BACKEND = os.environ.get("DASHBOARD_BACKEND", "pandas")
+SQL_DATABASE_PATH = os.environ.get("DASHBOARD_DATABASE", "data/sales.db")
+
+# Agrégation multi-cœur : nombre de processus et taille minimale du jeu de
+# données (en lignes) à partir de laquelle les agrégats sont parallélisés
+PARALLEL_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_ROWS = 2_000_000
+
 def get_data_path():
     """Retourne le premier chemin de données valide"""
     for path in DATA_PATHS:
         if os.path.exists(path):
             return path
-    return None
\ No newline at end of file
+    return None
+
+def get_partitions_path():
+    """Retourne le dossier des partitions s'il existe et n'est pas vide"""
+    if os.path.isdir(PARTITIONS_DIR) and os.listdir(PARTITIONS_DIR):
+        return PARTITIONS_DIR
+    return None
@@ -2,6 +2,20 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from utils.aggregations import aggregate_filtered
+from utils.ingestion import get_aggregate
+from utils.quantiles import get_distribution, MESURES_SKETCH, MESURE_COMMANDE
+from utils.session_manager import get_session_filters
+from utils.banding import (
+    get_amount_histogram, band_table, equal_count_thresholds, default_thresholds, band_labels,
+    NIVEAU_LIGNE, NIVEAU_COMMANDE, SEUILS_TAILLE, LIBELLES_TAILLE, PAS_MONTANT, NB_TRANCHES_MAX
+)
+from utils.correlations import get_correlations, DIMENSIONS_CORRELATION
+from utils.attribution import (
+    get_problem_attribution, top_drivers, DIMENSIONS_ATTRIBUTION, MIN_COMMANDES_ATTRIBUTION, STATUTS_PROBLEMATIQUES
+)
+from components.kpi_cards import render_behavior_kpis
+from components.charts import create_correlation_heatmap
 
 def render_behavior_analysis_tab(df_filtered, df_original):
     """Affiche l'onglet Comportements d'Achat & Indicateurs Opérationnels"""
@@ -14,6 +28,12 @@ def render_behavior_analysis_tab(df_filtered, df_original):
     
     st.markdown("---")
     
+    # SECTION 1 BIS: CORRÉLATIONS ENTRE MESURES
+    st.subheader("🔗 Corrélations entre Mesures")
+    _render_measure_correlations()
+    
+    st.markdown("---")
+    
     # SECTION 2: INDICATEURS OPÉRATIONNELS
     st.subheader("⚡ Indicateurs Opérationnels")
     _render_operational_indicators(df_filtered)
@@ -23,11 +43,12 @@ def render_behavior_analysis_tab(df_filtered, df_original):
     _render_problem_analysis(df_filtered, df_original)
 
 def _render_purchase_behavior(df_filtered):
-    """Affiche les comportements d'achat"""
-    taille_transactions = df_filtered.groupby('Taille de Transaction').agg({
-        'Chiffre d\'Affaires': 'sum', 
-        'Numéro_Commande': 'nunique'
-    }).reset_index()
+    """Affiche les comportements d'achat par tranche de montant (bornes configurables)"""
+    taille_transactions, libelle_nombre = _render_band_controls()
+    if taille_transactions is None:
+        st.info("Aucune transaction avec les filtres actuels")
+        return
+    couleurs_tailles = {'Small': '#1f77b4', 'Medium': '#2ca02c', 'Large': '#d62728'}
     
     # GRAPHIQUES SÉPARÉS POUR MEILLEURE LISIBILITÉ
     col1, col2 = st.columns(2)
@@ -39,12 +60,7 @@ def _render_purchase_behavior(df_filtered):
             x='Taille de Transaction',
             y='Chiffre d\'Affaires',
             color='Taille de Transaction',
-            color_discrete_map={
-                'Small': '#1f77b4', 
-                'Medium': '#2ca02c', 
-                'Large': '#d62728'
-            },
-            # text=[f'{x:,.0f} €' for x in taille_transactions['Chiffre d\'Affaires']],
+            color_discrete_map=couleurs_tailles,
             labels={'Chiffre d\'Affaires': 'CA (€)', 'Taille de Transaction': ''}
         )
         fig_ca.update_layout(
@@ -52,30 +68,23 @@ def _render_purchase_behavior(df_filtered):
             yaxis_title="Chiffre d'Affaires (€)",
             height=400
         )
-        fig_ca.update_traces(textposition='outside')
         st.plotly_chart(fig_ca, use_container_width=True)
     
     with col2:
-        st.markdown("**📦 Nombre de Commandes par Taille de Transaction**")
+        st.markdown(f"**📦 {libelle_nombre} par Taille de Transaction**")
         fig_cmd = px.bar(
             taille_transactions,
             x='Taille de Transaction',
-            y='Numéro_Commande',
+            y='Nombre',
             color='Taille de Transaction',
-            color_discrete_map={
-                'Small': '#1f77b4', 
-                'Medium': '#2ca02c', 
-                'Large': '#d62728'
-            },
-            # text=taille_transactions['Numéro_Commande'],
-            labels={'Numéro_Commande': 'Nombre de Commandes', 'Taille de Transaction': ''}
+            color_discrete_map=couleurs_tailles,
+            labels={'Nombre': libelle_nombre, 'Taille de Transaction': ''}
         )
         fig_cmd.update_layout(
             showlegend=False,
-            yaxis_title="Nombre de Commandes",
+            yaxis_title=libelle_nombre,
             height=400
         )
-        fig_cmd.update_traces(textposition='outside')
         st.plotly_chart(fig_cmd, use_container_width=True)
     
     # Camembert pour la répartition
@@ -85,100 +94,166 @@ def _render_purchase_behavior(df_filtered):
         names='Taille de Transaction',
         values='Chiffre d\'Affaires',
         color='Taille de Transaction',
-        color_discrete_map={
-            'Small': '#1f77b4', 
-            'Medium': '#2ca02c', 
-            'Large': '#d62728'
-        },
+        color_discrete_map=couleurs_tailles,
         hole=0.3
     )
     fig_pie.update_layout(height=400)
     st.plotly_chart(fig_pie, use_container_width=True)
     
+    # Distribution réelle derrière les tailles de transaction
+    _render_transaction_distributions()
+    
     # Insights comportements
-    _render_behavior_insights(taille_transactions)
+    _render_behavior_insights(taille_transactions, libelle_nombre)
 
-def _render_behavior_insights(taille_transactions):
-    """Affiche les insights des comportements d'achat"""
-    ca_medium = taille_transactions[taille_transactions['Taille de Transaction'] == 'Medium']['Chiffre d\'Affaires'].sum()
-    total_ca_comportement = taille_transactions['Chiffre d\'Affaires'].sum()
-    pourcentage_medium = (ca_medium / total_ca_comportement * 100) if total_ca_comportement > 0 else 0
+def _render_band_controls():
+    """
+    Choix du niveau (ligne ou commande) et des bornes des tranches ; les
+    tranches sont lues dans l'histogramme fin des montants de la sélection.
+    """
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        niveau = st.radio("Montant analysé", [NIVEAU_LIGNE, NIVEAU_COMMANDE], key="tranches_niveau")
+    with col2:
+        mode = st.radio("Tranches", ["Small / Medium / Large", "N tranches de même effectif"], key="tranches_mode")
+    histogramme = get_amount_histogram(get_session_filters(), niveau)
+    if histogramme.empty:
+        return None, None
     
-    # Calcul des pourcentages pour chaque taille
-    ca_small = taille_transactions[taille_transactions['Taille de Transaction'] == 'Small']['Chiffre d\'Affaires'].sum()
-    ca_large = taille_transactions[taille_transactions['Taille de Transaction'] == 'Large']['Chiffre d\'Affaires'].sum()
+    maximum = float((histogramme.index.max() + 1) * PAS_MONTANT)
+    with col3:
+        if mode == "Small / Medium / Large":
+            candidats = SEUILS_TAILLE if niveau == NIVEAU_LIGNE else equal_count_thresholds(histogramme, len(LIBELLES_TAILLE))
+            defaut = tuple(default_thresholds(candidats, maximum))
+            seuils = st.slider(
+                "Bornes Small / Medium / Large (€)",
+                min_value=0.0, max_value=maximum, value=defaut, step=PAS_MONTANT,
+                key=f"tranches_seuils_{niveau}"
+            )
+            seuils = [float(s) for s in seuils]
+            libelles = LIBELLES_TAILLE if len(seuils) + 1 == len(LIBELLES_TAILLE) else band_labels(seuils)
+        else:
+            nb_tranches = st.number_input("Nombre de tranches", min_value=2, max_value=NB_TRANCHES_MAX, value=4, key="tranches_nb")
+            seuils = list(equal_count_thresholds(histogramme, int(nb_tranches)))
+            libelles = band_labels(seuils)
+    
+    tranches = band_table(histogramme, seuils, libelles).rename(columns={'Tranche': 'Taille de Transaction'})
+    libelle_nombre = "Nombre de Lignes" if niveau == NIVEAU_LIGNE else "Nombre de Commandes"
+    return tranches, libelle_nombre
+
+def _render_transaction_distributions():
+    """Affiche les quantiles et histogrammes (sketches) des montants, prix et quantités"""
+    st.markdown("**📐 Distribution derrière les Tailles de Transaction**")
     
-    pourcentage_small = (ca_small / total_ca_comportement * 100) if total_ca_comportement > 0 else 0
-    pourcentage_large = (ca_large / total_ca_comportement * 100) if total_ca_comportement > 0 else 0
+    mesure = st.selectbox("Mesure", list(MESURES_SKETCH) + [MESURE_COMMANDE], key="distribution_mesure")
+    distribution = get_distribution(get_session_filters(), mesure)
+    if distribution is None:
+        st.info("Aucune donnée pour cette distribution avec les filtres actuels")
+        return
     
+    histogramme = distribution['histogramme']
+    centres = (histogramme['Borne_Basse'] + histogramme['Borne_Haute']) / 2
+    couleurs = {'Small': '#1f77b4', 'Medium': '#2ca02c', 'Large': '#d62728', 'Effectif': '#7f7f7f'}
+    fig = go.Figure()
+    for colonne in [c for c in ['Small', 'Medium', 'Large', 'Effectif'] if c in histogramme]:
+        fig.add_trace(go.Bar(x=centres, y=histogramme[colonne], name=colonne, marker_color=couleurs[colonne]))
+    fig.update_layout(
+        barmode='stack',
+        title=f"Distribution - {mesure}",
+        xaxis_title=mesure,
+        yaxis_title="Nombre",
+        height=400
+    )
+    st.plotly_chart(fig, use_container_width=True, key="comportement_distribution")
+    
+    quantiles = distribution['quantiles'].reindex([i for i in ['Ensemble', 'Small', 'Medium', 'Large'] if i in distribution['quantiles'].index])
+    st.dataframe(quantiles.round(2), use_container_width=True)
+    erreur = distribution['erreur_rang']
+    st.caption("Quantiles exacts" if erreur == 0 else
+               f"Quantiles estimés par sketches fusionnables : erreur de rang au plus {erreur:.1%}")
+
+def _render_behavior_insights(taille_transactions, libelle_nombre):
+    """Affiche les insights des comportements d'achat"""
     # KPIs détaillés
     st.subheader("📋 Résumé des Comportements d'Achat")
+    render_behavior_kpis(taille_transactions)
     
-    col1, col2, col3 = st.columns(3)
+    # Tableau récapitulatif
+    _render_behavior_summary_table(taille_transactions, libelle_nombre)
+
+def _render_behavior_summary_table(taille_transactions, libelle_nombre):
+    """Affiche le tableau récapitulatif des comportements"""
+    st.markdown("**📊 Tableau Récapitulatif**")
+    total_ca_comportement = taille_transactions['Chiffre d\'Affaires'].sum()
+    pourcentages = taille_transactions['Chiffre d\'Affaires'] / total_ca_comportement * 100 if total_ca_comportement > 0 else \
+        taille_transactions['Chiffre d\'Affaires'] * 0
+    recap_df = pd.DataFrame({
+        'Taille': list(taille_transactions['Taille de Transaction']) + ['Total'],
+        'Chiffre d\'Affaires (€)': [f"{ca:,.0f}" for ca in taille_transactions['Chiffre d\'Affaires']] + [f"{total_ca_comportement:,.0f}"],
+        'Pourcentage CA': [f"{p:.1f}%" for p in pourcentages] + ["100%"],
+        libelle_nombre: list(taille_transactions['Nombre']) + [taille_transactions['Nombre'].sum()]
+    })
+    st.dataframe(recap_df, use_container_width=True, hide_index=True)
     
+    unite = libelle_nombre.split()[-1].lower()
+    moteur = taille_transactions.loc[taille_transactions['Chiffre d\'Affaires'].idxmax()]
+    insights = [f"- **{moteur['Taille de Transaction']}** : Principal moteur du CA "
+                f"({moteur['Chiffre d\'Affaires'] / total_ca_comportement * 100:.1f}%) avec {moteur['Nombre']} {unite}"]
+    for _, tranche in taille_transactions.drop(index=moteur.name).iterrows():
+        part = tranche['Chiffre d\'Affaires'] / total_ca_comportement * 100 if total_ca_comportement > 0 else 0
+        insights.append(f"- **{tranche['Taille de Transaction']}** : {tranche['Nombre']} {unite} générant {part:.1f}% du CA")
+    st.info("**💡 Insights Comportementaux :**\n" + "\n".join(insights))
+
+def _render_measure_correlations():
+    """
+    Affiche les matrices de corrélation / covariance des mesures de la
+    sélection et la corrélation de chaque paire de mesures par segment.
+    """
+    col1, col2 = st.columns(2)
     with col1:
-        st.metric(
-            "💰 CA - Transactions Medium",
-            f"{ca_medium:,.0f} €",
-            f"{pourcentage_medium:.1f}% du total"
-        )
-    
+        matrice = st.radio("Matrice", ["Corrélation", "Covariance"], horizontal=True, key="correlation_matrice")
     with col2:
-        st.metric(
-            "💰 CA - Transactions Small", 
-            f"{ca_small:,.0f} €",
-            f"{pourcentage_small:.1f}% du total"
-        )
+        dimension = st.radio("Segments", list(DIMENSIONS_CORRELATION), horizontal=True, key="correlation_dimension")
+    resultats = get_correlations(get_session_filters(), dimension)
+    if resultats is None:
+        st.info("Aucune ligne de commande avec les filtres actuels")
+        return
     
-    with col3:
-        st.metric(
-            "💰 CA - Transactions Large",
-            f"{ca_large:,.0f} €", 
-            f"{pourcentage_large:.1f}% du total"
+    if matrice == "Corrélation":
+        fig = create_correlation_heatmap(
+            resultats['correlation'], f"Corrélations des mesures ({resultats['n']:,} lignes)"
         )
+    else:
+        fig = create_correlation_heatmap(
+            resultats['covariance'], f"Covariances des mesures ({resultats['n']:,} lignes)",
+            libelle_valeur='Covariance', bornee=False
+        )
+    st.plotly_chart(fig, use_container_width=True, key="correlation_matrice_chart")
     
-    # Tableau récapitulatif
-    _render_behavior_summary_table(taille_transactions, ca_small, ca_medium, ca_large, total_ca_comportement, pourcentage_small, pourcentage_medium, pourcentage_large)
-
-def _render_behavior_summary_table(taille_transactions, ca_small, ca_medium, ca_large, total_ca_comportement, pourcentage_small, pourcentage_medium, pourcentage_large):
-    """Affiche le tableau récapitulatif des comportements"""
-    st.markdown("**📊 Tableau Récapitulatif**")
-    recap_data = {
-        'Taille': ['Small', 'Medium', 'Large', 'Total'],
-        'Chiffre d\'Affaires (€)': [
-            f"{ca_small:,.0f}",
-            f"{ca_medium:,.0f}", 
-            f"{ca_large:,.0f}",
-            f"{total_ca_comportement:,.0f}"
-        ],
-        'Pourcentage CA': [
-            f"{pourcentage_small:.1f}%",
-            f"{pourcentage_medium:.1f}%",
-            f"{pourcentage_large:.1f}%", 
-            "100%"
-        ],
-        'Nombre de Commandes': [
-            taille_transactions[taille_transactions['Taille de Transaction'] == 'Small']['Numéro_Commande'].sum(),
-            taille_transactions[taille_transactions['Taille de Transaction'] == 'Medium']['Numéro_Commande'].sum(),
-            taille_transactions[taille_transactions['Taille de Transaction'] == 'Large']['Numéro_Commande'].sum(),
-            taille_transactions['Numéro_Commande'].sum()
-        ]
-    }
-    
-    recap_df = pd.DataFrame(recap_data)
-    st.dataframe(recap_df, use_container_width=True, hide_index=True)
+    segments = resultats['segments']
+    if segments.empty:
+        st.info("Pas assez de lignes par segment pour comparer les corrélations")
+        return
+    fig_segments = create_correlation_heatmap(
+        segments, f"Corrélation de chaque paire de mesures par {dimension.lower()}"
+    )
+    fig_segments.update_layout(xaxis_title="", yaxis_title="", xaxis_tickangle=-45)
+    st.plotly_chart(fig_segments, use_container_width=True, key="correlation_segments_chart")
     
-    st.info(f"""
-    **💡 Insights Comportementaux :**
-    - **Transactions Medium** : Principal moteur du CA ({pourcentage_medium:.1f}%) avec {taille_transactions[taille_transactions['Taille de Transaction'] == 'Medium']['Numéro_Commande'].sum()} commandes
-    - **Transactions Small** : {taille_transactions[taille_transactions['Taille de Transaction'] == 'Small']['Numéro_Commande'].sum()} commandes mais seulement {pourcentage_small:.1f}% du CA
-    - **Transactions Large** : {taille_transactions[taille_transactions['Taille de Transaction'] == 'Large']['Numéro_Commande'].sum()} commandes générant {pourcentage_large:.1f}% du CA
-    """)
+    # Paires dont la corrélation varie le plus d'un segment à l'autre
+    dispersion = (segments.max() - segments.min()).sort_values(ascending=False)
+    paire = dispersion.index[0]
+    st.caption(
+        f"Relation la plus variable entre segments : **{paire}** "
+        f"(de {segments[paire].min():.2f} en {segments[paire].idxmin()} "
+        f"à {segments[paire].max():.2f} en {segments[paire].idxmax()}). "
+        "Remise calculée vs Prix Conseil ; montant commande = CA total de la commande de chaque ligne."
+    )
 
 def _render_operational_indicators(df_filtered):
     """Affiche les indicateurs opérationnels"""
     # Statistiques des statuts
-    statuts_commandes = df_filtered.groupby('Statut').agg({
+    statuts_commandes = aggregate_filtered(df_filtered, 'Statut', {
         'Numéro_Commande': 'nunique', 
         "Chiffre d'Affaires": 'sum'
     }).reset_index()
@@ -245,7 +320,7 @@ def _render_problem_analysis(df_filtered, df_original):
     
     if not commandes_problematiques.empty:
         # Calcul des taux
-        total_commandes_global = df_original['Numéro_Commande'].nunique()
+        total_commandes_global = len(get_aggregate('orders')['commandes'])
         total_ca_global = df_original["Chiffre d'Affaires"].sum()
         
         analyse_problemes = commandes_problematiques.groupby('Statut').agg({
@@ -262,6 +337,9 @@ def _render_problem_analysis(df_filtered, df_original):
         # Graphique problèmes
         _render_problem_charts(analyse_problemes, commandes_problematiques)
         
+        # Attribution par dimension
+        _render_problem_attribution()
+        
         # Résumé final
         _render_final_summary(analyse_problemes)
     else:
@@ -319,6 +397,70 @@ def _render_problem_charts(analyse_problemes, commandes_problematiques):
         )
         st.plotly_chart(fig, use_container_width=True)
 
+def _render_problem_attribution():
+    """
+    Affiche les principaux facteurs des commandes problématiques : valeurs de
+    chaque dimension sur-représentées (taux, lift, CA à risque).
+    """
+    st.markdown("**🎯 Facteurs des Commandes Problématiques**")
+    options_statuts = {
+        "Litiges + Annulations": tuple(STATUTS_PROBLEMATIQUES),
+        "Litiges (Disputed)": ('Disputed',),
+        "Annulations (Cancelled)": ('Cancelled',)
+    }
+    col1, col2 = st.columns(2)
+    with col1:
+        choix_statuts = st.radio("Statuts analysés", list(options_statuts), horizontal=True, key="attribution_statuts")
+    with col2:
+        dimension = st.selectbox("Dimension", ["Toutes"] + list(DIMENSIONS_ATTRIBUTION), key="attribution_dimension")
+    
+    attribution = get_problem_attribution(get_session_filters(), options_statuts[choix_statuts])
+    if attribution is None or attribution['problemes'] == 0:
+        st.info("Aucune commande avec ces statuts dans les données filtrées")
+        return
+    scores = attribution['scores']
+    if dimension != "Toutes":
+        scores = scores[scores['Dimension'] == dimension]
+    facteurs = top_drivers(scores)
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("📉 Taux de Référence", f"{attribution['taux_reference']:.2f}%")
+    col2.metric("⚠️ Commandes Concernées", f"{attribution['problemes']:,} / {attribution['commandes']:,}")
+    col3.metric("💸 CA à Risque", f"{attribution['ca_a_risque']:,.0f} €")
+    
+    if facteurs.empty:
+        st.info("Aucune valeur sur-représentée avec un support suffisant")
+        return
+    facteurs = facteurs.assign(Facteur=facteurs['Dimension'] + ' : ' + facteurs['Valeur'])
+    fig = px.bar(
+        facteurs.iloc[::-1],
+        x='Problemes_Excedentaires',
+        y='Facteur',
+        color='Dimension',
+        orientation='h',
+        hover_data={'Taux_Problemes': ':.1f', 'Lift': ':.2f', 'CA_A_Risque': ':,.0f'},
+        title="Problèmes excédentaires vs taux de référence",
+        labels={'Problemes_Excedentaires': 'Commandes problématiques en excès', 'Facteur': ''}
+    )
+    fig.update_layout(height=max(350, 35 * len(facteurs)))
+    st.plotly_chart(fig, use_container_width=True, key="attribution_chart")
+    
+    tableau = facteurs[[
+        'Dimension', 'Valeur', 'Nb_Commandes', 'Nb_Problemes', 'Taux_Problemes',
+        'Lift', 'CA_A_Risque', 'Part_Problemes'
+    ]].rename(columns={
+        'Nb_Commandes': 'Commandes', 'Nb_Problemes': 'Problématiques', 'Taux_Problemes': 'Taux (%)',
+        'CA_A_Risque': 'CA à Risque (€)', 'Part_Problemes': 'Part des Problèmes (%)'
+    })
+    st.dataframe(
+        tableau.round({'Taux (%)': 1, 'Lift': 2, 'CA à Risque (€)': 0, 'Part des Problèmes (%)': 1}),
+        use_container_width=True, hide_index=True
+    )
+    st.caption(
+        "Une commande compte pour une valeur si au moins une de ses lignes la porte ; "
+        f"lift = taux de la valeur / taux de référence ; support minimum de {MIN_COMMANDES_ATTRIBUTION} commandes."
+    )
+
 def _render_final_summary(analyse_problemes):
     """Affiche le résumé final"""
     taux_litige = analyse_problemes[analyse_problemes['Statut'] == 'Disputed']['Taux_Commandes'].sum()
@@ -2,6 +2,17 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from utils.aggregations import aggregate_filtered
+from utils.customers import get_customer_features, get_reference_date
+from utils.rfm import score_rfm, summarize_segments
+from utils.clustering import GROUPES_FEATURES, get_customer_clusters, cluster_profiles
+from utils.cohorts import get_cohorts
+from utils.clv import get_customer_clv, HORIZONS_CLV, SEGMENTS_CLV
+from utils.customer_index import list_customers, get_customer_rows, customer_profile
+from utils.churn import get_churn_risk, NIVEAUX_RISQUE, K_ECART_TYPE, RATIO_RYTHME_MIN, MIN_INTERVALLES_RYTHME
+from utils.session_manager import get_session_filters
+from utils.pareto import abc_classes, abc_summary, lorenz_curve, concentration_indices
+from components.charts import create_lorenz_chart
 
 def render_customer_segmentation_tab(df_filtered, df_original):
     """Affiche l'onglet Segmentation Clientèle"""
@@ -11,15 +22,13 @@ def render_customer_segmentation_tab(df_filtered, df_original):
     # Top 10 Clients par Chiffre d'Affaires
     st.subheader("Top 10 Clients par Chiffre d'Affaires")
     
-    # Calcul des indicateurs clients
-    top_clients = df_filtered.groupby('Nom_du_Client').agg({
-        "Chiffre d'Affaires": 'sum', 
-        'Numéro_Commande': 'nunique', 
-        'Pays': 'first'
-    }).nlargest(10, "Chiffre d'Affaires").reset_index()
+    # Indicateurs clients (table clients mise en cache par version des données)
+    clients = get_customer_features(get_session_filters())
+    top_clients = clients[["Chiffre d'Affaires", 'Nb_Commandes', 'Pays']]\
+                  .nlargest(10, "Chiffre d'Affaires").reset_index()
     
     # Calcul du CA moyen par commande
-    top_clients['CA_moyen_commande'] = top_clients["Chiffre d'Affaires"] / top_clients['Numéro_Commande']
+    top_clients['CA_moyen_commande'] = top_clients["Chiffre d'Affaires"] / top_clients['Nb_Commandes']
     
     # Graphique barres - Top clients
     fig_clients_top = px.bar(
@@ -27,7 +36,7 @@ def render_customer_segmentation_tab(df_filtered, df_original):
         x='Nom_du_Client', 
         y="Chiffre d'Affaires", 
         color="Chiffre d'Affaires", 
-        hover_data=['Pays', 'Numéro_Commande', 'CA_moyen_commande'], 
+        hover_data=['Pays', 'Nb_Commandes', 'CA_moyen_commande'], 
         labels={'Nom_du_Client': 'Client'},
         title="Top 10 Clients par Chiffre d'Affaires Total",
         color_continuous_scale='Viridis'
@@ -52,11 +61,345 @@ def render_customer_segmentation_tab(df_filtered, df_original):
     top_clients_display['CA_moyen_commande'] = top_clients_display['CA_moyen_commande'].round(2)
     st.dataframe(top_clients_display)
     
+    # Classes ABC et concentration des clients
+    _render_customer_pareto(clients)
+    
+    # Segmentation RFM
+    _render_rfm_segmentation(clients)
+    
+    # Valeur vie client prédite (BG/NBD + Gamma-Gamma)
+    _render_customer_lifetime_value(clients)
+    
+    # Clients inactifs et risque d'attrition
+    _render_churn_risk(clients)
+    
+    # Groupes comportementaux (k-means)
+    _render_behavioral_clusters(clients)
+    
+    # Rétention par cohorte d'acquisition
+    _render_cohort_retention()
+    
     # Clients fidèles des produits de haute valeur
     _render_premium_loyal_customers(df_filtered)
     
     # Performance par pays
     _render_country_performance(df_filtered)
+    
+    # Fiche détaillée d'un client
+    _render_customer_360(clients)
+
+def _render_customer_pareto(clients):
+    """Affiche les classes ABC des clients, la courbe de Lorenz et la concentration par pays"""
+    st.subheader("📊 Analyse ABC / Pareto des Clients")
+    if clients.empty:
+        st.info("Aucun client avec les filtres actuels")
+        return
+    
+    ca_clients = clients["Chiffre d'Affaires"]
+    classes = abc_classes(ca_clients)
+    resume = abc_summary(classes)
+    
+    col1, col2, col3 = st.columns(3)
+    for colonne, classe in zip([col1, col2, col3], ['A', 'B', 'C']):
+        with colonne:
+            st.metric(
+                f"Clients {classe}",
+                f"{resume.loc[classe, 'Nb_Elements']} ({resume.loc[classe, 'Part_Elements']:.0f}%)",
+                delta=f"{resume.loc[classe, 'Part_CA']:.1f}% du CA",
+                delta_color="off"
+            )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = create_lorenz_chart(lorenz_curve(ca_clients), "Courbe de Lorenz du CA par Client", "clients")
+        st.plotly_chart(fig, use_container_width=True, key="clients_lorenz")
+    with col2:
+        st.markdown("**Concentration du CA entre clients, par pays**")
+        indices = concentration_indices(ca_clients.to_numpy(), clients['Pays'].to_numpy())
+        st.dataframe(indices.rename_axis('Pays').sort_values('Montant_Total', ascending=False).round(3),
+                     use_container_width=True)
+
+def _render_rfm_segmentation(clients):
+    """Affiche la segmentation RFM (récence, fréquence, montant)"""
+    st.subheader("📇 Segmentation RFM")
+    
+    if clients.empty:
+        st.info("Aucun client avec les filtres actuels")
+        return
+    
+    scores = score_rfm(clients)
+    synthese = summarize_segments(scores)
+    st.caption(f"Récence calculée au {get_reference_date():%d/%m/%Y} ; scores de 1 à 5 par quintile de la sélection")
+    
+    # Indicateurs clés
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        nb_champions = synthese['Nb_Clients'].get('Champions', 0)
+        st.metric("Clients Champions", f"{nb_champions}")
+    with col2:
+        part_risque = synthese['Part_CA'].reindex(['À risque', 'À ne pas perdre']).sum()
+        st.metric("CA des clients à risque", f"{part_risque:.1f} %")
+    with col3:
+        st.metric("Récence médiane", f"{scores['Recence_Jours'].median():.0f} jours")
+    
+    # Répartition des clients et du CA par segment
+    fig_segments = px.bar(
+        synthese.reset_index(),
+        x='Segment',
+        y='Nb_Clients',
+        color='Part_CA',
+        hover_data=['CA_Total', 'Recence_Moyenne', 'Frequence_Moyenne'],
+        labels={'Nb_Clients': 'Nombre de Clients', 'Part_CA': 'Part du CA (%)'},
+        title='Clients par Segment RFM',
+        color_continuous_scale='Viridis'
+    )
+    fig_segments.update_layout(xaxis_tickangle=-45)
+    st.plotly_chart(fig_segments, use_container_width=True)
+    
+    # Carte récence / fréquence des clients
+    fig_rfm = px.scatter(
+        scores.reset_index(),
+        x='Recence_Jours',
+        y='Nb_Commandes',
+        size="Chiffre d'Affaires",
+        color='Segment',
+        hover_name='Nom_du_Client',
+        hover_data=['Pays', 'Code_RFM'],
+        labels={'Recence_Jours': 'Récence (jours)', 'Nb_Commandes': 'Nombre de Commandes'},
+        title='Récence vs Fréquence (taille = CA)'
+    )
+    st.plotly_chart(fig_rfm, use_container_width=True)
+    
+    # Tableau de synthèse
+    st.dataframe(synthese.round(1))
+
+def _render_customer_lifetime_value(clients):
+    """Affiche la CLV prédite des clients de la sélection (BG/NBD + Gamma-Gamma)"""
+    st.subheader("💎 Valeur Vie Client Prédite (CLV)")
+    
+    horizon = st.select_slider("Horizon de prédiction (mois)", options=HORIZONS_CLV, value=12, key='clv_horizon')
+    resultat = get_customer_clv(get_session_filters(), horizon)
+    if resultat is None or clients.empty:
+        st.info("Aucun historique d'achat disponible pour estimer la CLV")
+        return
+    
+    # Clients de la sélection (le modèle utilise tout leur historique)
+    scores = resultat['scores'].reindex(clients.index).dropna(subset=['CLV'])
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(f"CLV totale prédite ({horizon} mois)", f"{scores['CLV'].sum():,.0f} €")
+    with col2:
+        st.metric("Probabilité d'activité moyenne", f"{scores['Probabilite_Active'].mean():.0%}")
+    with col3:
+        st.metric("Achats attendus par client", f"{scores['Achats_Attendus'].mean():.2f}")
+    
+    fig_clv = px.scatter(
+        scores.reset_index(),
+        x='CA_Historique',
+        y='CLV',
+        color='Segment_CLV',
+        size='Achats_Attendus',
+        hover_name='Nom_du_Client',
+        hover_data=['Frequence', 'Probabilite_Active', 'Panier_Attendu'],
+        category_orders={'Segment_CLV': SEGMENTS_CLV[::-1]},
+        labels={'CA_Historique': 'CA historique (€)', 'CLV': f'CLV prédite à {horizon} mois (€)', 'Segment_CLV': 'Segment CLV'},
+        title='CA historique vs CLV prédite'
+    )
+    st.plotly_chart(fig_clv, use_container_width=True, key="clv_scatter")
+    
+    colonnes = ['CA_Historique', 'Frequence', 'Probabilite_Active', 'Achats_Attendus', 'Panier_Attendu', 'CLV', 'Segment_CLV']
+    st.dataframe(scores.nlargest(15, 'CLV')[colonnes].round(2), use_container_width=True)
+    parametres = pd.concat([resultat['bgnbd'], resultat['gamma_gamma']])
+    st.caption("Paramètres ajustés : " + ", ".join(f"{nom} = {valeur:,.3g}" for nom, valeur in parametres.items()) +
+               " — fréquence, récence et ancienneté en semaines, sur tout l'historique des pays et gammes sélectionnés")
+
+def _render_churn_risk(clients):
+    """Affiche le classement des clients dont le rythme de commande s'est interrompu"""
+    st.subheader("⏳ Risque d'Attrition Client")
+    
+    # Clients de la sélection, évalués sur l'historique complet de leurs commandes
+    risques = get_churn_risk()
+    risques = risques[risques.index.isin(clients.index)]
+    if risques.empty:
+        st.info("Aucun client avec les filtres actuels")
+        return
+    
+    eleves = risques[risques['Risque'] == NIVEAUX_RISQUE[0]]
+    moderes = risques[risques['Risque'] == NIVEAUX_RISQUE[1]]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Clients à risque élevé", f"{len(eleves)}", delta=f"{len(eleves) / len(risques):.0%} des clients", delta_color="off")
+    with col2:
+        st.metric("CA annuel en jeu (risque élevé)", f"{eleves['CA_En_Jeu'].sum():,.0f} €")
+    with col3:
+        st.metric("Clients en retard sur leur rythme", f"{len(moderes)}", delta=f"{moderes['CA_En_Jeu'].sum():,.0f} € en jeu", delta_color="off")
+    
+    a_risque = risques[risques['Risque'] != NIVEAUX_RISQUE[2]].reset_index()
+    if not a_risque.empty:
+        fig_risque = px.scatter(
+            a_risque,
+            x='Ratio_Rythme',
+            y='CA_En_Jeu',
+            color='Risque',
+            size='Nb_Achats',
+            hover_name='Nom_du_Client',
+            hover_data=['Dernier_Achat', 'Jours_Depuis_Dernier_Achat', 'Intervalle_Median', 'Rythme_Reference'],
+            category_orders={'Risque': NIVEAUX_RISQUE},
+            color_discrete_sequence=['#FF6B6B', '#FFA94D'],
+            labels={'Ratio_Rythme': 'Écart actuel / intervalle habituel', 'CA_En_Jeu': 'CA annuel en jeu (€)'},
+            title='Clients en retard sur leur rythme de commande'
+        )
+        st.plotly_chart(fig_risque, use_container_width=True, key="churn_scatter")
+    
+    colonnes = ['Risque', 'Dernier_Achat', 'Jours_Depuis_Dernier_Achat', 'Intervalle_Median', 'Seuil_Inactivite',
+                'Ratio_Rythme', 'CA_En_Jeu', 'Nb_Achats', 'Rythme_Reference']
+    st.dataframe(risques[colonnes].round({c: 1 for c in ['Intervalle_Median', 'Seuil_Inactivite', 'Ratio_Rythme', 'CA_En_Jeu']}), use_container_width=True)
+    st.caption(f"Risque élevé : écart depuis le dernier achat supérieur à l'intervalle moyen + {K_ECART_TYPE:g} écarts-types "
+               f"(et à {RATIO_RYTHME_MIN:g} fois l'intervalle médian) ; modéré : supérieur à l'intervalle médian. "
+               f"Moins de {MIN_INTERVALLES_RYTHME} intervalles : rythme médian de l'ensemble des clients")
+
+def _render_customer_360(clients):
+    """Affiche la fiche 360° d'un client (lignes résolues par l'index client -> plage)"""
+    st.subheader("🔎 Fiche Client 360°")
+    
+    # Clients de la sélection en tête (par CA), puis les autres clients indexés
+    selection = clients["Chiffre d'Affaires"].sort_values(ascending=False).index.tolist()
+    deja_listes = set(selection)
+    autres = [nom for nom in list_customers() if nom not in deja_listes]
+    nom = st.selectbox("Client", selection + autres, key='client_360')
+    if nom is None:
+        return
+    
+    fiche = customer_profile(get_customer_rows(nom))
+    synthese = fiche['synthese']
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("CA total", f"{synthese['ca']:,.0f} €")
+    with col2:
+        st.metric("Commandes", f"{synthese['commandes']}", delta=f"{synthese['panier']:,.0f} € / commande", delta_color="off")
+    with col3:
+        st.metric("Client depuis", f"{synthese['premiere_commande']:%d/%m/%Y}",
+                  delta=f"dernière : {synthese['derniere_commande']:%d/%m/%Y}", delta_color="off")
+    with col4:
+        st.metric("Remise pondérée vs prix conseil", f"{synthese['remise_ponderee']:.1f}%",
+                  delta=f"{synthese['produits']} produits distincts", delta_color="off")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        fig_historique = px.bar(
+            fiche['commandes'],
+            x='Date_Commande',
+            y="Chiffre d'Affaires",
+            color='Statut',
+            hover_data=['Numéro_Commande', 'Nb_Lignes', 'Quantité_Commandée', 'Remise_Moyenne'],
+            title=f"Historique des commandes de {nom}"
+        )
+        st.plotly_chart(fig_historique, use_container_width=True, key="client_360_historique")
+    with col2:
+        fig_mix = px.pie(
+            fiche['gammes'].reset_index(),
+            names='Gamme_de_Produits',
+            values="Chiffre d'Affaires",
+            title='Mix de gammes'
+        )
+        st.plotly_chart(fig_mix, use_container_width=True, key="client_360_mix")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Gammes et remises (% vs prix conseil)**")
+        st.dataframe(fiche['gammes'].round(1), use_container_width=True)
+    with col2:
+        st.markdown("**Statuts des commandes**")
+        st.dataframe(fiche['statuts'].round(0), use_container_width=True)
+        st.markdown("**Adresses de livraison**")
+        st.dataframe(fiche['adresses'], use_container_width=True, hide_index=True)
+    
+    st.markdown("**Commandes**")
+    st.dataframe(fiche['commandes'].round({"Chiffre d'Affaires": 2, 'Remise_Moyenne': 2}), use_container_width=True, hide_index=True)
+    st.caption("Historique complet du client, indépendamment des filtres de session")
+
+def _render_behavioral_clusters(clients):
+    """Affiche les groupes comportementaux de clients (k-means mini-batch)"""
+    st.subheader("🧩 Groupes Comportementaux de Clients")
+    
+    groupes = st.multiselect(
+        "Caractéristiques utilisées",
+        options=list(GROUPES_FEATURES),
+        default=list(GROUPES_FEATURES),
+        key='clustering_features'
+    )
+    resultat = get_customer_clusters(get_session_filters(), groupes)
+    if resultat is None:
+        st.info("Pas assez de clients ou de caractéristiques pour constituer des groupes")
+        return
+    
+    modele = resultat['modeles'][resultat['k']]
+    profils = cluster_profiles(clients, modele['labels'])
+    profils.index = [f"Groupe {g + 1}" for g in profils.index]
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric("Nombre de groupes retenu", f"{resultat['k']}")
+        st.metric("Score de silhouette", f"{modele['silhouette']:.2f}")
+        qualite = pd.DataFrame({
+            'Groupes': list(resultat['modeles']),
+            'Silhouette': [m['silhouette'] for m in resultat['modeles'].values()]
+        })
+        fig_silhouette = px.line(qualite, x='Groupes', y='Silhouette', markers=True,
+                                 title='Silhouette par nombre de groupes')
+        fig_silhouette.update_layout(height=300)
+        st.plotly_chart(fig_silhouette, use_container_width=True)
+    
+    with col2:
+        fig_groupes = px.scatter(
+            clients.assign(Groupe=[f"Groupe {g + 1}" for g in modele['labels']]).reset_index(),
+            x='Nb_Commandes',
+            y="Chiffre d'Affaires",
+            size='Panier_Moyen',
+            color='Groupe',
+            hover_name='Nom_du_Client',
+            hover_data=['Pays', 'Part_Premium'],
+            log_y=True,
+            labels={'Nb_Commandes': 'Nombre de Commandes'},
+            title='Clients par Groupe Comportemental'
+        )
+        st.plotly_chart(fig_groupes, use_container_width=True)
+    
+    # Profils des groupes
+    st.dataframe(profils.round(2))
+
+def _render_cohort_retention():
+    """Affiche la matrice de rétention par cohorte d'acquisition"""
+    st.subheader("📅 Rétention par Cohorte d'Acquisition")
+    
+    cohortes = get_cohorts(get_session_filters())
+    if cohortes['effectifs'].empty:
+        st.info("Aucune cohorte d'acquisition avec les filtres actuels")
+        return
+    
+    st.caption("Cohorte = mois de la première commande du client ; activité suivie sur tout l'historique")
+    mesure = st.radio(
+        "Mesure",
+        ["Taux de rétention (%)", "Clients actifs", "Chiffre d'affaires"],
+        horizontal=True,
+        key='cohort_measure'
+    )
+    matrice = {
+        "Taux de rétention (%)": cohortes['retention'],
+        "Clients actifs": cohortes['clients'],
+        "Chiffre d'affaires": cohortes['ca']
+    }[mesure]
+    
+    fig_cohortes = px.imshow(
+        matrice,
+        aspect='auto',
+        color_continuous_scale='Blues',
+        labels=dict(x="Mois depuis l'acquisition", y='Cohorte', color=mesure),
+        title=f"{mesure} par Cohorte et Mois depuis l'Acquisition"
+    )
+    fig_cohortes.update_layout(height=max(400, 22 * len(matrice)))
+    st.plotly_chart(fig_cohortes, use_container_width=True)
 
 def _render_premium_loyal_customers(df_filtered):
     """Affiche les clients fidèles premium"""
@@ -123,7 +466,7 @@ def _render_country_performance(df_filtered):
     """Affiche la performance clients par pays"""
     st.subheader("🌍 Performance Clients par Pays")
     
-    ca_par_pays = df_filtered.groupby('Pays').agg({
+    ca_par_pays = aggregate_filtered(df_filtered, 'Pays', {
         "Chiffre d'Affaires": 'sum',
         'Numéro_Commande': 'nunique',
         'Nom_du_Client': 'nunique'
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
+from utils.aggregations import aggregate_filtered
 
 def render_geographic_analysis_tab(df_filtered, df_original):
     """Affiche l'onglet Analyse Géographique"""
@@ -21,7 +21,7 @@ def render_geographic_analysis_tab(df_filtered, df_original):
 def _render_world_map(df_filtered):
     """Affiche la carte mondiale"""
     # --- Préparation des données pour la cartographie ---
-    performance_pays = df_filtered.groupby('Pays').agg({
+    performance_pays = aggregate_filtered(df_filtered, 'Pays', {
         "Chiffre d'Affaires": 'sum',
         'Numéro_Commande': 'nunique',
         'Nom_du_Client': 'nunique',
@@ -123,7 +123,7 @@ def _render_country_analysis(df_filtered):
     # --- Analyse détaillée par pays ---
     st.subheader("Analyse Détaillée par Pays")
     
-    performance_pays = df_filtered.groupby('Pays').agg({
+    performance_pays = aggregate_filtered(df_filtered, 'Pays', {
         "Chiffre d'Affaires": 'sum',
         'Numéro_Commande': 'nunique',
         'Nom_du_Client': 'nunique',
@@ -257,7 +257,7 @@ def _render_city_analysis(df_filtered):
     st.subheader("Analyse par Ville")
     
     # Agréger les données par ville
-    performance_ville = df_filtered.groupby(['Ville', 'Pays']).agg({
+    performance_ville = aggregate_filtered(df_filtered, ['Ville', 'Pays'], {
         "Chiffre d'Affaires": 'sum',
         'Numéro_Commande': 'nunique',
         'Nom_du_Client': 'nunique'
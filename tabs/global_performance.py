@@ -3,6 +3,11 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+from utils.customers import get_customer_features
+from utils.session_manager import get_session_filters
+from utils.comparisons import get_kpi_comparison, kpi_delta
+from utils.pvm import get_pvm_bridge, EFFETS
+from utils.clv import get_customer_clv
 
 def render_global_performance_tab(df_filtered, df_original):
     """Affiche l'onglet Performance Globale avec les données filtrées"""
@@ -17,15 +22,6 @@ def render_global_performance_tab(df_filtered, df_original):
     total_commandes = df_filtered['Numéro_Commande'].nunique()
     panier_moyen = ca_total / total_commandes if total_commandes > 0 else 0
     
-    # Calcul croissance avec données filtrées
-    annees = sorted(df_filtered['Année'].unique())
-    if len(annees) >= 2:
-        ca_derniere = df_filtered[df_filtered['Année'] == annees[-1]]["Chiffre d'Affaires"].sum()
-        ca_precedente = df_filtered[df_filtered['Année'] == annees[-2]]["Chiffre d'Affaires"].sum()
-        croissance = ((ca_derniere - ca_precedente) / ca_precedente * 100) if ca_precedente > 0 else 0
-    else:
-        croissance = 0
-    
     # Concentration avec données filtrées
     if ca_total > 0:
         part_classic_cars = (df_filtered[df_filtered['Gamme_de_Produits'] == 'Classic Cars']["Chiffre d'Affaires"].sum() / ca_total) * 100
@@ -53,26 +49,35 @@ def render_global_performance_tab(df_filtered, df_original):
     ca_a_risque = df_filtered[df_filtered['Statut'].isin(['Cancelled', 'Disputed'])]["Chiffre d'Affaires"].sum()
     part_ca_risque = (ca_a_risque / ca_total * 100) if ca_total > 0 else 0
     
+    # Comparaison à date avec la même période de l'année précédente (table des commandes)
+    comparaison = get_kpi_comparison(get_session_filters(), gamme='Classic Cars', pays='USA', client=nom_top_client)
+    croissance = comparaison['actuel']['croissance'] if comparaison is not None else np.nan
+    croissance = 0 if pd.isna(croissance) else croissance
+    aide_n1 = (
+        f"Écart {comparaison['annee']} au {comparaison['date_limite']:%d/%m} vs même période {comparaison['annee'] - 1}"
+        if comparaison is not None else None
+    )
+    
     # AFFICHAGE DES INDICATEURS
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.markdown("**💰 KPIs Financiers**")
-        st.metric("Chiffre d'Affaires", f"{ca_total:,.0f} €")
-        st.metric("Panier Moyen", f"{panier_moyen:,.0f} €")
-        st.metric("Croissance", f"{croissance:+.1f} %", delta=f"{croissance:+.1f}%")
+        st.metric("Chiffre d'Affaires", f"{ca_total:,.0f} €", delta=_format_delta(comparaison, 'ca'), help=aide_n1)
+        st.metric("Panier Moyen", f"{panier_moyen:,.0f} €", delta=_format_delta(comparaison, 'panier'), help=aide_n1)
+        st.metric("Croissance", f"{croissance:+.1f} %", delta=_format_delta(comparaison, 'croissance', en_points=True), help=aide_n1)
     
     with col2:
         st.markdown("**🎯 Concentration**")
-        st.metric("Part Classic Cars", f"{part_classic_cars:.1f} %")
-        st.metric("Part USA", f"{part_usa:.1f} %")
-        st.metric(f"Part {nom_top_client[:12]}...", f"{part_top_client:.1f} %")
+        st.metric("Part Classic Cars", f"{part_classic_cars:.1f} %", delta=_format_delta(comparaison, 'part_gamme', en_points=True), delta_color="off", help=aide_n1)
+        st.metric("Part USA", f"{part_usa:.1f} %", delta=_format_delta(comparaison, 'part_pays', en_points=True), delta_color="off", help=aide_n1)
+        st.metric(f"Part {nom_top_client[:12]}...", f"{part_top_client:.1f} %", delta=_format_delta(comparaison, 'part_client', en_points=True), delta_color="inverse", help=aide_n1)
     
     with col3:
         st.markdown("**⚡ Opérationnel**")
-        st.metric("Taux de Réussite", f"{taux_reussite:.1f} %")
-        st.metric("CA à Risque", f"{part_ca_risque:.1f} %")
-        st.metric("Commandes", f"{total_commandes:,}")
+        st.metric("Taux de Réussite", f"{taux_reussite:.1f} %", delta=_format_delta(comparaison, 'taux_reussite', en_points=True), help=aide_n1)
+        st.metric("CA à Risque", f"{part_ca_risque:.1f} %", delta=_format_delta(comparaison, 'part_ca_risque', en_points=True), delta_color="inverse", help=aide_n1)
+        st.metric("Commandes", f"{total_commandes:,}", delta=_format_delta(comparaison, 'commandes'), help=aide_n1)
     
     # Analyse et Recommandations
     _render_strategic_analysis(ca_total, panier_moyen, croissance, part_classic_cars, part_usa, part_top_client, nom_top_client, taux_reussite, df_filtered)
@@ -84,29 +89,45 @@ def render_global_performance_tab(df_filtered, df_original):
     
     if not df_filtered.empty:
         # Analyse des clients par segments avec données filtrées
-        ca_par_client = df_filtered.groupby('Nom_du_Client').agg({
-            "Chiffre d'Affaires": 'sum',
-            'Numéro_Commande': 'nunique',
-            'Pays': 'first'
-        }).sort_values("Chiffre d'Affaires", ascending=False)
+        ca_par_client = get_customer_features(get_session_filters())[
+            ["Chiffre d'Affaires", 'Nb_Commandes', 'Pays']
+        ].sort_values("Chiffre d'Affaires", ascending=False)
+        
+        base_segmentation = st.radio(
+            "Base de segmentation",
+            ["CA historique", "CLV prédite (12 mois)"],
+            horizontal=True,
+            key="pyramide_base"
+        )
+        clv = get_customer_clv(get_session_filters()) if base_segmentation != "CA historique" else None
         
         if not ca_par_client.empty:
             # Segmentation des clients
             total_ca_clients = ca_par_client["Chiffre d'Affaires"].sum()
             ca_par_client['Part_CA'] = (ca_par_client["Chiffre d'Affaires"] / total_ca_clients * 100)
-            ca_par_client['Segment'] = pd.cut(ca_par_client['Part_CA'], 
-                                            bins=[0, 1, 5, 100], 
-                                            labels=['Base', 'Moyen', 'VIP'])
+            if clv is None:
+                ca_par_client['Segment'] = pd.cut(ca_par_client['Part_CA'], 
+                                                bins=[0, 1, 5, 100], 
+                                                labels=['Base', 'Moyen', 'VIP'])
+            else:
+                # Segments de CLV prédite (rang du client), valeur future de chaque segment
+                scores_clv = clv['scores'].reindex(ca_par_client.index)
+                ca_par_client['Segment'] = scores_clv['Segment_CLV']
+                ca_par_client['CLV'] = scores_clv['CLV'].fillna(0)
             
             # Calculs par segment
-            segments = ca_par_client.groupby('Segment').agg({
+            segments = ca_par_client.groupby('Segment', observed=False).agg({
                 "Chiffre d'Affaires": ['sum', 'count'],
-                'Numéro_Commande': 'sum'
+                'Nb_Commandes': 'sum'
             }).round(0)
             
             segments.columns = ['CA_Total', 'Nb_Clients', 'Nb_Commandes']
             segments['Part_CA'] = (segments['CA_Total'] / total_ca_clients * 100).round(1)
             segments['CA_Moyen'] = (segments['CA_Total'] / segments['Nb_Clients']).round(0)
+            if clv is not None:
+                clv_segments = ca_par_client.groupby('Segment', observed=False)['CLV'].sum()
+                segments['Part_CLV'] = (clv_segments / clv_segments.sum() * 100).round(1)
+                segments['CLV_Moyenne'] = (clv_segments / segments['Nb_Clients']).round(0)
             
             # Affichage de la pyramide
             col1, col2 = st.columns([2, 1])
@@ -117,18 +138,20 @@ def render_global_performance_tab(df_filtered, df_original):
                 
                 segments_ordered = segments.loc[['VIP', 'Moyen', 'Base']] if 'VIP' in segments.index else segments
                 
+                part_affichee = 'Part_CA' if clv is None else 'Part_CLV'
                 fig_pyramide.add_trace(go.Bar(
                     y=['CLIENTS VIP', 'CLIENTÈLE MOYENNE', 'BASE CLIENTS'],
-                    x=segments_ordered['Part_CA'],
+                    x=segments_ordered[part_affichee],
                     orientation='h',
                     marker_color=['#FF6B6B', '#4ECDC4', '#45B7D1'],
-                    text=segments_ordered['Part_CA'].apply(lambda x: f'{x}%'),
+                    text=segments_ordered[part_affichee].apply(lambda x: f'{x}%'),
                     textposition='auto',
                 ))
                 
                 fig_pyramide.update_layout(
-                    title="Répartition du CA par Segment Client (AVEC FILTRES)",
-                    xaxis_title="Part du Chiffre d'Affaires (%)",
+                    title="Répartition du CA par Segment Client (AVEC FILTRES)" if clv is None
+                          else "Répartition de la CLV prédite à 12 mois par Segment Client",
+                    xaxis_title="Part du Chiffre d'Affaires (%)" if clv is None else "Part de la CLV prédite (%)",
                     height=400,
                     showlegend=False
                 )
@@ -139,11 +162,18 @@ def render_global_performance_tab(df_filtered, df_original):
                 for segment in ['VIP', 'Moyen', 'Base']:
                     if segment in segments.index:
                         data = segments.loc[segment]
-                        st.metric(
-                            label=f"**{segment}** ({data['Nb_Clients']} clients)",
-                            value=f"{data['Part_CA']}% du CA",
-                            delta=f"{data['CA_Moyen']:,.0f}€/client"
-                        )
+                        if clv is None:
+                            st.metric(
+                                label=f"**{segment}** ({data['Nb_Clients']} clients)",
+                                value=f"{data['Part_CA']}% du CA",
+                                delta=f"{data['CA_Moyen']:,.0f}€/client"
+                            )
+                        else:
+                            st.metric(
+                                label=f"**{segment}** ({data['Nb_Clients']} clients)",
+                                value=f"{data['Part_CLV']}% de la CLV",
+                                delta=f"{data['CLV_Moyenne']:,.0f}€/client prédits"
+                            )
         else:
             st.info("Aucune donnée client disponible avec les filtres actuels")
     else:
@@ -213,6 +243,9 @@ def render_global_performance_tab(df_filtered, df_original):
     if not df_filtered.empty:
         recap_df = _create_executive_dashboard(df_filtered, ca_total, panier_moyen, croissance, part_classic_cars, part_usa, part_top_client, nom_top_client, taux_reussite, part_ca_risque, total_commandes)
         st.dataframe(recap_df, use_container_width=True, hide_index=True)
+        
+        # Décomposition de l'écart de CA vs N-1
+        _render_revenue_bridge()
     else:
         st.info("Aucune donnée disponible pour le tableau exécutif avec les filtres actuels")
     
@@ -270,6 +303,18 @@ def render_global_performance_tab(df_filtered, df_original):
 # FONCTIONS AUXILIAIRES
 # ==============================================================================
 
+def _format_delta(comparaison, indicateur, en_points=False):
+    """
+    Libellé de l'écart à date vs N-1 d'un indicateur, avec sa période : la
+    valeur affichée couvre toute la sélection, l'écart la dernière année à
+    date (None sans période de référence).
+    """
+    ecart = kpi_delta(comparaison, indicateur, en_points)
+    if ecart is None:
+        return None
+    periode = f"{comparaison['annee']} à date vs {comparaison['annee'] - 1} à date"
+    return f"{ecart:+.1f} pts ({periode})" if en_points else f"{ecart:+.1f}% ({periode})"
+
 def _render_strategic_analysis(ca_total, panier_moyen, croissance, part_classic_cars, part_usa, part_top_client, nom_top_client, taux_reussite, df_filtered):
     """Affiche l'analyse stratégique et les recommandations"""
     with st.expander("📋 ANALYSE STRATÉGIQUE ET RECOMMANDATIONS"):
@@ -287,7 +332,7 @@ def _render_strategic_analysis(ca_total, panier_moyen, croissance, part_classic_
         - **Dépendance produit** : {part_classic_cars:.1f}% du CA sur Classic Cars
         - **Concentration géographique** : {part_usa:.1f}% du CA sur le marché USA
         - **Dépendance client** : {part_top_client:.1f}% du CA avec {nom_top_client}
-        - **Croissance** : {croissance:+.1f}% sur la période
+        - **Croissance** : {croissance:+.1f}% à date vs même période N-1
         
         **💡 RECOMMANDATIONS STRATÉGIQUES :**
         1. **Diversification produits** : Réduire la dépendance aux Classic Cars
@@ -296,6 +341,43 @@ def _render_strategic_analysis(ca_total, panier_moyen, croissance, part_classic_
         4. **Optimisation opérationnelle** : Maintenir le taux de réussite de {taux_reussite:.1f}%
         """)
 
+def _render_revenue_bridge():
+    """Affiche le pont prix / volume / mix de l'écart de CA vs même période N-1"""
+    st.markdown("**🌉 DÉCOMPOSITION DE L'ÉCART DE CA (PRIX / VOLUME / MIX)**")
+    
+    dimensions = {'Pays': 'Pays', 'Clients': 'Nom_du_Client'}
+    choix = st.radio("Mix géographique ou client", list(dimensions), horizontal=True, key="pvm_dimension")
+    pont = get_pvm_bridge(get_session_filters(), dimensions[choix])
+    if pont is None:
+        st.info("Pas de période N-1 comparable pour la sélection actuelle")
+        return
+    
+    totaux = pont['produits'][['CA_Reference'] + EFFETS + ['CA_Compare']].sum()
+    libelles = {'Volume': 'Volume', 'Mix produits': 'Mix produits', 'Mix dimension': f"Mix {choix.lower()}", 'Prix': 'Prix'}
+    annee, date_limite = pont['annee'], pont['date_limite']
+    
+    fig = go.Figure(go.Waterfall(
+        x=[f"CA {annee - 1}"] + [libelles[e] for e in EFFETS] + [f"CA {annee}"],
+        measure=['absolute'] + ['relative'] * len(EFFETS) + ['total'],
+        y=[totaux['CA_Reference']] + [totaux[e] for e in EFFETS] + [totaux['CA_Compare']],
+        text=[f"{totaux['CA_Reference']:,.0f} €"] + [f"{totaux[e]:+,.0f} €" for e in EFFETS] + [f"{totaux['CA_Compare']:,.0f} €"],
+        textposition='outside',
+        connector=dict(line=dict(color='rgb(120, 120, 120)'))
+    ))
+    fig.update_layout(
+        title=f"Pont de CA : 1er janvier - {date_limite:%d/%m}, {annee - 1} vs {annee}",
+        yaxis_title="Chiffre d'Affaires (€)",
+        height=450,
+        showlegend=False
+    )
+    st.plotly_chart(fig, use_container_width=True, key="global_pont_pvm")
+    
+    # Effets par gamme
+    gammes = pont['gammes'][['CA_Reference'] + EFFETS + ['CA_Compare']].rename(columns={
+        'CA_Reference': f"CA {annee - 1}", 'CA_Compare': f"CA {annee}", 'Mix dimension': libelles['Mix dimension']
+    })
+    st.dataframe(gammes.sort_values(f"CA {annee}", ascending=False).round(0), use_container_width=True)
+
 def _render_segment_strategies():
     """Affiche les stratégies par segment client"""
     with st.expander("💡 STRATÉGIES PAR SEGMENT"):
@@ -1,14 +1,22 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from utils.aggregations import aggregate_filtered
+from utils.basket import get_basket_rules, top_associations
+from utils.session_manager import get_session_filters
+from utils.discounts import get_discount_summary, DIMENSIONS_REMISE
+from utils.elasticity import get_price_elasticities
+from utils.moments import get_price_variability
+from components.charts import create_price_variability_chart, create_lorenz_chart
+from utils.pareto import abc_classes, abc_summary, lorenz_curve, concentration_indices, SEUILS_ABC
 
 def render_product_performance_tab(df_filtered, df_original):
     """Affiche l'onglet Performance Produits"""
     
     st.subheader("Performance par Gamme de Produits")
-    rentabilite_gammes = df_filtered.groupby('Gamme_de_Produits').agg({"Chiffre d'Affaires": 'sum'}).reset_index().sort_values("Chiffre d'Affaires", ascending=False)
+    rentabilite_gammes = aggregate_filtered(df_filtered, 'Gamme_de_Produits', {"Chiffre d'Affaires": 'sum'}).reset_index().sort_values("Chiffre d'Affaires", ascending=False)
     
     fig = px.bar(
         rentabilite_gammes, 
@@ -28,6 +36,14 @@ def render_product_performance_tab(df_filtered, df_original):
     st.subheader("Prix moyen des produits et variance des prix")
     _render_price_analysis(df_filtered)
     
+    # Remises vs prix conseil
+    st.subheader("🏷️ Remises vs Prix Conseil")
+    _render_discount_analysis()
+    
+    # Élasticité-prix des quantités par produit
+    st.subheader("📉 Élasticité-Prix par Produit")
+    _render_price_elasticity(df_filtered)
+    
     # Tendance des gammes de produits par trimestre
     st.subheader("Tendance des gammes de produits par trimestre")
     _render_product_trends(df_filtered)
@@ -36,19 +52,27 @@ def render_product_performance_tab(df_filtered, df_original):
     st.subheader("Croissance par gamme de produits")
     _render_product_growth(df_filtered)
     
+    # Classes ABC et concentration des produits
+    st.subheader("📊 Analyse ABC / Pareto des Produits")
+    _render_product_pareto(df_filtered)
+    
+    # Produits achetés ensemble
+    st.subheader("🛒 Produits Achetés Ensemble")
+    _render_basket_analysis(df_filtered)
+    
     # Tableau récapitulatif des performances par gamme
     _render_product_summary(df_filtered)
 
 def _render_product_quantity_vs_revenue(df_filtered):
     """Affiche les produits par quantité et chiffre d'affaires"""
-    produits_quantite = df_filtered.groupby('Code_Produit').agg({
+    produits_quantite = aggregate_filtered(df_filtered, 'Code_Produit', {
         'Quantité_Commandée':'sum',
         'Gamme_de_Produits':'first',
         'Prix Conseil':'first'
     }).nlargest(10, 'Quantité_Commandée')
     
     # Produits générant le plus de CA
-    produits_ca = df_filtered.groupby('Code_Produit').agg({
+    produits_ca = aggregate_filtered(df_filtered, 'Code_Produit', {
         'Chiffre d\'Affaires': 'sum',
         'Gamme_de_Produits': 'first',
         'Prix Conseil': 'first'
@@ -96,31 +120,90 @@ def _render_product_quantity_vs_revenue(df_filtered):
 
 def _render_price_analysis(df_filtered):
     """Affiche l'analyse des prix"""
-    prix_par_produit = df_filtered.groupby(['Code_Produit', 'Gamme_de_Produits']).agg({
-        'Prix_Unitaire': ['mean', 'std', 'min', 'max', 'count'],
-        'Prix Conseil': 'first'
-    }).round(2)
-    
-    # Aplatir les colonnes multi-niveaux
-    prix_par_produit.columns = ['Prix_Moyen', 'Ecart_Type', 'Prix_Min', 'Prix_Max', 'Nb_Ventes', 'Prix_Conseil']
+    # Moments fusionnés des cellules pré-agrégées (exacts, sans relire les lignes)
+    prix_par_produit = get_price_variability(get_session_filters()).round(2)
     
     # Trier par prix moyen décroissant
     prix_par_produit = prix_par_produit.sort_values('Prix_Moyen', ascending=False)
     
     # Graphique des écarts-types (variabilité des prix)
-    fig2 = px.bar(
-        prix_par_produit.nlargest(15, 'Ecart_Type').reset_index(),
-        x='Code_Produit',
-        y='Ecart_Type',
-        title='Produits avec la Plus Grande Variabilité de Prix (Top 15)',
-        labels={'Ecart_Type': 'Écart-Type des Prix (€)', 'Code_Produit': 'Produit'},
-        color='Ecart_Type'
-    )
+    fig2 = create_price_variability_chart(prix_par_produit, top_n=15)
     st.plotly_chart(fig2, use_container_width=True, key="produit_variabilite_prix")
 
+def _render_discount_analysis():
+    """Affiche la distribution des remises (prix réalisé vs prix conseil) par dimension"""
+    dimension = st.selectbox("Analyser les remises par", list(DIMENSIONS_REMISE), key="remise_dimension")
+    remises = get_discount_summary(get_session_filters(), dimension)
+    if remises.empty:
+        st.info("Aucune ligne de vente avec les filtres actuels")
+        return
+    
+    # Remise médiane et intervalle interdécile des valeurs les plus représentées (CA)
+    principales = remises.nlargest(15, "Chiffre d'Affaires").sort_values('P50', ascending=False)
+    fig = go.Figure(go.Bar(
+        x=principales.index.astype(str),
+        y=principales['P50'],
+        error_y=dict(
+            type='data', symmetric=False,
+            array=principales['P90'] - principales['P50'],
+            arrayminus=principales['P50'] - principales['P10']
+        ),
+        marker_color=principales['Remise_Ponderee_CA'],
+        marker_colorscale='RdYlGn_r',
+        name='Remise médiane'
+    ))
+    fig.update_layout(
+        title=f"Remise médiane (P10 - P90) par {dimension.lower()} - 15 premiers en CA",
+        xaxis_title=dimension,
+        yaxis_title="Remise vs prix conseil (%)",
+        height=450
+    )
+    st.plotly_chart(fig, use_container_width=True, key="produit_remises")
+    
+    st.caption("Remise = 1 - prix réalisé (CA / quantité) / prix conseil ; "
+               "une valeur négative indique une vente au-dessus du prix conseil")
+    st.dataframe(remises.sort_values("Chiffre d'Affaires", ascending=False).round(1), use_container_width=True)
+
+def _render_price_elasticity(df_filtered):
+    """Affiche le classement des élasticités-prix et le détail d'un produit"""
+    elasticites = get_price_elasticities(get_session_filters()).dropna(subset=['Elasticite'])
+    if elasticites.empty:
+        st.info("Pas assez de variations de prix pour estimer des élasticités")
+        return
+    
+    classement = elasticites.sort_values(['Confiance', 'Elasticite'])
+    st.caption("Élasticité = variation en % de la quantité commandée pour 1 % de variation du prix réalisé "
+               "(régression log-log par produit, intervalle de confiance à 95 %)")
+    st.dataframe(
+        classement[['Gamme_de_Produits', 'Elasticite', 'IC_Bas', 'IC_Haut', 'R2', 'Nb_Observations', 'Confiance']].round(3),
+        use_container_width=True
+    )
+    
+    # Détail d'un produit : nuage prix / quantité et droite ajustée
+    produit = st.selectbox("Détail du produit", list(classement.index), key="elasticite_produit")
+    lignes = df_filtered[df_filtered['Code_Produit'] == produit]
+    prix = lignes["Chiffre d'Affaires"] / lignes['Quantité_Commandée']
+    estimation = elasticites.loc[produit]
+    grille = np.linspace(prix.min(), prix.max(), 50)
+    constante = np.log(lignes['Quantité_Commandée']).mean() - estimation['Elasticite'] * np.log(prix).mean()
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=prix, y=lignes['Quantité_Commandée'], mode='markers', name='Lignes de commande', opacity=0.6))
+    fig.add_trace(go.Scatter(x=grille, y=np.exp(constante) * grille ** estimation['Elasticite'], mode='lines',
+                             name=f"Ajustement (élasticité {estimation['Elasticite']:+.2f})"))
+    fig.update_layout(
+        title=f"Quantité commandée vs prix réalisé - {produit} (confiance {estimation['Confiance'].lower()})",
+        xaxis_title="Prix unitaire réalisé (€)",
+        yaxis_title="Quantité commandée",
+        xaxis_type='log',
+        yaxis_type='log',
+        height=450
+    )
+    st.plotly_chart(fig, use_container_width=True, key="produit_elasticite")
+
 def _render_product_trends(df_filtered):
     """Affiche les tendances des produits par trimestre"""
-    tendance_gammes = df_filtered.groupby(['Année', 'Trimestre_ID', 'Gamme_de_Produits']).agg({
+    tendance_gammes = aggregate_filtered(df_filtered, ['Année', 'Trimestre_ID', 'Gamme_de_Produits'], {
         'Chiffre d\'Affaires': 'sum',
         'Numéro_Commande': 'nunique',
         'Quantité_Commandée': 'sum'
@@ -145,7 +228,7 @@ def _render_product_trends(df_filtered):
 
 def _render_product_growth(df_filtered):
     """Affiche la croissance par gamme de produits"""
-    tendance_gammes = df_filtered.groupby(['Année', 'Trimestre_ID', 'Gamme_de_Produits']).agg({
+    tendance_gammes = aggregate_filtered(df_filtered, ['Année', 'Trimestre_ID', 'Gamme_de_Produits'], {
         'Chiffre d\'Affaires': 'sum',
         'Numéro_Commande': 'nunique',
         'Quantité_Commandée': 'sum'
@@ -168,6 +251,80 @@ def _render_product_growth(df_filtered):
     fig.update_yaxes(tickformat=",.0f")
     st.plotly_chart(fig, use_container_width=True, key="produit_croissance_gamme")
 
+def _render_product_pareto(df_filtered):
+    """Affiche les classes ABC des produits, la courbe de Lorenz et la concentration par gamme"""
+    ca_produits = aggregate_filtered(df_filtered, ['Code_Produit', 'Gamme_de_Produits'], {
+        "Chiffre d'Affaires": 'sum'
+    })["Chiffre d'Affaires"]
+    classes = abc_classes(ca_produits)
+    resume = abc_summary(classes)
+    
+    col1, col2, col3 = st.columns(3)
+    for colonne, classe in zip([col1, col2, col3], ['A', 'B', 'C']):
+        with colonne:
+            st.metric(
+                f"Classe {classe}",
+                f"{resume.loc[classe, 'Nb_Elements']} produits",
+                delta=f"{resume.loc[classe, 'Part_CA']:.1f}% du CA",
+                delta_color="off"
+            )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = create_lorenz_chart(lorenz_curve(ca_produits), "Courbe de Lorenz du CA par Produit", "produits")
+        st.plotly_chart(fig, use_container_width=True, key="produit_lorenz")
+    with col2:
+        st.markdown("**Concentration du CA entre produits, par gamme**")
+        indices = concentration_indices(ca_produits.to_numpy(), ca_produits.index.get_level_values('Gamme_de_Produits'))
+        st.dataframe(indices.rename_axis('Gamme').round(3), use_container_width=True)
+    
+    st.caption(f"Classe A : produits couvrant les {SEUILS_ABC['A']:.0%} premiers du CA, "
+               f"B : jusqu'à {SEUILS_ABC['B']:.0%}, C : le reste. "
+               "Gini : 0 = CA également réparti, 1 = concentré ; HHI sur 10 000")
+    classement = classes.reset_index()
+    st.dataframe(classement[['Code_Produit', 'Gamme_de_Produits', 'Rang', 'Montant', 'Part', 'Part_Cumulee', 'Classe']].round(2),
+                 use_container_width=True, hide_index=True)
+
+def _render_basket_analysis(df_filtered):
+    """Affiche les associations entre gammes et entre produits (analyse de panier)"""
+    regles = get_basket_rules(df_filtered, get_session_filters())
+    regles_produits, _ = regles['produits']
+    regles_gammes, _ = regles['gammes']
+    
+    if regles_gammes.empty:
+        st.info("Pas assez de commandes multi-produits pour analyser les paniers")
+        return
+    
+    # Lift entre gammes : > 1 = gammes achetées ensemble plus souvent que par hasard
+    matrice_lift = regles_gammes.pivot(index='Antecedent', columns='Consequent', values='Lift')
+    fig_lift = px.imshow(
+        matrice_lift,
+        aspect='auto',
+        color_continuous_scale='RdBu_r',
+        color_continuous_midpoint=1,
+        labels=dict(x='Gamme associée', y='Gamme', color='Lift'),
+        title='Lift des Associations entre Gammes'
+    )
+    st.plotly_chart(fig_lift, use_container_width=True, key="produit_lift_gammes")
+    
+    colonnes_affichees = ['Antecedent', 'Consequent', 'Nb_Commandes', 'Support', 'Confiance', 'Lift']
+    gammes_produits = df_filtered.drop_duplicates('Code_Produit').set_index('Code_Produit')['Gamme_de_Produits']
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        gamme = st.selectbox("Gamme", sorted(gammes_produits.unique()), key="panier_gamme")
+        produits_gamme = gammes_produits.index[gammes_produits == gamme]
+        st.markdown(f"**Meilleures associations des produits {gamme}**")
+        st.dataframe(top_associations(regles_produits, produits_gamme)[colonnes_affichees].round(3))
+    with col2:
+        produits = sorted(regles_produits['Antecedent'].unique())
+        if produits:
+            produit = st.selectbox("Produit", produits, key="panier_produit")
+            st.markdown(f"**Produits le plus souvent achetés avec {produit}**")
+            st.dataframe(top_associations(regles_produits, [produit])[colonnes_affichees].round(3))
+        else:
+            st.info("Aucune paire de produits suffisamment fréquente")
+
 def _render_product_summary(df_filtered):
     """Affiche le tableau récapitulatif des performances par gamme"""
     st.subheader("📋 TABLEAU RÉCAPITULATIF DES PERFORMANCES PAR GAMME")
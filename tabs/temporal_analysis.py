@@ -2,15 +2,24 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from utils.ingestion import get_aggregate
+from utils.cube import slice_cube, rollup_cube
+from utils.session_manager import get_session_filters
+from utils.aggregations import aggregate_filtered
+from utils.forecasting import get_forecasts
+from utils.rolling import get_rolling_metrics, FENETRES_GLISSANTES
 
 def render_temporal_analysis_tab(df_filtered, df_original):
     """Affiche l'onglet Analyse Temporelle"""
     
     st.header("Analyse Temporelle des Ventes")
     
+    # Cellules du cube pré-agrégé correspondant aux filtres actifs
+    cube = slice_cube(get_aggregate('cube'), get_session_filters())
+    
     # Évolution Trimestrielle du Chiffre d'Affaires
     st.subheader("Évolution Trimestrielle du Chiffre d'Affaires")
-    evolution_temporelle = df_filtered.groupby(['Année', 'Trimestre_ID']).agg({"Chiffre d'Affaires": 'sum'}).reset_index()
+    evolution_temporelle = rollup_cube(cube, ['Année', 'Trimestre_ID'])
     evolution_temporelle['Période'] = 'T' + evolution_temporelle['Trimestre_ID'].astype(str) + ' ' + evolution_temporelle['Année'].astype(str)
     fig = px.line(evolution_temporelle, x='Période', y="Chiffre d'Affaires", 
                   labels={'Chiffre d\'Affaires': 'CA (€)', 'Période': 'Trimestre'}, 
@@ -23,7 +32,7 @@ def render_temporal_analysis_tab(df_filtered, df_original):
     noms_mois = {1: 'Jan', 2: 'Fév', 3: 'Mar', 4: 'Avr', 5: 'Mai', 6: 'Juin', 
                  7: 'Juil', 8: 'Août', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Déc'}
     
-    saison_mois_annee = df_filtered.groupby(['Année', 'Mois']).agg({"Chiffre d'Affaires": 'sum'}).reset_index()
+    saison_mois_annee = rollup_cube(cube, ['Année', 'Mois'])
     saison_mois_annee['Nom_Mois'] = saison_mois_annee['Mois'].map(noms_mois)
     saison_mois_annee['Nom_Mois'] = pd.Categorical(saison_mois_annee['Nom_Mois'], 
                                                    categories=noms_mois.values(), 
@@ -35,6 +44,12 @@ def render_temporal_analysis_tab(df_filtered, df_original):
                   title="Saisonnalité des Ventes par Mois et par Année")
     st.plotly_chart(fig, use_container_width=True, key="temporelle_saisonnalite")
     
+    # Prévisions Holt-Winters
+    _render_forecasts()
+    
+    # Cumuls glissants, moyennes mobiles et comparaisons N-1
+    _render_rolling_metrics()
+    
     # Tableau récapitulatif temporel
     _render_temporal_summary(df_filtered)
     
@@ -50,6 +65,118 @@ def render_temporal_analysis_tab(df_filtered, df_original):
     # Indicateurs clés temporels
     _render_temporal_kpis(df_filtered)
 
+def _render_forecasts():
+    """Affiche les prévisions de CA mensuel (Holt-Winters) avec intervalles"""
+    st.subheader("🔮 Prévisions du Chiffre d'Affaires Mensuel")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        niveau = st.selectbox("Niveau", ['Total', 'Gamme', 'Pays'], key="prevision_niveau")
+    with col2:
+        horizon = st.slider("Horizon (mois)", min_value=3, max_value=12, value=6, key="prevision_horizon")
+    
+    previsions = get_forecasts(get_session_filters(), horizon)
+    if previsions is None:
+        st.info("Aucune série à prévoir avec les filtres actuels")
+        return
+    
+    series = previsions['historique'].loc[niveau].index
+    with col3:
+        serie = st.selectbox("Série", list(series), key="prevision_serie")
+    
+    cle = (niveau, serie)
+    historique = previsions['historique'].loc[cle]
+    futur = previsions['previsions'].loc[cle]
+    bas, haut = previsions['bas'].loc[cle], previsions['haut'].loc[cle]
+    x_historique = historique.index.to_timestamp()
+    x_futur = futur.index.to_timestamp()
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x_historique, y=historique.values, mode='lines+markers', name='Historique'))
+    fig.add_trace(go.Scatter(
+        x=list(x_futur) + list(x_futur[::-1]),
+        y=list(haut.values) + list(bas.values[::-1]),
+        fill='toself', fillcolor='rgba(255, 127, 14, 0.2)', line=dict(width=0),
+        name='Intervalle 95 %', hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(x=x_futur, y=futur.values, mode='lines+markers', name='Prévision',
+                             line=dict(dash='dash', color='rgb(255, 127, 14)')))
+    fig.update_layout(
+        title=f"Prévision du CA mensuel - {serie}",
+        xaxis_title="Mois",
+        yaxis_title="Chiffre d'Affaires (€)",
+        height=450
+    )
+    st.plotly_chart(fig, use_container_width=True, key="temporelle_prevision")
+    
+    # Prévisions de toutes les séries du niveau
+    synthese = pd.DataFrame({
+        'CA prévu (horizon)': previsions['previsions'].loc[niveau].sum(axis=1),
+        'Borne basse': previsions['bas'].loc[niveau].sum(axis=1),
+        'Borne haute': previsions['haut'].loc[niveau].sum(axis=1)
+    }).join(previsions['parametres'].loc[niveau])
+    st.caption("Lissage exponentiel saisonnier (alpha niveau, beta tendance, gamma saisonnalité) "
+               "ajusté sur tout l'historique des pays et gammes sélectionnés")
+    st.dataframe(synthese.sort_values('CA prévu (horizon)', ascending=False).round(2))
+
+def _render_rolling_metrics():
+    """Affiche les cumuls glissants, moyennes mobiles et comparaisons N-1 alignées"""
+    st.subheader("📈 Cumuls Glissants et Comparaisons N-1")
+    
+    metriques = get_rolling_metrics(get_session_filters())
+    if metriques is None or metriques['mensuel'].shape[1] == 0:
+        st.info("Aucune série mensuelle avec les filtres actuels")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        niveau = st.selectbox("Niveau", ['Total', 'Gamme', 'Pays'], key="glissant_niveau")
+    with col2:
+        serie = st.selectbox("Série", list(metriques['mensuel'].loc[niveau].index), key="glissant_serie")
+    with col3:
+        vue = st.radio("Vue", ['Moyenne mobile', 'Cumul glissant'], horizontal=True, key="glissant_vue")
+    
+    cle = (niveau, serie)
+    mensuel = metriques['mensuel'].loc[cle]
+    x = mensuel.index.to_timestamp()
+    source = metriques['moyennes'] if vue == 'Moyenne mobile' else metriques['cumuls']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=x, y=mensuel.values, name='CA mensuel', opacity=0.4))
+    for w in FENETRES_GLISSANTES:
+        fig.add_trace(go.Scatter(x=x, y=source[w].loc[cle].values, mode='lines', name=f"{vue} {w} mois"))
+    fig.update_layout(
+        title=f"{vue} du CA - {serie}",
+        xaxis_title="Mois",
+        yaxis_title="Chiffre d'Affaires (€)",
+        height=450
+    )
+    st.plotly_chart(fig, use_container_width=True, key="temporelle_glissant")
+    
+    # Comparaison alignée sur la même période de l'année précédente
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=x, y=metriques['variation_mensuelle_n1'].loc[cle].values, name='Mois vs N-1'))
+    fig.add_trace(go.Scatter(x=x, y=metriques['variations_n1'][12].loc[cle].values, mode='lines+markers',
+                             name='Cumul 12 mois vs N-1'))
+    fig.update_layout(
+        title=f"Variation vs même période N-1 (%) - {serie}",
+        xaxis_title="Mois",
+        yaxis_title="Variation (%)",
+        height=400
+    )
+    st.plotly_chart(fig, use_container_width=True, key="temporelle_glissant_n1")
+    
+    # Dernier mois de toutes les séries du niveau
+    dernier = metriques['mensuel'].columns[-1]
+    synthese = pd.DataFrame({
+        f'Cumul {w} mois': metriques['cumuls'][w].loc[niveau, dernier] for w in FENETRES_GLISSANTES
+    })
+    for w in FENETRES_GLISSANTES:
+        synthese[f'Var. {w} mois vs N-1 (%)'] = metriques['variations_n1'][w].loc[niveau, dernier]
+    st.caption(f"Fenêtres se terminant en {dernier.strftime('%m/%Y')} ; les fenêtres et la période N-1 "
+               "s'appuient sur tout l'historique des pays et gammes sélectionnés")
+    st.dataframe(synthese.sort_values(f'Cumul {FENETRES_GLISSANTES[-1]} mois', ascending=False).round(1))
+
 def _render_temporal_summary(df_filtered):
     """Affiche le tableau récapitulatif temporel"""
     st.markdown("---")
@@ -82,7 +209,7 @@ def _render_quarterly_performance(df_filtered):
     """Affiche la performance par trimestre"""
     st.markdown("**📊 PERFORMANCE PAR TRIMESTRE**")
     
-    performance_trimestre = df_filtered.groupby(['Année', 'Trimestre_ID']).agg({
+    performance_trimestre = aggregate_filtered(df_filtered, ['Année', 'Trimestre_ID'], {
         "Chiffre d'Affaires": 'sum',
         'Numéro_Commande': 'nunique',
         'Quantité_Commandée': 'sum'
@@ -95,11 +222,20 @@ def _render_quarterly_performance(df_filtered):
     performance_trimestre['CA_Trimestre_Prec'] = performance_trimestre["Chiffre d'Affaires"].shift(1)
     performance_trimestre['Croissance_Trimestre'] = ((performance_trimestre["Chiffre d'Affaires"] - performance_trimestre['CA_Trimestre_Prec']) / performance_trimestre['CA_Trimestre_Prec']) * 100
     
+    # Croissance vs même trimestre N-1 : cumul glissant 3 mois au dernier mois du trimestre
+    metriques = get_rolling_metrics(get_session_filters())
+    fins_trimestre = [pd.Period(year=a, month=3 * t, freq='M') for a, t in zip(performance_trimestre['Année'], performance_trimestre['Trimestre_ID'])]
+    performance_trimestre['Croissance_N-1'] = (
+        metriques['variations_n1'][3].loc[('Total', 'Total')].reindex(fins_trimestre).to_numpy()
+        if metriques is not None else float('nan')
+    )
+    
     # Formatage affichage
-    display_trimestre = performance_trimestre[['Période', "Chiffre d'Affaires", 'Numéro_Commande', 'Quantité_Commandée', 'Croissance_Trimestre']].copy()
+    display_trimestre = performance_trimestre[['Période', "Chiffre d'Affaires", 'Numéro_Commande', 'Quantité_Commandée', 'Croissance_Trimestre', 'Croissance_N-1']].copy()
     display_trimestre["Chiffre d'Affaires"] = display_trimestre["Chiffre d'Affaires"].apply(lambda x: f"{x:,.0f} €")
     display_trimestre['Quantité_Commandée'] = display_trimestre['Quantité_Commandée'].apply(lambda x: f"{x:,}")
     display_trimestre['Croissance_Trimestre'] = display_trimestre['Croissance_Trimestre'].apply(lambda x: f"{x:+.1f}%" if pd.notna(x) else "N/A")
+    display_trimestre['Croissance_N-1'] = display_trimestre['Croissance_N-1'].apply(lambda x: f"{x:+.1f}%" if pd.notna(x) else "N/A")
     
     st.dataframe(display_trimestre, use_container_width=True, hide_index=True)
 
@@ -108,7 +244,7 @@ def _render_monthly_performance(df_filtered):
     st.markdown("---")
     st.subheader("📅 PERFORMANCE DÉTAILLÉE PAR MOIS")
     
-    performance_mois = df_filtered.groupby(['Année', 'Mois']).agg({
+    performance_mois = aggregate_filtered(df_filtered, ['Année', 'Mois'], {
         "Chiffre d'Affaires": 'sum',
         'Numéro_Commande': 'nunique',
         'Quantité_Commandée': 'sum',
@@ -131,6 +267,14 @@ def _render_monthly_performance(df_filtered):
     performance_mois['CA_Mois_Prec'] = performance_mois["Chiffre d'Affaires"].shift(1)
     performance_mois['Croissance_Mensuelle'] = ((performance_mois["Chiffre d'Affaires"] - performance_mois['CA_Mois_Prec']) / performance_mois['CA_Mois_Prec']) * 100
     
+    # Variation vs même mois N-1, alignée sur le calendrier (même si l'année précédente n'est pas filtrée)
+    metriques = get_rolling_metrics(get_session_filters())
+    mois_periodes = [pd.Period(year=a, month=m, freq='M') for a, m in zip(performance_mois['Année'], performance_mois['Mois'])]
+    performance_mois['Variation_N-1'] = (
+        metriques['variation_mensuelle_n1'].loc[('Total', 'Total')].reindex(mois_periodes).to_numpy()
+        if metriques is not None else float('nan')
+    )
+    
     moyenne_ca_mensuel = performance_mois["Chiffre d'Affaires"].mean()
     performance_mois['Performance_vs_Moyenne'] = ((performance_mois["Chiffre d'Affaires"] - moyenne_ca_mensuel) / moyenne_ca_mensuel * 100).round(1)
     performance_mois['Rang_Mois'] = performance_mois["Chiffre d'Affaires"].rank(ascending=False).astype(int)
@@ -139,7 +283,7 @@ def _render_monthly_performance(df_filtered):
     display_mois = performance_mois[[
         'Période', 'Rang_Mois', "Chiffre d'Affaires", 'Numéro_Commande', 
         'Quantité_Commandée', 'Nom_du_Client', 'CA_Moyen_Commande',
-        'Croissance_Mensuelle', 'Performance_vs_Moyenne'
+        'Croissance_Mensuelle', 'Variation_N-1', 'Performance_vs_Moyenne'
     ]].copy()
     
     display_mois["Chiffre d'Affaires"] = display_mois["Chiffre d'Affaires"].apply(lambda x: f"{x:,.0f} €")
@@ -148,6 +292,9 @@ def _render_monthly_performance(df_filtered):
     display_mois['Croissance_Mensuelle'] = display_mois['Croissance_Mensuelle'].apply(
         lambda x: f"{x:+.1f}%" if pd.notna(x) and abs(x) < 1000 else "N/A"
     )
+    display_mois['Variation_N-1'] = display_mois['Variation_N-1'].apply(
+        lambda x: f"{x:+.1f}%" if pd.notna(x) else "N/A"
+    )
     display_mois['Performance_vs_Moyenne'] = display_mois['Performance_vs_Moyenne'].apply(
         lambda x: f"{x:+.1f}%" if pd.notna(x) else "N/A"
     )
@@ -236,11 +383,11 @@ def _render_temporal_kpis(df_filtered):
     st.subheader("🎯 INDICATEURS CLÉS TEMPORELS")
     
     # Calcul des meilleures périodes
-    performance_trimestre = df_filtered.groupby(['Année', 'Trimestre_ID']).agg({"Chiffre d'Affaires": 'sum'}).reset_index()
+    performance_trimestre = aggregate_filtered(df_filtered, ['Année', 'Trimestre_ID'], {"Chiffre d'Affaires": 'sum'}).reset_index()
     performance_trimestre['Période'] = 'T' + performance_trimestre['Trimestre_ID'].astype(str) + ' ' + performance_trimestre['Année'].astype(str)
     meilleur_trimestre = performance_trimestre.loc[performance_trimestre["Chiffre d'Affaires"].idxmax()]
     
-    meilleur_mois_data = df_filtered.groupby(['Année', 'Mois']).agg({"Chiffre d'Affaires": 'sum'}).reset_index()
+    meilleur_mois_data = aggregate_filtered(df_filtered, ['Année', 'Mois'], {"Chiffre d'Affaires": 'sum'}).reset_index()
     meilleur_mois_data = meilleur_mois_data.loc[meilleur_mois_data["Chiffre d'Affaires"].idxmax()]
     noms_mois = {1: 'Janvier', 2: 'Février', 3: 'Mars', 4: 'Avril', 5: 'Mai', 6: 'Juin', 
                  7: 'Juillet', 8: 'Août', 9: 'Septembre', 10: 'Octobre', 11: 'Novembre', 12: 'Décembre'}
@@ -271,7 +418,7 @@ def _render_temporal_kpis(df_filtered):
         )
     
     with col4:
-        performance_annuelle = df_filtered.groupby('Année').agg({"Chiffre d'Affaires": 'sum'})
+        performance_annuelle = aggregate_filtered(df_filtered, 'Année', {"Chiffre d'Affaires": 'sum'})
         if len(performance_annuelle) >= 2:
             derniere_croissance = performance_annuelle.pct_change().iloc[-1].values[0] * 100
             tendance = "📈 Hausse" if derniere_croissance > 5 else "➡️ Stable" if derniere_croissance > -5 else "📉 Baisse"
@@ -285,7 +432,7 @@ def _render_temporal_kpis(df_filtered):
 def _render_temporal_recommendations(df_filtered):
     """Affiche les recommandations temporelles"""
     with st.expander("💡 ANALYSE ET RECOMMANDATIONS TEMPORELLES"):
-        performance_annuelle = df_filtered.groupby('Année').agg({"Chiffre d'Affaires": 'sum'})
+        performance_annuelle = aggregate_filtered(df_filtered, 'Année', {"Chiffre d'Affaires": 'sum'})
         
         if len(performance_annuelle) >= 2:
             derniere_croissance = performance_annuelle.pct_change().iloc[-1].values[0] * 100
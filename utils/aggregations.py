@@ -0,0 +1,37 @@
+from config import QUERY_BACKEND, PARALLEL_WORKERS, PARALLEL_MIN_ROWS
+from utils.sql_backend import query_frame_aggregate, supports_aggregates
+from utils.ingestion import get_aggregate
+from utils.kernels import kernel_aggregate, supports_kernels
+from utils.parallel import parallel_aggregate
+from utils.filters import filtered_positions
+
+# ==============================================================================
+# AGRÉGATIONS PARTAGÉES DES ONGLETS
+# ==============================================================================
+
+def group_aggregate(df, by, aggs, positions=None):
+    """
+    Équivalent de df.groupby(by).agg(aggs) avec une fonction par colonne,
+    calculé par les noyaux bincount quand toutes les fonctions sont supportées
+    (codes catégoriels du dataset partagé, maintenus à chaque ajout de lignes,
+    lus aux `positions` des lignes dans le dataset quand elles sont connues),
+    et réparti sur plusieurs processus pour les grands volumes.
+    """
+    if supports_kernels(df, aggs):
+        dictionnaire = get_aggregate('codes') if positions is not None else None
+        if PARALLEL_WORKERS > 1 and len(df) >= PARALLEL_MIN_ROWS:
+            return parallel_aggregate(df, by, aggs, dictionnaire, PARALLEL_WORKERS, positions=positions)
+        return kernel_aggregate(df, by, aggs, dictionnaire, positions)
+    return df.groupby(by).agg(aggs)
+
+def aggregate_filtered(df_filtered, by, aggs):
+    """
+    Agrégat par groupe des lignes de `df_filtered`.
+    Avec le moteur SQL, l'agrégat est exécuté par la base quand `df_filtered`
+    est exactement la tranche de ses années, pays et gammes.
+    """
+    if QUERY_BACKEND == 'sql' and supports_aggregates(by, aggs):
+        resultat = query_frame_aggregate(df_filtered, by, aggs)
+        if resultat is not None:
+            return resultat
+    return group_aggregate(df_filtered, by, aggs, filtered_positions(df_filtered))
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+from utils.comparisons import STATUTS_PROBLEMATIQUES
+
+# ==============================================================================
+# ATTRIBUTION DES COMMANDES PROBLÉMATIQUES PAR DIMENSION
+# ==============================================================================
+# Au chargement, chaque commande est dépliée en format long : une ligne par
+# (commande, gamme, dimension, valeur) avec le CA correspondant, pour toutes
+# les dimensions à la fois (pays, ville, client, gamme, produit, taille de
+# transaction, mois). Une commande « contient » une valeur si au moins une de
+# ses lignes la porte. Pour une sélection, un seul groupby sur (dimension,
+# valeur, commande) puis (dimension, valeur) donne pour chaque valeur de
+# chaque dimension le nombre de commandes, de commandes problématiques et le
+# CA à risque ; le taux de problèmes est comparé au taux de référence de la
+# sélection (lift) et les valeurs sont classées par problèmes excédentaires
+# (observés - attendus au taux de référence).
+
+NOMS_MOIS = {1: 'Janvier', 2: 'Février', 3: 'Mars', 4: 'Avril', 5: 'Mai', 6: 'Juin',
+             7: 'Juillet', 8: 'Août', 9: 'Septembre', 10: 'Octobre', 11: 'Novembre', 12: 'Décembre'}
+DIMENSIONS_ATTRIBUTION = {
+    'Pays': 'Pays',
+    'Ville': 'Ville',
+    'Client': 'Nom_du_Client',
+    'Gamme': 'Gamme_de_Produits',
+    'Produit': 'Code_Produit',
+    'Taille de transaction': 'Taille de Transaction',
+    'Mois': 'Mois'
+}
+CLES_ATTRIBUTION = ['Numéro_Commande', 'Année', 'Pays_Commande', 'Gamme_de_Produits', 'Statut', 'Dimension', 'Valeur']
+MIN_COMMANDES_ATTRIBUTION = 3
+
+def build_order_dimensions(df):
+    """CA de chaque (commande, gamme) pour chaque valeur de chaque dimension (format long)"""
+    valeurs = df[list(DIMENSIONS_ATTRIBUTION.values())].astype(str)
+    valeurs['Mois'] = df['Mois'].map(NOMS_MOIS)
+    nb_dimensions = len(DIMENSIONS_ATTRIBUTION)
+    longues = pd.DataFrame({
+        'Numéro_Commande': np.tile(df['Numéro_Commande'].to_numpy(), nb_dimensions),
+        'Année': np.tile(df['Année'].to_numpy(), nb_dimensions),
+        'Pays_Commande': np.tile(df['Pays'].to_numpy(), nb_dimensions),
+        'Gamme_de_Produits': np.tile(df['Gamme_de_Produits'].to_numpy(), nb_dimensions),
+        'Statut': np.tile(df['Statut'].to_numpy(), nb_dimensions),
+        'Dimension': np.repeat(list(DIMENSIONS_ATTRIBUTION), len(df)),
+        'Valeur': valeurs.to_numpy().ravel(order='F'),
+        "Chiffre d'Affaires": np.tile(df["Chiffre d'Affaires"].to_numpy(dtype=np.float64), nb_dimensions)
+    })
+    return longues.groupby(CLES_ATTRIBUTION, sort=False)["Chiffre d'Affaires"].sum().reset_index()
+
+def merge_order_dimensions(dimensions, dimensions_ajout):
+    """Fusionne le format long avec celui des lignes ajoutées (CA sommé)"""
+    fusion = pd.concat([dimensions, dimensions_ajout], ignore_index=True)
+    return fusion.groupby(CLES_ATTRIBUTION, sort=False)["Chiffre d'Affaires"].sum().reset_index()
+
+register_aggregate('dimensions_commandes', build_order_dimensions, merge_order_dimensions)
+
+def problem_attribution(dimensions, statuts):
+    """
+    Taux de problèmes, lift, CA à risque et problèmes excédentaires de chaque
+    valeur de chaque dimension, et taux de référence de la sélection.
+    """
+    lignes = dimensions.assign(Probleme=dimensions['Statut'].isin(statuts))
+    # Une ligne par (dimension, valeur, commande)
+    commandes = lignes.groupby(['Dimension', 'Valeur', 'Numéro_Commande'], sort=False).agg(
+        CA=("Chiffre d'Affaires", 'sum'), Probleme=('Probleme', 'first')
+    )
+    commandes['CA_A_Risque'] = commandes['CA'].where(commandes['Probleme'], 0.0)
+    scores = commandes.groupby(level=['Dimension', 'Valeur'], sort=False).agg(
+        Nb_Commandes=('Probleme', 'size'),
+        Nb_Problemes=('Probleme', 'sum'),
+        **{"Chiffre d'Affaires": ('CA', 'sum')},
+        CA_A_Risque=('CA_A_Risque', 'sum')
+    )
+    # Référence : chaque commande a exactement un pays
+    pays = scores.xs('Pays', level='Dimension')
+    total_commandes, total_problemes = pays['Nb_Commandes'].sum(), pays['Nb_Problemes'].sum()
+    taux_reference = total_problemes / total_commandes if total_commandes else np.nan
+
+    scores['Taux_Problemes'] = scores['Nb_Problemes'] / scores['Nb_Commandes'] * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores['Lift'] = scores['Taux_Problemes'] / (taux_reference * 100)
+        scores['Part_Problemes'] = scores['Nb_Problemes'] / total_problemes * 100
+    scores['Problemes_Excedentaires'] = scores['Nb_Problemes'] - scores['Nb_Commandes'] * taux_reference
+    scores['Part_CA_A_Risque'] = scores['CA_A_Risque'] / scores["Chiffre d'Affaires"] * 100
+    return scores.reset_index(), {
+        'taux_reference': taux_reference * 100,
+        'commandes': int(total_commandes),
+        'problemes': int(total_problemes),
+        'ca_a_risque': pays['CA_A_Risque'].sum()
+    }
+
+def top_drivers(scores, nb=10, min_commandes=MIN_COMMANDES_ATTRIBUTION):
+    """Valeurs sur-représentées dans les problèmes, classées par problèmes excédentaires puis CA à risque"""
+    candidats = scores[(scores['Nb_Commandes'] >= min_commandes) & (scores['Lift'] > 1)]
+    return candidats.sort_values(['Problemes_Excedentaires', 'CA_A_Risque'], ascending=False).head(nb)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_problem_attribution(version, years, countries, productlines, statuts):
+    """Attribution des problèmes pour une sélection, mise en cache par version des données"""
+    dimensions = get_aggregate('dimensions_commandes')
+    selection = dimensions[
+        dimensions['Année'].isin(years) &
+        dimensions['Pays_Commande'].isin(countries) &
+        dimensions['Gamme_de_Produits'].isin(productlines)
+    ]
+    if selection.empty:
+        return None
+    scores, reference = problem_attribution(selection, list(statuts))
+    return {'scores': scores, **reference}
+
+def get_problem_attribution(filters, statuts=tuple(STATUTS_PROBLEMATIQUES)):
+    """
+    Scores de chaque valeur de chaque dimension pour les commandes aux statuts
+    donnés (litiges et annulations par défaut) et taux de référence.
+    """
+    return _cached_problem_attribution(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        tuple(statuts)
+    )
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+from utils.customers import slice_orders
+
+# ==============================================================================
+# TRANCHES DE TRANSACTION CONFIGURABLES (HISTOGRAMMES DE MONTANTS)
+# ==============================================================================
+# Les montants (lignes de commande, ou commandes entières) sont pré-classés
+# dans un histogramme fin à pas fixe (PAS_MONTANT €) par cellule de filtre :
+# nombre et CA de chaque classe, stockés en format long (seules les classes
+# non vides existent). Pour une sélection, les classes des cellules retenues
+# sont sommées une fois ; toute découpe en tranches dont les bornes sont des
+# multiples du pas se lit ensuite exactement par différences de sommes
+# cumulées, sans relire les lignes.
+
+PAS_MONTANT = 50.0
+SEUILS_TAILLE = [3000.0, 7000.0]  # bornes Small / Medium / Large de l'export
+LIBELLES_TAILLE = ['Small', 'Medium', 'Large']
+NIVEAU_LIGNE = 'Ligne de commande'
+NIVEAU_COMMANDE = 'Commande'
+CELLULE_LIGNES = ['Année', 'Pays', 'Gamme_de_Produits']
+CELLULE_COMMANDES = ['Année', 'Pays']
+NB_TRANCHES_MAX = 10
+
+def amount_class(montants):
+    """Classe d'histogramme de chaque montant"""
+    return np.floor(np.asarray(montants, dtype=np.float64) / PAS_MONTANT).astype(np.int64)
+
+def build_amount_histogram(cellules, montants):
+    """Nombre et CA par cellule et classe de montant (format long)"""
+    lignes = cellules.assign(Classe=amount_class(montants), n=1, ca=np.asarray(montants, dtype=np.float64))
+    return lignes.groupby(list(cellules.columns) + ['Classe'], sort=True)[['n', 'ca']].sum()
+
+def build_line_histogram(df):
+    """Histogramme des montants de ligne par cellule de filtre"""
+    return build_amount_histogram(df[CELLULE_LIGNES], df["Chiffre d'Affaires"].to_numpy())
+
+def merge_line_histograms(histogramme, histogramme_ajout):
+    """Fusionne l'histogramme des lignes avec celui des lignes ajoutées"""
+    return histogramme.add(histogramme_ajout, fill_value=0)
+
+register_aggregate('histogramme_lignes', build_line_histogram, merge_line_histograms)
+
+def band_table(histogramme, seuils, libelles):
+    """
+    CA et effectif de chaque tranche [seuil_k, seuil_k+1[ à partir d'un
+    histogramme (classes triées, n, ca), par sommes cumulées.
+    """
+    classes = histogramme.index.to_numpy()
+    cumul_n = np.concatenate(([0], np.cumsum(histogramme['n'].to_numpy())))
+    cumul_ca = np.concatenate(([0.0], np.cumsum(histogramme['ca'].to_numpy())))
+    positions = np.concatenate(([0], np.searchsorted(classes, amount_class(seuils), side='left'), [len(classes)]))
+    bornes = np.concatenate(([0.0], seuils, [np.inf]))
+    return pd.DataFrame({
+        'Tranche': libelles,
+        'Borne_Basse': bornes[:-1],
+        'Borne_Haute': bornes[1:],
+        "Chiffre d'Affaires": np.diff(cumul_ca[positions]),
+        'Nombre': np.diff(cumul_n[positions]).astype(np.int64)
+    })
+
+def equal_count_thresholds(histogramme, nb_tranches):
+    """Bornes (multiples du pas) découpant les montants en tranches de même effectif"""
+    cumul = np.cumsum(histogramme['n'].to_numpy())
+    cibles = cumul[-1] * np.arange(1, nb_tranches) / nb_tranches
+    positions = np.minimum(np.searchsorted(cumul, cibles, side='left') + 1, len(cumul) - 1)
+    return np.unique(histogramme.index.to_numpy()[positions]) * PAS_MONTANT
+
+def default_thresholds(candidats, maximum, nb=len(SEUILS_TAILLE)):
+    """
+    `nb` bornes strictement croissantes, multiples du pas, dans [0, maximum] :
+    les candidates si elles sont assez nombreuses une fois ramenées à la
+    plage, sinon des bornes régulièrement espacées sur la plage.
+    """
+    grille = np.arange(0.0, maximum + PAS_MONTANT / 2, PAS_MONTANT)
+    seuils = np.unique(np.clip(np.round(np.asarray(candidats, dtype=np.float64) / PAS_MONTANT) * PAS_MONTANT, 0.0, maximum))
+    if len(seuils) >= nb:
+        return [float(s) for s in seuils[:nb]]
+    positions = np.unique(np.round(np.linspace(0, len(grille) - 1, nb + 2)[1:-1]).astype(np.int64))
+    if len(positions) < nb:
+        positions = np.round(np.linspace(0, len(grille) - 1, nb)).astype(np.int64)
+    return [float(s) for s in grille[positions]]
+
+def band_labels(seuils):
+    """Libellés des tranches délimitées par des seuils croissants"""
+    bornes = [0.0] + list(seuils) + [None]
+    return [
+        f"T{k + 1} : {bas:,.0f} - {haut:,.0f} €" if haut is not None else f"T{k + 1} : ≥ {bas:,.0f} €"
+        for k, (bas, haut) in enumerate(zip(bornes[:-1], bornes[1:]))
+    ]
+
+def _select_cells(histogramme, filters):
+    """Classes des cellules correspondant aux filtres, sommées par classe"""
+    index = histogramme.index
+    masque = index.get_level_values('Année').isin(filters['years']) & index.get_level_values('Pays').isin(filters['countries'])
+    if 'Gamme_de_Produits' in index.names:
+        masque &= index.get_level_values('Gamme_de_Produits').isin(filters['productlines'])
+    return histogramme[masque].groupby(level='Classe').sum()
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_order_histogram(version):
+    """Histogramme des montants de commande (toutes gammes) par année et pays"""
+    table = get_aggregate('orders')
+    commandes = table['commandes']
+    return build_amount_histogram(commandes[CELLULE_COMMANDES], table['ca'].sum(axis=1).to_numpy())
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_amount_histogram(version, years, countries, productlines, niveau):
+    """Histogramme des montants d'une sélection, mis en cache par version des données"""
+    filters = {'years': list(years), 'countries': list(countries), 'productlines': list(productlines)}
+    if niveau == NIVEAU_LIGNE:
+        return _select_cells(get_aggregate('histogramme_lignes'), filters)
+    gammes = get_aggregate('orders')['ca'].columns
+    if set(gammes) <= set(productlines):
+        return _select_cells(_cached_order_histogram(version), filters)
+    # Sélection partielle des gammes : montants restreints lus dans la table des commandes
+    commandes = slice_orders(get_aggregate('orders'), filters)
+    return build_amount_histogram(pd.DataFrame(index=commandes.index), commandes["Chiffre d'Affaires"].to_numpy())
+
+def get_amount_histogram(filters, niveau=NIVEAU_LIGNE):
+    """Histogramme fin (pas PAS_MONTANT) des montants de ligne ou de commande pour les filtres"""
+    return _cached_amount_histogram(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        niveau
+    )
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.kernels import TAILLE_MAX_DENSE
+
+# ==============================================================================
+# ANALYSE DE PANIER (CO-OCCURRENCES PRODUITS)
+# ==============================================================================
+# Les lignes de commande forment une matrice d'incidence creuse commande x
+# produit au format CSR (indptr, indices), construite en NumPy. Le produit
+# AᵀA donne les co-occurrences : il est calculé par blocs de commandes en
+# énumérant les paires de chaque ligne CSR, avec un nombre de paires borné
+# par bloc, ce qui garde la mémoire constante quel que soit le volume.
+
+TAILLE_BLOC_PAIRES = 1 << 22  # paires de produits énumérées par bloc
+MIN_COMMANDES_PAIRE = 2       # support minimal (en commandes) d'une association
+
+def _sorted_unique(valeurs, return_counts=False):
+    """Valeurs distinctes triées (tri + comparaison des voisins, plus rapide que np.unique)"""
+    valeurs = np.sort(valeurs)
+    debuts = np.flatnonzero(np.concatenate(([True], valeurs[1:] != valeurs[:-1])))
+    if return_counts:
+        return valeurs[debuts], np.diff(np.append(debuts, len(valeurs)))
+    return valeurs[debuts]
+
+def build_incidence(commandes, articles):
+    """
+    Matrice d'incidence binaire commande x article au format CSR.
+    Retourne (indptr, indices, articles_uniques, n_commandes).
+    """
+    codes_commandes, _ = pd.factorize(commandes, sort=True)
+    codes_articles, uniques = pd.factorize(articles, sort=True)
+    # Tri par commande puis article, doublons (même article sur deux lignes) retirés
+    cles = _sorted_unique(codes_commandes.astype(np.int64) * len(uniques) + codes_articles)
+    lignes, indices = np.divmod(cles, len(uniques))
+    n_commandes = int(codes_commandes.max()) + 1 if len(codes_commandes) else 0
+    indptr = np.zeros(n_commandes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(lignes, minlength=n_commandes), out=indptr[1:])
+    return indptr, indices, pd.Index(uniques), n_commandes
+
+def _row_pairs(indptr, indices, debut, fin):
+    """Paires (i < j) d'articles présents ensemble dans les commandes [debut, fin)"""
+    longueurs = np.diff(indptr[debut:fin + 1])
+    positions = np.arange(indptr[debut], indptr[fin])
+    # Chaque élément est apparié aux éléments suivants de sa ligne
+    suivants = np.repeat(indptr[debut + 1:fin + 1], longueurs) - positions - 1
+    total = int(suivants.sum())
+    premiers = np.repeat(positions, suivants)
+    departs = np.cumsum(suivants) - suivants
+    decalages = np.arange(total) - np.repeat(departs, suivants) + 1
+    return indices[premiers], indices[premiers + decalages]
+
+def cooccurrences(indptr, indices, n_articles):
+    """
+    Co-occurrences des paires d'articles (triangle supérieur de AᵀA),
+    sous forme (i, j, nombre de commandes communes).
+    """
+    longueurs = np.diff(indptr)
+    paires_cumulees = np.cumsum(longueurs * (longueurs - 1) // 2)
+    dense = n_articles * n_articles <= TAILLE_MAX_DENSE
+    comptes = np.zeros(n_articles * n_articles, dtype=np.int64) if dense else None
+    codes_cumules, comptes_cumules = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    debut = 0
+    while debut < len(longueurs):
+        # Bloc de commandes dont les paires tiennent dans TAILLE_BLOC_PAIRES
+        deja = paires_cumulees[debut - 1] if debut else 0
+        fin = int(np.searchsorted(paires_cumulees, deja + TAILLE_BLOC_PAIRES, side='right'))
+        fin = max(fin, debut + 1)
+        i, j = _row_pairs(indptr, indices, debut, fin)
+        codes = i * n_articles + j
+        if dense:
+            comptes += np.bincount(codes, minlength=n_articles * n_articles)
+        else:
+            codes, nombres = _sorted_unique(codes, return_counts=True)
+            # Fusion avec les comptes des blocs précédents (codes triés)
+            tous = np.concatenate([codes_cumules, codes])
+            ordre = np.argsort(tous, kind='stable')
+            tous, poids = tous[ordre], np.concatenate([comptes_cumules, nombres])[ordre]
+            debuts = np.flatnonzero(np.concatenate(([True], tous[1:] != tous[:-1])))
+            codes_cumules, comptes_cumules = tous[debuts], np.add.reduceat(poids, debuts)
+        debut = fin
+
+    if dense:
+        codes_cumules = np.flatnonzero(comptes)
+        comptes_cumules = comptes[codes_cumules]
+    i, j = np.divmod(codes_cumules, n_articles)
+    return i, j, comptes_cumules
+
+def association_rules(commandes, articles, min_commandes=MIN_COMMANDES_PAIRE):
+    """
+    Règles d'association A -> B entre articles : support, confiance et lift,
+    dans les deux sens pour chaque paire fréquente.
+    """
+    indptr, indices, uniques, n_commandes = build_incidence(commandes, articles)
+    colonnes = ['Antecedent', 'Consequent', 'Nb_Commandes', 'Support', 'Confiance', 'Lift']
+    if n_commandes == 0:
+        return pd.DataFrame(columns=colonnes), pd.Series(dtype='float64')
+
+    frequences = np.bincount(indices, minlength=len(uniques))
+    i, j, communes = cooccurrences(indptr, indices, len(uniques))
+    frequentes = communes >= min_commandes
+    i, j, communes = i[frequentes], j[frequentes], communes[frequentes]
+
+    # Chaque paire donne deux règles (i -> j et j -> i)
+    antecedents = np.concatenate([i, j])
+    consequents = np.concatenate([j, i])
+    communes = np.concatenate([communes, communes])
+    regles = pd.DataFrame({
+        'Antecedent': uniques.take(antecedents),
+        'Consequent': uniques.take(consequents),
+        'Nb_Commandes': communes,
+        'Support': communes / n_commandes,
+        'Confiance': communes / frequences[antecedents],
+        'Lift': communes * n_commandes / (frequences[antecedents] * frequences[consequents].astype(np.float64))
+    }, columns=colonnes)
+    supports = pd.Series(frequences / n_commandes, index=uniques, name='Support')
+    return regles.sort_values(['Lift', 'Nb_Commandes'], ascending=False, ignore_index=True), supports
+
+def top_associations(regles, antecedents=None, n=10):
+    """Meilleures associations (par lift) des articles antécédents donnés"""
+    if antecedents is not None:
+        regles = regles[regles['Antecedent'].isin(antecedents)]
+    return regles.head(n)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_basket_rules(_df_filtered, version, years, countries, productlines):
+    """Règles des lignes filtrées, mises en cache par version et filtres (dataframe non haché)"""
+    commandes = _df_filtered['Numéro_Commande']
+    return {
+        'produits': association_rules(commandes, _df_filtered['Code_Produit']),
+        'gammes': association_rules(commandes, _df_filtered['Gamme_de_Produits'], min_commandes=1)
+    }
+
+def get_basket_rules(df_filtered, filters):
+    """Règles d'association entre produits et entre gammes pour les filtres de session"""
+    return _cached_basket_rules(
+        df_filtered,
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines'])
+    )
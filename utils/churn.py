@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate
+from utils.customers import get_reference_date
+
+# ==============================================================================
+# INACTIVITÉ ET RISQUE D'ATTRITION CLIENT
+# ==============================================================================
+# Index des dates d'achat par client au format CSR : les jours d'achat
+# distincts de tous les clients sont triés (client, date) dans un seul
+# tableau, et debuts[i]:debuts[i + 1] délimite ceux du client i. La dernière
+# date d'achat est dates[debuts[i + 1] - 1]. Les intervalles entre achats
+# sont des différences de voisins dans un même segment, et leurs
+# statistiques (moyenne, écart-type, médiane, maximum) sont calculées pour
+# tous les clients à la fois par np.bincount et tri segmenté. Les clients
+# ayant trop peu d'achats sont comparés au rythme médian de la population.
+
+K_ECART_TYPE = 2.0            # seuil : intervalle moyen + K écarts-types
+RATIO_RYTHME_MIN = 1.5        # et au moins 1,5 fois l'intervalle médian
+MIN_INTERVALLES_RYTHME = 2    # intervalles nécessaires pour un rythme propre au client
+NIVEAUX_RISQUE = ['Élevé', 'Modéré', 'Faible']
+
+def build_purchase_index(commandes):
+    """
+    Index des jours d'achat par client : noms des clients, débuts de segment,
+    dates (jours depuis l'époque) et CA de chaque jour d'achat.
+    """
+    achats = commandes.groupby(['Nom_du_Client', 'Date_Commande'], sort=True)["Chiffre d'Affaires"].sum()
+    codes, clients = pd.factorize(achats.index.get_level_values('Nom_du_Client'), sort=True)
+    debuts = np.zeros(len(clients) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(clients)), out=debuts[1:])
+    jours = achats.index.get_level_values('Date_Commande').to_numpy().astype('datetime64[D]').astype(np.int64)
+    return {
+        'clients': pd.Index(clients, name='Nom_du_Client'),
+        'debuts': debuts,
+        'jours': jours,
+        'ca': achats.to_numpy(dtype=np.float64)
+    }
+
+def purchase_dates(index, client):
+    """Dates d'achat d'un client (tableau trié)"""
+    i = index['clients'].get_loc(client)
+    return index['jours'][index['debuts'][i]:index['debuts'][i + 1]].astype('datetime64[D]')
+
+def interval_statistics(index):
+    """Statistiques des intervalles entre achats (jours) de tous les clients"""
+    debuts, jours = index['debuts'], index['jours']
+    n_clients = len(debuts) - 1
+    nb_achats = np.diff(debuts)
+    codes = np.repeat(np.arange(n_clients), nb_achats)
+    # Intervalle entre un achat et le suivant du même client
+    meme_client = codes[1:] == codes[:-1]
+    intervalles = (jours[1:] - jours[:-1])[meme_client].astype(np.float64)
+    codes_intervalles = codes[1:][meme_client]
+
+    nb = np.bincount(codes_intervalles, minlength=n_clients)
+    somme = np.bincount(codes_intervalles, weights=intervalles, minlength=n_clients)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moyenne = somme / nb
+        ecarts = intervalles - moyenne[codes_intervalles]
+        variance = np.bincount(codes_intervalles, weights=ecarts ** 2, minlength=n_clients) / (nb - 1)
+    # Médiane : intervalles triés dans chaque segment, éléments centraux
+    ordre = np.lexsort((intervalles, codes_intervalles))
+    tries = intervalles[ordre]
+    departs = np.concatenate(([0], np.cumsum(nb)[:-1]))
+    haut = np.minimum(departs + nb // 2, max(len(tries) - 1, 0))
+    bas = np.minimum(departs + (nb - 1) // 2, max(len(tries) - 1, 0))
+    mediane = np.where(nb > 0, (tries[bas] + tries[haut]) / 2, np.nan) if len(tries) else np.full(n_clients, np.nan)
+    maximum = np.full(n_clients, np.nan)
+    if len(intervalles):
+        np.fmax.at(maximum, codes_intervalles, intervalles)
+    return pd.DataFrame({
+        'Nb_Achats': nb_achats,
+        'Nb_Intervalles': nb,
+        'Intervalle_Moyen': moyenne,
+        'Intervalle_Median': mediane,
+        'Ecart_Type_Intervalle': np.where(nb > 1, np.sqrt(variance), np.nan),
+        'Intervalle_Max': maximum
+    }, index=index['clients'])
+
+def churn_risk(index, date_reference):
+    """
+    Risque d'attrition de chaque client : écart depuis le dernier achat
+    rapporté à son rythme habituel, et CA annuel en jeu (panier moyen x
+    achats par an au rythme moyen).
+    """
+    stats = interval_statistics(index)
+    debuts = index['debuts']
+    derniers = index['jours'][debuts[1:] - 1]
+    ca_total = np.add.reduceat(index['ca'], debuts[:-1]) if len(index['ca']) else np.zeros(len(stats))
+    reference = np.datetime64(date_reference, 'D').astype(np.int64)
+
+    stats['Dernier_Achat'] = derniers.astype('datetime64[D]')
+    stats['Jours_Depuis_Dernier_Achat'] = reference - derniers
+    # Rythme de la population pour les clients sans historique suffisant
+    rythme_population = np.nanmedian(stats['Intervalle_Median']) if stats['Nb_Intervalles'].any() else np.nan
+    propre = stats['Nb_Intervalles'] >= MIN_INTERVALLES_RYTHME
+    rythme = stats['Intervalle_Median'].where(propre, rythme_population)
+    seuil = np.maximum(
+        stats['Intervalle_Moyen'] + K_ECART_TYPE * stats['Ecart_Type_Intervalle'],
+        RATIO_RYTHME_MIN * stats['Intervalle_Median']
+    ).where(propre, RATIO_RYTHME_MIN * rythme_population)
+    stats['Seuil_Inactivite'] = seuil
+    stats['Ratio_Rythme'] = stats['Jours_Depuis_Dernier_Achat'] / rythme
+    panier = ca_total / stats['Nb_Achats']
+    stats['CA_En_Jeu'] = panier * 365.25 / stats['Intervalle_Moyen'].where(propre, rythme_population)
+    stats['Rythme_Reference'] = np.where(propre, 'Client', 'Population')
+
+    ecart = stats['Jours_Depuis_Dernier_Achat']
+    stats['Risque'] = pd.Categorical(
+        np.select([ecart > seuil, ecart > rythme], NIVEAUX_RISQUE[:2], NIVEAUX_RISQUE[2]),
+        categories=NIVEAUX_RISQUE, ordered=True
+    )
+    return stats
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_purchase_index(version):
+    """Index des jours d'achat par client, construit une fois par version des données"""
+    table = get_aggregate('orders')
+    commandes = table['commandes'].assign(**{"Chiffre d'Affaires": table['ca'].sum(axis=1)})
+    return build_purchase_index(commandes)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_churn_risk(version):
+    """Risque d'attrition de tous les clients, mis en cache par version des données"""
+    return churn_risk(_cached_purchase_index(version), get_reference_date())
+
+def get_purchase_index():
+    """Index des jours d'achat par client (toutes commandes)"""
+    return _cached_purchase_index(get_data_version())
+
+def get_churn_risk():
+    """
+    Risque d'attrition de tous les clients sur l'historique complet de leurs
+    commandes, trié par risque puis par CA en jeu.
+    """
+    return _cached_churn_risk(get_data_version()).sort_values(
+        ['Risque', 'CA_En_Jeu'], ascending=[True, False]
+    )
@@ -0,0 +1,180 @@
+import numpy as np
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.customers import get_customer_features, PREFIXE_MIX
+
+# ==============================================================================
+# CLUSTERING COMPORTEMENTAL DES CLIENTS (K-MEANS MINI-BATCH)
+# ==============================================================================
+# Les caractéristiques clients sont standardisées (logarithme pour les montants
+# et comptages, très asymétriques), puis regroupées par k-means mini-batch :
+# chaque itération ne lit qu'un échantillon de clients, ce qui garde le coût
+# indépendant du nombre de clients. Le nombre de groupes est choisi par le
+# score de silhouette, estimé sur un échantillon.
+
+GROUPES_FEATURES = {
+    "Chiffre d'affaires": ["Chiffre d'Affaires"],
+    'Commandes': ['Nb_Commandes'],
+    'Panier moyen': ['Panier_Moyen'],
+    'Part premium': ['Part_Premium'],
+    'Mix gammes': [PREFIXE_MIX]  # toutes les colonnes de mix de la sélection
+}
+FEATURES_LOG = ["Chiffre d'Affaires", 'Nb_Commandes', 'Panier_Moyen']
+K_CANDIDATS = range(2, 9)
+TAILLE_LOT = 1024
+TAILLE_ECHANTILLON_SILHOUETTE = 2000
+
+def feature_matrix(features, groupes):
+    """Matrice standardisée des caractéristiques retenues et noms de colonnes"""
+    colonnes = []
+    for groupe in groupes:
+        for colonne in GROUPES_FEATURES[groupe]:
+            if colonne == PREFIXE_MIX:
+                colonnes.extend(c for c in features.columns if c.startswith(PREFIXE_MIX))
+            else:
+                colonnes.append(colonne)
+    X = features[colonnes].to_numpy(dtype=np.float64, na_value=0.0)
+    X = np.nan_to_num(X)
+    log = [j for j, c in enumerate(colonnes) if c in FEATURES_LOG]
+    X[:, log] = np.log1p(np.maximum(X[:, log], 0))
+    ecarts = X.std(axis=0)
+    X = (X - X.mean(axis=0)) / np.where(ecarts > 0, ecarts, 1.0)
+    return X, colonnes
+
+def _squared_distances(X, centres):
+    """Distances euclidiennes au carré entre points et centres"""
+    distances = (X ** 2).sum(axis=1)[:, None] - 2 * X @ centres.T + (centres ** 2).sum(axis=1)[None, :]
+    return np.maximum(distances, 0)
+
+def _init_centres(X, k, rng):
+    """Initialisation k-means++ gloutonne (meilleur de plusieurs tirages) sur un échantillon"""
+    echantillon = X[rng.choice(len(X), min(len(X), 10 * TAILLE_LOT), replace=False)]
+    n_essais = 2 + int(np.log(k))
+    centres = [echantillon[rng.integers(len(echantillon))]]
+    distances = _squared_distances(echantillon, np.array(centres))[:, 0]
+    for _ in range(1, k):
+        total = distances.sum()
+        if total > 0:
+            candidats = rng.choice(len(echantillon), size=n_essais, p=distances / total)
+        else:
+            candidats = rng.integers(len(echantillon), size=n_essais)
+        # Candidat qui réduit le plus la somme des distances au centre le plus proche
+        nouvelles = np.minimum(distances[:, None], _squared_distances(echantillon, echantillon[candidats]))
+        meilleur = nouvelles.sum(axis=0).argmin()
+        centres.append(echantillon[candidats[meilleur]])
+        distances = nouvelles[:, meilleur]
+    return np.array(centres)
+
+def assign_clusters(X, centres, taille_bloc=65536):
+    """Groupe le plus proche de chaque point, par blocs pour borner la mémoire"""
+    labels = np.empty(len(X), dtype=np.int64)
+    for debut in range(0, len(X), taille_bloc):
+        labels[debut:debut + taille_bloc] = _squared_distances(X[debut:debut + taille_bloc], centres).argmin(axis=1)
+    return labels
+
+def minibatch_kmeans(X, k, max_iter=100, tol=1e-4, seed=0):
+    """
+    K-means mini-batch : chaque lot déplace les centres vers la moyenne de ses
+    points, pondérée par le nombre de points déjà affectés à chaque centre.
+    """
+    rng = np.random.default_rng(seed)
+    centres = _init_centres(X, k, rng)
+    effectifs = np.zeros(k)
+    for _ in range(max_iter):
+        lot = X[rng.integers(len(X), size=min(TAILLE_LOT, len(X)))]
+        labels = _squared_distances(lot, centres).argmin(axis=1)
+        comptes = np.bincount(labels, minlength=k)
+        sommes = np.zeros_like(centres)
+        np.add.at(sommes, labels, lot)
+        effectifs_nouveaux = effectifs + comptes
+        actifs = comptes > 0
+        anciens = centres.copy()
+        centres[actifs] = (
+            (centres[actifs] * effectifs[actifs, None] + sommes[actifs]) / effectifs_nouveaux[actifs, None]
+        )
+        effectifs = effectifs_nouveaux
+        if np.max(((centres - anciens) ** 2).sum(axis=1)) < tol:
+            break
+    labels = assign_clusters(X, centres)
+    inertie = float(((X - centres[labels]) ** 2).sum())
+    return centres, labels, inertie
+
+def silhouette_score(X, labels, seed=0):
+    """Score de silhouette moyen, estimé sur un échantillon de points"""
+    rng = np.random.default_rng(seed)
+    if len(X) > TAILLE_ECHANTILLON_SILHOUETTE:
+        indices = rng.choice(len(X), TAILLE_ECHANTILLON_SILHOUETTE, replace=False)
+        X, labels = X[indices], labels[indices]
+    groupes, labels = np.unique(labels, return_inverse=True)
+    if len(groupes) < 2:
+        return np.nan
+    distances = np.sqrt(_squared_distances(X, X))
+    appartenance = np.eye(len(groupes))[labels]
+    effectifs = appartenance.sum(axis=0)
+    sommes = distances @ appartenance
+    # Distance moyenne intra-groupe (hors point lui-même) et au groupe voisin le plus proche
+    propres = np.maximum(effectifs[labels] - 1, 1)
+    a = sommes[np.arange(len(X)), labels] / propres
+    moyennes = sommes / effectifs
+    moyennes[np.arange(len(X)), labels] = np.inf
+    b = moyennes.min(axis=1)
+    s = np.where(effectifs[labels] > 1, (b - a) / np.maximum(a, b), 0.0)
+    return float(np.nan_to_num(s).mean())
+
+def fit_customer_clusters(X, candidats=K_CANDIDATS, seed=0):
+    """Ajuste un modèle par nombre de groupes et retient le meilleur score de silhouette"""
+    modeles = {}
+    for k in candidats:
+        if k >= len(X):
+            break
+        centres, labels, inertie = minibatch_kmeans(X, k, seed=seed)
+        modeles[k] = {
+            'centres': centres,
+            'labels': labels,
+            'inertie': inertie,
+            'silhouette': silhouette_score(X, labels, seed=seed)
+        }
+    if not modeles:
+        return None
+    meilleur = max(modeles, key=lambda k: np.nan_to_num(modeles[k]['silhouette'], nan=-1))
+    return {'k': meilleur, 'modeles': modeles}
+
+def cluster_profiles(features, labels):
+    """Profil moyen de chaque groupe de clients"""
+    colonnes_mix = [c for c in features.columns if c.startswith(PREFIXE_MIX)]
+    profils = features.assign(Groupe=labels).groupby('Groupe').agg(
+        Nb_Clients=('Pays', 'size'),
+        CA_Total=("Chiffre d'Affaires", 'sum'),
+        CA_Moyen=("Chiffre d'Affaires", 'mean'),
+        Commandes_Moyennes=('Nb_Commandes', 'mean'),
+        Panier_Moyen=('Panier_Moyen', 'mean'),
+        Part_Premium=('Part_Premium', 'mean'),
+        **{c: (c, 'mean') for c in colonnes_mix}
+    )
+    if colonnes_mix:
+        profils['Gamme_Dominante'] = profils[colonnes_mix].idxmax(axis=1).str[len(PREFIXE_MIX):]
+    return profils.drop(columns=colonnes_mix)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_clusters(version, years, countries, productlines, groupes):
+    """Modèles de clustering mis en cache par version des données, sélection et caractéristiques"""
+    filters = {'years': list(years), 'countries': list(countries), 'productlines': list(productlines)}
+    features = get_customer_features(filters)
+    if len(features) < 3 or not groupes:
+        return None
+    X, colonnes = feature_matrix(features, groupes)
+    resultat = fit_customer_clusters(X)
+    if resultat is not None:
+        resultat['colonnes'] = colonnes
+    return resultat
+
+def get_customer_clusters(filters, groupes):
+    """Clustering des clients des filtres de session sur les groupes de caractéristiques choisis"""
+    return _cached_clusters(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        tuple(groupes)
+    )
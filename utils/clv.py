@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate
+from utils.customers import slice_orders, get_reference_date
+
+# ==============================================================================
+# VALEUR VIE CLIENT (CLV) : BG/NBD + GAMMA-GAMMA
+# ==============================================================================
+# BG/NBD (Fader, Hardie & Lee) : achats de Poisson de taux λ ~ Gamma(r, α),
+# abandon après chaque achat avec probabilité p ~ Beta(a, b). Gamma-Gamma :
+# montant moyen par achat indépendant de la fréquence, de paramètres (p, q, γ).
+# Les deux modèles sont ajustés par maximum de vraisemblance sur les résumés
+# clients (x achats répétés, récence t_x, ancienneté T, montant moyen m_x) :
+# log-vraisemblances vectorisées sur tous les clients, log-gamma et fonction
+# hypergéométrique calculées en NumPy, optimisation par Nelder-Mead sur les
+# logarithmes des paramètres (sans SciPy).
+
+JOURS_PAR_PERIODE = 7  # unité de temps des modèles : la semaine
+SEMAINES_PAR_MOIS = 365.25 / 12 / JOURS_PAR_PERIODE
+HORIZONS_CLV = [6, 12, 24]  # mois
+PARAMETRES_BGNBD = ['r', 'alpha', 'a', 'b']
+PARAMETRES_GAMMA_GAMMA = ['p', 'q', 'gamma']
+PENALITE_GAMMA_GAMMA = 0.01  # pénalité L2 sur les log-paramètres (q et gamma peuvent diverger)
+SEGMENTS_CLV = ['Base', 'Moyen', 'VIP']
+RANGS_SEGMENTS_CLV = [0, 0.5, 0.9, 1]  # VIP : 10 % des clients de CLV la plus élevée
+
+def gammaln(z):
+    """Logarithme de la fonction gamma (z > 0) : décalage de 7 puis série de Stirling"""
+    z = np.asarray(z, dtype=np.float64)
+    decalage = np.log(z * (z + 1) * (z + 2) * (z + 3) * (z + 4) * (z + 5) * (z + 6))
+    w = z + 7
+    inverse = 1 / (w * w)
+    serie = (1 / 12 - inverse * (1 / 360 - inverse * (1 / 1260 - inverse / 1680))) / w
+    return (w - 0.5) * np.log(w) - w + 0.5 * np.log(2 * np.pi) + serie - decalage
+
+def hyp2f1(a, b, c, z, tol=1e-12, max_termes=5000):
+    """Fonction hypergéométrique de Gauss 2F1(a, b; c; z) par série, pour |z| < 1"""
+    a, b, c, z = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (a, b, c, z)))
+    terme = np.ones_like(z)
+    somme = np.ones_like(z)
+    for k in range(max_termes):
+        terme = terme * (a + k) * (b + k) / ((c + k) * (k + 1)) * z
+        somme = somme + terme
+        if np.all(np.abs(terme) <= tol * np.abs(somme)):
+            break
+    return somme
+
+def nelder_mead(fonction, x0, pas=0.5, max_iter=5000, tol=1e-10):
+    """Minimisation sans dérivées (simplexe de Nelder-Mead)"""
+    n = len(x0)
+    simplexe = np.vstack([x0] + [x0 + pas * np.eye(n)[i] for i in range(n)])
+    valeurs = np.array([fonction(x) for x in simplexe])
+    for _ in range(max_iter):
+        ordre = np.argsort(valeurs)
+        simplexe, valeurs = simplexe[ordre], valeurs[ordre]
+        if valeurs[-1] - valeurs[0] <= tol * (abs(valeurs[0]) + tol):
+            break
+        centre = simplexe[:-1].mean(axis=0)
+        reflechi = centre + (centre - simplexe[-1])
+        f_reflechi = fonction(reflechi)
+        if f_reflechi < valeurs[0]:
+            etendu = centre + 2 * (centre - simplexe[-1])
+            f_etendu = fonction(etendu)
+            simplexe[-1], valeurs[-1] = (etendu, f_etendu) if f_etendu < f_reflechi else (reflechi, f_reflechi)
+        elif f_reflechi < valeurs[-2]:
+            simplexe[-1], valeurs[-1] = reflechi, f_reflechi
+        else:
+            contracte = centre + 0.5 * (simplexe[-1] - centre)
+            f_contracte = fonction(contracte)
+            if f_contracte < valeurs[-1]:
+                simplexe[-1], valeurs[-1] = contracte, f_contracte
+            else:
+                # Réduction du simplexe vers le meilleur sommet
+                simplexe[1:] = simplexe[0] + 0.5 * (simplexe[1:] - simplexe[0])
+                valeurs[1:] = [fonction(x) for x in simplexe[1:]]
+    return simplexe[np.argmin(valeurs)]
+
+# ==============================================================================
+# RÉSUMÉS CLIENTS
+# ==============================================================================
+
+def customer_summaries(commandes, date_reference):
+    """
+    Résumé par client : achats répétés (jours d'achat distincts - 1), récence et
+    ancienneté en semaines depuis le premier achat, montant moyen des achats répétés.
+    """
+    achats = commandes.groupby(['Nom_du_Client', 'Date_Commande'], sort=True)["Chiffre d'Affaires"].sum().reset_index()
+    clients = achats.groupby('Nom_du_Client', sort=True)
+    resume = clients.agg(
+        Premier_Achat=('Date_Commande', 'min'),
+        Dernier_Achat=('Date_Commande', 'max'),
+        Nb_Achats=('Date_Commande', 'size'),
+        CA_Total=("Chiffre d'Affaires", 'sum')
+    )
+    premier_montant = clients["Chiffre d'Affaires"].first()
+    resume['Frequence'] = resume['Nb_Achats'] - 1
+    resume['Recence'] = (resume['Dernier_Achat'] - resume['Premier_Achat']).dt.days / JOURS_PAR_PERIODE
+    resume['Anciennete'] = (date_reference - resume['Premier_Achat']).dt.days / JOURS_PAR_PERIODE
+    repetes = resume['CA_Total'] - premier_montant
+    resume['Montant_Moyen'] = (repetes / resume['Frequence']).where(resume['Frequence'] > 0, 0.0)
+    return resume
+
+# ==============================================================================
+# MODÈLE BG/NBD (FRÉQUENCE D'ACHAT)
+# ==============================================================================
+
+def bgnbd_log_likelihood(parametres, x, t_x, T):
+    """Log-vraisemblance BG/NBD de chaque client"""
+    r, alpha, a, b = parametres
+    a1 = gammaln(r + x) - gammaln(r) + r * np.log(alpha)
+    a2 = gammaln(a + b) + gammaln(b + x) - gammaln(b) - gammaln(a + b + x)
+    a3 = -(r + x) * np.log(alpha + T)
+    with np.errstate(divide='ignore'):
+        a4 = np.where(
+            x > 0,
+            np.log(a) - np.log(np.maximum(b + x - 1, 1e-300)) - (r + x) * np.log(alpha + t_x),
+            -np.inf
+        )
+    return a1 + a2 + np.logaddexp(a3, a4)
+
+def fit_bgnbd(x, t_x, T, poids=None):
+    """Paramètres (r, alpha, a, b) du modèle BG/NBD par maximum de vraisemblance"""
+    poids = np.ones(len(x)) if poids is None else poids
+
+    def objectif(log_parametres):
+        valeur = -np.sum(poids * bgnbd_log_likelihood(np.exp(log_parametres), x, t_x, T))
+        return valeur if np.isfinite(valeur) else np.inf
+
+    x0 = np.log([1.0, max(np.average(T, weights=poids), 1.0), 1.0, 1.0])
+    return np.exp(nelder_mead(objectif, x0))
+
+def probability_alive(parametres, x, t_x, T):
+    """Probabilité que chaque client soit encore actif"""
+    r, alpha, a, b = parametres
+    with np.errstate(divide='ignore'):
+        log_ratio = np.log(a) - np.log(np.maximum(b + x - 1, 1e-300)) + (r + x) * np.log((alpha + T) / (alpha + t_x))
+    return np.where(x > 0, 1 / (1 + np.exp(log_ratio)), 1.0)
+
+def expected_purchases(parametres, t, x, t_x, T):
+    """Nombre d'achats attendus de chaque client sur les t prochaines périodes"""
+    r, alpha, a, b = parametres
+    z = t / (alpha + T + t)
+    facteur = ((alpha + T) / (alpha + T + t)) ** (r + x) * hyp2f1(r + x, b + x, a + b + x - 1, z)
+    attendus = (a + b + x - 1) / (a - 1) * (1 - facteur)
+    return attendus * probability_alive(parametres, x, t_x, T)
+
+# ==============================================================================
+# MODÈLE GAMMA-GAMMA (MONTANT PAR ACHAT)
+# ==============================================================================
+
+def gamma_gamma_log_likelihood(parametres, x, m_x):
+    """Log-vraisemblance Gamma-Gamma des clients ayant des achats répétés"""
+    p, q, gamma = parametres
+    return (
+        gammaln(p * x + q) - gammaln(p * x) - gammaln(q) + q * np.log(gamma)
+        + (p * x - 1) * np.log(m_x) + p * x * np.log(x) - (p * x + q) * np.log(gamma + m_x * x)
+    )
+
+def fit_gamma_gamma(x, m_x, penalite=PENALITE_GAMMA_GAMMA):
+    """
+    Paramètres (p, q, gamma) du modèle Gamma-Gamma (clients avec x > 0),
+    ajustés sur les montants rapportés à leur moyenne : gamma est un paramètre
+    d'échelle, remis en euros après l'ajustement.
+    """
+    echelle = np.mean(m_x)
+    m_x = m_x / echelle
+
+    def objectif(log_parametres):
+        valeur = -np.sum(gamma_gamma_log_likelihood(np.exp(log_parametres), x, m_x)) + penalite * np.sum(log_parametres ** 2)
+        return valeur if np.isfinite(valeur) else np.inf
+
+    p, q, gamma = np.exp(nelder_mead(objectif, np.log([1.0, 2.0, 1.0])))
+    return np.array([p, q, gamma * echelle])
+
+def expected_average_value(parametres, x, m_x):
+    """Montant moyen attendu par achat (moyenne de population pour x = 0)"""
+    p, q, gamma = parametres
+    return (p * (gamma + x * m_x)) / (p * x + q - 1)
+
+# ==============================================================================
+# AJUSTEMENT ET SCORING (MIS EN CACHE PAR VERSION DES DONNÉES)
+# ==============================================================================
+
+def _all_years_orders(countries, productlines):
+    """Commandes de tout l'historique pour les pays et gammes sélectionnés"""
+    table = get_aggregate('orders')
+    annees = sorted(table['commandes']['Année'].unique())
+    filters = {'years': annees, 'countries': list(countries), 'productlines': list(productlines)}
+    return slice_orders(table, filters)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_clv_models(version, countries, productlines):
+    """Résumés clients et paramètres ajustés des deux modèles"""
+    commandes = _all_years_orders(countries, productlines)
+    if commandes.empty:
+        return None
+    resume = customer_summaries(commandes, get_reference_date())
+    # Clients de même résumé (x, t_x, T) regroupés : une évaluation par profil distinct
+    profils = resume.groupby(['Frequence', 'Recence', 'Anciennete']).size().reset_index(name='poids')
+    bgnbd = fit_bgnbd(
+        profils['Frequence'].to_numpy(dtype=np.float64), profils['Recence'].to_numpy(),
+        profils['Anciennete'].to_numpy(), profils['poids'].to_numpy(dtype=np.float64)
+    )
+    repetes = resume[resume['Frequence'] > 0]
+    gamma_gamma = fit_gamma_gamma(repetes['Frequence'].to_numpy(dtype=np.float64), repetes['Montant_Moyen'].to_numpy())
+    return {
+        'resume': resume,
+        'bgnbd': pd.Series(bgnbd, index=PARAMETRES_BGNBD),
+        'gamma_gamma': pd.Series(gamma_gamma, index=PARAMETRES_GAMMA_GAMMA)
+    }
+
+def score_customers(resume, bgnbd, gamma_gamma, horizon_mois):
+    """Probabilité d'activité, achats attendus, panier attendu et CLV de tous les clients"""
+    x = resume['Frequence'].to_numpy(dtype=np.float64)
+    t_x, T = resume['Recence'].to_numpy(), resume['Anciennete'].to_numpy()
+    achats = expected_purchases(bgnbd, horizon_mois * SEMAINES_PAR_MOIS, x, t_x, T)
+    panier = expected_average_value(gamma_gamma, x, resume['Montant_Moyen'].to_numpy())
+    scores = pd.DataFrame({
+        'Frequence': resume['Frequence'],
+        'Recence_Semaines': resume['Recence'],
+        'Anciennete_Semaines': resume['Anciennete'],
+        'CA_Historique': resume['CA_Total'],
+        'Probabilite_Active': probability_alive(bgnbd, x, t_x, T),
+        'Achats_Attendus': achats,
+        'Panier_Attendu': panier,
+        'CLV': achats * panier
+    }, index=resume.index)
+    scores['Segment_CLV'] = pd.cut(scores['CLV'].rank(pct=True), bins=RANGS_SEGMENTS_CLV, labels=SEGMENTS_CLV)
+    return scores
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_customer_clv(version, countries, productlines, horizon_mois):
+    """Scores CLV de tous les clients, mis en cache par version des données"""
+    modeles = _cached_clv_models(version, countries, productlines)
+    if modeles is None:
+        return None
+    return {
+        'scores': score_customers(modeles['resume'], modeles['bgnbd'].to_numpy(), modeles['gamma_gamma'].to_numpy(), horizon_mois),
+        'bgnbd': modeles['bgnbd'],
+        'gamma_gamma': modeles['gamma_gamma']
+    }
+
+def get_customer_clv(filters, horizon_mois=12):
+    """
+    CLV prédite de chaque client sur `horizon_mois` mois pour les pays et gammes
+    sélectionnés ; l'historique complet est utilisé quel que soit le filtre d'années.
+    """
+    return _cached_customer_clv(
+        get_data_version(),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        horizon_mois
+    )
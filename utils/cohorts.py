@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.customers import slice_orders
+from utils.ingestion import get_aggregate
+
+# ==============================================================================
+# COHORTES D'ACQUISITION ET RÉTENTION
+# ==============================================================================
+# Chaque client est rattaché au mois de sa première commande. Les mois sont
+# codés en entiers (année * 12 + mois) : l'ancienneté d'une commande est une
+# simple différence, et la matrice cohorte x ancienneté se remplit par
+# np.bincount sur des codes combinés, sans boucle par client.
+
+def month_index(dates):
+    """Code entier du mois de chaque date (année * 12 + mois - 1)"""
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+
+def build_cohort_matrices(commandes):
+    """
+    Matrices cohorte x mois depuis l'acquisition : clients actifs, CA,
+    taux de rétention, et effectif de chaque cohorte.
+    """
+    if commandes.empty:
+        vide = pd.DataFrame()
+        return {'clients': vide, 'ca': vide, 'retention': vide, 'effectifs': pd.Series(dtype='int64')}
+
+    codes_clients, _ = pd.factorize(commandes['Nom_du_Client'])
+    mois = month_index(commandes['Date_Commande'])
+    n_clients = codes_clients.max() + 1
+
+    # Mois d'acquisition de chaque client, puis ancienneté de chaque commande
+    acquisition = np.full(n_clients, np.iinfo(np.int64).max)
+    np.minimum.at(acquisition, codes_clients, mois)
+    premier_mois = acquisition.min()
+    cohortes = acquisition[codes_clients] - premier_mois
+    anciennete = mois - acquisition[codes_clients]
+    n_cohortes = int(cohortes.max()) + 1
+    n_anciennetes = int(anciennete.max()) + 1
+    cellules = cohortes * n_anciennetes + anciennete
+    taille = n_cohortes * n_anciennetes
+
+    # Clients actifs : paires (client, cellule) distinctes
+    paires = pd.unique(codes_clients.astype(np.int64) * taille + cellules)
+    actifs = np.bincount(paires % taille, minlength=taille)
+    ca = np.bincount(cellules, weights=commandes["Chiffre d'Affaires"].to_numpy(), minlength=taille)
+
+    labels = [
+        f"{(premier_mois + c) // 12}-{(premier_mois + c) % 12 + 1:02d}" for c in range(n_cohortes)
+    ]
+    index = pd.Index(labels, name='Cohorte')
+    colonnes = pd.RangeIndex(n_anciennetes, name='Mois_Depuis_Acquisition')
+    clients = pd.DataFrame(actifs.reshape(n_cohortes, n_anciennetes), index=index, columns=colonnes)
+    revenus = pd.DataFrame(ca.reshape(n_cohortes, n_anciennetes), index=index, columns=colonnes)
+
+    # Les cohortes sans acquisition (mois sans nouveau client) sont retirées
+    effectifs = clients[0]
+    non_vides = effectifs > 0
+    clients, revenus, effectifs = clients[non_vides], revenus[non_vides], effectifs[non_vides]
+    # Anciennetés non encore observables (au-delà de la fin des données) laissées vides
+    dernier_mois = mois.max()
+    observables = dernier_mois - (premier_mois + np.flatnonzero(non_vides.to_numpy()))
+    masque = np.arange(n_anciennetes)[None, :] <= observables[:, None]
+    return {
+        'clients': clients.where(masque),
+        'ca': revenus.where(masque),
+        'retention': clients.div(effectifs, axis=0).where(masque) * 100,
+        'effectifs': effectifs
+    }
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_cohorts(version, years, countries, productlines):
+    """Cohortes d'une sélection, mises en cache par version des données"""
+    # L'acquisition est datée sur tout l'historique (pays et gammes filtrés) ;
+    # seules les cohortes acquises pendant les années sélectionnées sont conservées
+    table = get_aggregate('orders')
+    toutes_annees = sorted(table['commandes']['Année'].unique())
+    filters = {'years': toutes_annees, 'countries': list(countries), 'productlines': list(productlines)}
+    matrices = build_cohort_matrices(slice_orders(table, filters))
+    if matrices['effectifs'].empty:
+        return matrices
+    annees = matrices['effectifs'].index.str[:4].astype(int)
+    selection = annees.isin(years)
+    return {nom: valeur[selection] for nom, valeur in matrices.items()}
+
+def get_cohorts(filters):
+    """Matrices de cohortes pour les filtres de session"""
+    return _cached_cohorts(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines'])
+    )
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.customers import slice_orders, PREFIXE_MIX
+from utils.ingestion import get_aggregate
+
+# ==============================================================================
+# COMPARAISON À DATE AVEC LA MÊME PÉRIODE DE L'ANNÉE PRÉCÉDENTE
+# ==============================================================================
+# La dernière année sélectionnée est comparée à l'année précédente arrêtée au
+# même jour (et non à l'année complète, trompeuse quand l'année en cours est
+# partielle). Les indicateurs sont lus dans la table des commandes pré-agrégée :
+# quelques centaines de lignes par an au lieu des lignes de détail.
+
+STATUTS_PROBLEMATIQUES = ['Cancelled', 'Disputed']
+
+def same_day(date, annee):
+    """Même jour et mois que `date` pour l'année donnée (29 février ramené au 28)"""
+    jours_mois = pd.Timestamp(year=annee, month=date.month, day=1).days_in_month
+    return pd.Timestamp(year=annee, month=date.month, day=min(date.day, jours_mois))
+
+def period_to_date(commandes, annee, date_limite):
+    """Commandes de l'année `annee` jusqu'au même jour que `date_limite`"""
+    dates = commandes['Date_Commande']
+    return commandes[(dates.dt.year == annee) & (dates <= same_day(date_limite, annee))]
+
+def _share(montant, total):
+    """Part en % (0 si le total est nul)"""
+    return montant / total * 100 if total > 0 else 0
+
+def kpi_snapshot(commandes, gamme=None, pays=None, client=None):
+    """Indicateurs de synthèse d'un ensemble de commandes (None si vide)"""
+    if commandes.empty:
+        return None
+    ca = commandes["Chiffre d'Affaires"].to_numpy()
+    ca_total = ca.sum()
+    n_commandes = len(commandes)
+    problematiques = commandes['Statut'].isin(STATUTS_PROBLEMATIQUES).to_numpy()
+    colonne_gamme = PREFIXE_MIX + gamme if gamme is not None else None
+    return {
+        'ca': ca_total,
+        'commandes': n_commandes,
+        'panier': ca_total / n_commandes,
+        'taux_reussite': (n_commandes - problematiques.sum()) / n_commandes * 100,
+        'part_ca_risque': _share(ca[problematiques].sum(), ca_total),
+        'part_gamme': _share(commandes[colonne_gamme].sum(), ca_total) if colonne_gamme in commandes else 0,
+        'part_pays': _share(ca[(commandes['Pays'] == pays).to_numpy()].sum(), ca_total),
+        'part_client': _share(ca[(commandes['Nom_du_Client'] == client).to_numpy()].sum(), ca_total)
+    }
+
+def _growth(actuel, precedent):
+    """Variation relative du CA en % (NaN sans référence)"""
+    if actuel is None or precedent is None or precedent['ca'] <= 0:
+        return np.nan
+    return (actuel['ca'] - precedent['ca']) / precedent['ca'] * 100
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_kpi_comparison(version, years, countries, productlines, gamme, pays, client):
+    """Indicateurs à date et N-1, mis en cache par version des données et sélection"""
+    # Les années précédentes sont lues même si elles ne sont pas sélectionnées
+    table = get_aggregate('orders')
+    toutes_annees = sorted(table['commandes']['Année'].unique())
+    filters = {'years': toutes_annees, 'countries': list(countries), 'productlines': list(productlines)}
+    commandes = slice_orders(table, filters)
+    selection = commandes[commandes['Année'].isin(years)]
+    if selection.empty:
+        return None
+
+    annee = int(selection['Année'].max())
+    date_limite = selection.loc[selection['Année'] == annee, 'Date_Commande'].max()
+    periodes = [kpi_snapshot(period_to_date(commandes, annee - k, date_limite), gamme, pays, client) for k in range(3)]
+    actuel, precedent, avant = periodes
+    actuel['croissance'] = _growth(actuel, precedent)
+    if precedent is not None:
+        precedent['croissance'] = _growth(precedent, avant)
+    return {
+        'annee': annee,
+        'date_limite': date_limite,
+        'actuel': actuel,
+        'precedent': precedent
+    }
+
+def get_kpi_comparison(filters, gamme=None, pays=None, client=None):
+    """
+    Indicateurs de la dernière année sélectionnée à date et de la même période
+    de l'année précédente (parts calculées pour la gamme, le pays et le client donnés).
+    """
+    return _cached_kpi_comparison(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        gamme,
+        pays,
+        client
+    )
+
+def kpi_delta(comparaison, indicateur, en_points=False):
+    """
+    Écart à date vs N-1 d'un indicateur : variation relative en %, ou écart
+    en points pour les taux et parts. None si la période N-1 est vide.
+    """
+    if comparaison is None or comparaison['precedent'] is None:
+        return None
+    actuel = comparaison['actuel'][indicateur]
+    precedent = comparaison['precedent'][indicateur]
+    if pd.isna(actuel) or pd.isna(precedent):
+        return None
+    if en_points:
+        return actuel - precedent
+    return (actuel - precedent) / precedent * 100 if precedent else None
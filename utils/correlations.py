@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+from utils.discounts import discount_rates
+
+# ==============================================================================
+# MATRICES DE CORRÉLATION ET DE COVARIANCE (CO-MOMENTS FUSIONNABLES)
+# ==============================================================================
+# Chaque cellule garde l'effectif n, le vecteur des moyennes m et la matrice
+# des co-moments centrés C = Σ (x - m)(x - m)ᵀ (triangle supérieur) des
+# mesures de ligne. Deux cellules, ou un groupe de cellules, se combinent
+# exactement :
+#   m = Σ n_i m_i / n,  C = Σ C_i + Σ n_i (m_i - m)(m_i - m)ᵀ
+# généralisation multivariée de la formule de Chan utilisée pour les moments
+# de prix. Le montant de la commande d'une ligne dépend de lignes qui peuvent
+# arriver dans d'autres blocs : il n'est pas figé dans les cellules. On garde
+# par (cellule, commande) le nombre de lignes et les sommes des mesures ;
+# à la lecture, le total de chaque commande (toutes cellules) donne ses
+# co-moments avec les autres mesures. Covariances et corrélations d'une
+# sélection quelconque, par pays ou par gamme, sont donc exactes sans relire
+# les lignes.
+
+MESURES_CORRELATION = {
+    'Quantité': 'Quantité_Commandée',
+    'Prix unitaire': 'Prix_Unitaire',
+    'Prix conseil': 'Prix Conseil',
+    "Chiffre d'affaires": "Chiffre d'Affaires",
+    'Remise': 'Remise',
+    'Montant commande': 'Montant_Commande'
+}
+MESURE_COMMANDE = 'Montant commande'
+CELLULE_CORRELATION = ['Année', 'Pays', 'Gamme_de_Produits']
+DIMENSIONS_CORRELATION = {'Pays': 'Pays', 'Gamme': 'Gamme_de_Produits'}
+MIN_LIGNES_CORRELATION = 10
+
+_NOMS = list(MESURES_CORRELATION)
+_PAIRES = [(j, k) for j in range(len(_NOMS)) for k in range(j, len(_NOMS))]
+_COLONNES_C = [f"c{j}_{k}" for j, k in _PAIRES]
+_COLONNES_M = [f"m{j}" for j in range(len(_NOMS))]
+# Mesures de ligne (toutes sauf le montant de commande, en dernier)
+_D = _NOMS.index(MESURE_COMMANDE)
+_PAIRES_LIGNE = [(j, k) for j, k in _PAIRES if k < _D]
+_COLONNES_C_LIGNE = [f"c{j}_{k}" for j, k in _PAIRES_LIGNE]
+_COLONNES_M_LIGNE = _COLONNES_M[:_D]
+_COLONNES_S = [f"s{j}" for j in range(_D)]
+_CA = _NOMS.index("Chiffre d'affaires")
+
+def measure_matrix(df):
+    """Mesures de ligne : quantité, prix, prix conseil, CA et taux de remise vs prix conseil"""
+    mesures = df[[MESURES_CORRELATION[nom] for nom in _NOMS[:_D] if nom != 'Remise']].assign(Remise=discount_rates(df))
+    return mesures[[MESURES_CORRELATION[nom] for nom in _NOMS[:_D]]].to_numpy(dtype=np.float64)
+
+def comoment_accumulators(cellules, X):
+    """Accumulateurs (n, moyennes, co-moments centrés) par cellule, en deux passes"""
+    cles = [cellules[c] for c in cellules.columns]
+    moyennes = pd.DataFrame(X, columns=_COLONNES_M_LIGNE, index=cellules.index).groupby(cles, sort=True)
+    accumulateurs = moyennes.mean()
+    accumulateurs.insert(0, 'n', moyennes.size())
+    ecarts = X - moyennes.transform('mean').to_numpy()
+    produits = pd.DataFrame(
+        {colonne: ecarts[:, j] * ecarts[:, k] for colonne, (j, k) in zip(_COLONNES_C_LIGNE, _PAIRES_LIGNE)},
+        index=cellules.index
+    )
+    return accumulateurs.join(produits.groupby(cles, sort=True).sum())
+
+def combine_comoments(accumulateurs, by):
+    """Combine les co-moments des mesures de ligne des cellules de chaque groupe (Chan multivariée)"""
+    groupes = [accumulateurs.index.get_level_values(niveau) for niveau in by] if by else np.zeros(len(accumulateurs))
+    n = accumulateurs['n'].to_numpy(dtype=np.float64)
+    moyennes = accumulateurs[_COLONNES_M_LIGNE].to_numpy()
+    ponderees = pd.DataFrame(moyennes * n[:, None], columns=_COLONNES_M_LIGNE).assign(n=n)
+    sommes = ponderees.groupby(groupes).transform('sum')
+    ecarts = moyennes - sommes[_COLONNES_M_LIGNE].to_numpy() / sommes['n'].to_numpy()[:, None]
+    cellules = pd.DataFrame({
+        colonne: accumulateurs[colonne].to_numpy() + n * ecarts[:, j] * ecarts[:, k]
+        for colonne, (j, k) in zip(_COLONNES_C_LIGNE, _PAIRES_LIGNE)
+    })
+    combine = pd.concat([ponderees, cellules], axis=1).groupby(groupes, sort=True).sum()
+    combine[_COLONNES_M_LIGNE] = combine[_COLONNES_M_LIGNE].div(combine['n'], axis=0)
+    combine['n'] = combine['n'].astype(np.int64)
+    if by:
+        combine.index.names = by
+    return combine[['n'] + _COLONNES_M_LIGNE + _COLONNES_C_LIGNE]
+
+def merge_comoment_tables(accumulateurs, accumulateurs_ajout):
+    """Fusionne deux tables de co-moments de mêmes clés (cellules communes combinées)"""
+    fusion = pd.concat([accumulateurs, accumulateurs_ajout])
+    return combine_comoments(fusion, list(fusion.index.names))
+
+def build_comoments(df):
+    """Co-moments des mesures de ligne par cellule de filtre"""
+    return comoment_accumulators(df[CELLULE_CORRELATION], measure_matrix(df))
+
+def build_order_sums(df):
+    """Nombre de lignes et sommes des mesures de ligne par cellule et commande"""
+    sommes = pd.DataFrame(measure_matrix(df), columns=_COLONNES_S, index=df.index).assign(n=1)
+    cles = [df[c] for c in CELLULE_CORRELATION + ['Numéro_Commande']]
+    return sommes.groupby(cles, sort=True)[['n'] + _COLONNES_S].sum()
+
+def merge_order_sums(sommes, sommes_ajout):
+    """Fusionne les sommes par commande (une commande peut arriver en plusieurs blocs)"""
+    return sommes.add(sommes_ajout, fill_value=0)
+
+register_aggregate('comoments', build_comoments, merge_comoment_tables)
+register_aggregate('sommes_commandes', build_order_sums, merge_order_sums)
+
+def add_order_amount(combine, sommes, totaux, by):
+    """
+    Ajoute aux co-moments combinés la moyenne du montant de commande et ses
+    co-moments avec chaque mesure, à partir des sommes par (cellule,
+    commande) de la sélection et du total de chaque commande :
+      C_Mj = Σ_o (M_o - m_M)(S_oj - n_o m_j),  C_MM = Σ_o n_o (M_o - m_M)²
+    """
+    groupes = [sommes.index.get_level_values(niveau) for niveau in by] if by else np.zeros(len(sommes), dtype=np.int64)
+    n_o = sommes['n'].to_numpy(dtype=np.float64)
+    montants = totaux.reindex(sommes.index.get_level_values('Numéro_Commande')).to_numpy()
+    moyenne = pd.Series(n_o * montants).groupby(groupes).transform('sum').to_numpy() / \
+        pd.Series(n_o).groupby(groupes).transform('sum').to_numpy()
+    ecarts = montants - moyenne
+    if by:
+        cles = pd.MultiIndex.from_arrays(groupes, names=by) if len(by) > 1 else pd.Index(groupes[0], name=by[0])
+        moyennes_mesures = combine[_COLONNES_M_LIGNE].reindex(cles).to_numpy()
+    else:
+        moyennes_mesures = np.repeat(combine[_COLONNES_M_LIGNE].to_numpy(), len(sommes), axis=0)
+    termes = pd.DataFrame({
+        f"c{j}_{_D}": ecarts * (sommes[_COLONNES_S[j]].to_numpy() - n_o * moyennes_mesures[:, j])
+        for j in range(_D)
+    })
+    termes[f"c{_D}_{_D}"] = n_o * ecarts ** 2
+    termes[f"m{_D}"] = n_o * montants
+    agregats = termes.groupby(groupes, sort=True).sum()
+    agregats.index = combine.index
+    agregats[f"m{_D}"] /= combine['n'].to_numpy()
+    return combine.join(agregats)[['n'] + _COLONNES_M + _COLONNES_C]
+
+def covariance_matrices(combine):
+    """Matrices de covariance (échantillon) de chaque ligne : tableau (groupes, d, d)"""
+    d = len(_NOMS)
+    C = np.zeros((len(combine), d, d))
+    for colonne, (j, k) in zip(_COLONNES_C, _PAIRES):
+        C[:, j, k] = C[:, k, j] = combine[colonne].to_numpy()
+    n = combine['n'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return C / np.where(n > 1, n - 1, np.nan)[:, None, None]
+
+def correlation_matrices(covariances):
+    """Matrices de corrélation à partir des matrices de covariance"""
+    ecarts_types = np.sqrt(np.diagonal(covariances, axis1=1, axis2=2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariances / (ecarts_types[:, :, None] * ecarts_types[:, None, :])
+
+def _select_cells(table, years, countries, productlines):
+    """Lignes d'une table indexée par cellule correspondant aux filtres"""
+    index = table.index
+    return table[
+        index.get_level_values('Année').isin(years) &
+        index.get_level_values('Pays').isin(countries) &
+        index.get_level_values('Gamme_de_Produits').isin(productlines)
+    ]
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_order_totals(version):
+    """Montant total de chaque commande (toutes cellules), par version des données"""
+    sommes = get_aggregate('sommes_commandes')
+    return sommes[_COLONNES_S[_CA]].groupby(level='Numéro_Commande').sum()
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_correlations(version, years, countries, productlines, dimension):
+    """Matrices de la sélection et par segment, mises en cache par version des données"""
+    selection = _select_cells(get_aggregate('comoments'), years, countries, productlines)
+    if selection.empty:
+        return None
+    sommes = _select_cells(get_aggregate('sommes_commandes'), years, countries, productlines)
+    totaux = _cached_order_totals(version)
+    by = [DIMENSIONS_CORRELATION[dimension]]
+    ensemble = add_order_amount(combine_comoments(selection, []), sommes, totaux, [])
+    segments = add_order_amount(combine_comoments(selection, by), sommes, totaux, by)
+    segments = segments[segments['n'] >= MIN_LIGNES_CORRELATION]
+    covariance = covariance_matrices(ensemble)[0]
+    correlations_segments = correlation_matrices(covariance_matrices(segments))
+    paires = [(j, k) for j, k in _PAIRES if j < k]
+    return {
+        'covariance': pd.DataFrame(covariance, index=_NOMS, columns=_NOMS),
+        'correlation': pd.DataFrame(correlation_matrices(covariance[None])[0], index=_NOMS, columns=_NOMS),
+        'segments': pd.DataFrame(
+            {f"{_NOMS[j]} / {_NOMS[k]}": correlations_segments[:, j, k] for j, k in paires},
+            index=segments.index
+        ),
+        'effectifs': segments['n'],
+        'n': int(ensemble['n'].iloc[0])
+    }
+
+def get_correlations(filters, dimension='Pays'):
+    """
+    Covariances et corrélations des mesures pour les filtres de session, et
+    corrélation de chaque paire de mesures par pays ou par gamme.
+    """
+    return _cached_correlations(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        dimension
+    )
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from config import PARALLEL_WORKERS, PARALLEL_MIN_ROWS
+from utils.parallel import parallel_aggregate
+from utils.partitions import build_partition_index
+
+# ==============================================================================
+# PRÉ-AGRÉGATS (CUBE) PAR CELLULE DE FILTRE
+# ==============================================================================
+# Chaque cellule correspond à une combinaison (Année, Trimestre, Mois, Pays, Gamme).
+# Toute sélection de la barre latérale est une union de cellules : les mesures
+# additives d'un filtre se lisent donc dans le cube sans relire les lignes.
+
+CUBE_DIMENSIONS = ['Année', 'Trimestre_ID', 'Mois', 'Pays', 'Gamme_de_Produits']
+CUBE_MESURES = {
+    "Chiffre d'Affaires": 'sum',
+    'Quantité_Commandée': 'sum',
+    'Numéro_Ligne_Commande': 'size'
+}
+
+def build_cube(df):
+    """Construit le cube des mesures additives par cellule"""
+    if PARALLEL_WORKERS > 1 and len(df) >= PARALLEL_MIN_ROWS:
+        # Construction à froid en map-reduce, une plage par partition annuelle au plus
+        index = build_partition_index(df)
+        cube = parallel_aggregate(df, CUBE_DIMENSIONS, CUBE_MESURES, n_workers=PARALLEL_WORKERS,
+                                  bornes=index['bornes'] if index else None)
+    else:
+        cube = df.groupby(CUBE_DIMENSIONS, sort=True).agg(CUBE_MESURES)
+    return cube.rename(columns={'Numéro_Ligne_Commande': 'Nb_Lignes'})
+
+def merge_cubes(cube, cube_ajout):
+    """Fusionne deux cubes (coût proportionnel au nombre de cellules)"""
+    fusion = cube.add(cube_ajout, fill_value=0)
+    fusion['Nb_Lignes'] = fusion['Nb_Lignes'].astype('int64')
+    return fusion
+
+def slice_cube(cube, filters):
+    """Restreint le cube aux cellules sélectionnées par les filtres de session"""
+    index = cube.index
+    masque = (
+        index.get_level_values('Année').isin(filters['years']) &
+        index.get_level_values('Pays').isin(filters['countries']) &
+        index.get_level_values('Gamme_de_Produits').isin(filters['productlines'])
+    )
+    return cube[masque]
+
+def rollup_cube(cube, by):
+    """Agrège le cube sur un sous-ensemble de dimensions"""
+    return cube.groupby(level=by, sort=True).sum().reset_index()
+
+def monthly_series(cube, filters, mesure="Chiffre d'Affaires"):
+    """
+    Matrice des séries mensuelles d'une mesure (séries x mois) sur toute la
+    période du cube, pour le total, chaque gamme et chaque pays sélectionnés.
+    """
+    mois_cube = cube.index.get_level_values('Année') * 12 + cube.index.get_level_values('Mois') - 1
+    grille = np.arange(mois_cube.min(), mois_cube.max() + 1)
+    selection = slice_cube(cube, filters)
+
+    series = {}
+    niveaux = [('Total', None), ('Gamme', 'Gamme_de_Produits'), ('Pays', 'Pays')]
+    for niveau, dimension in niveaux:
+        cles = ['Année', 'Mois'] + ([dimension] if dimension else [])
+        agrege = rollup_cube(selection, cles)
+        agrege['Mois_Index'] = agrege['Année'] * 12 + agrege['Mois'] - 1
+        if dimension is None:
+            agrege[niveau] = 'Total'
+            dimension = niveau
+        table = agrege.pivot_table(index=dimension, columns='Mois_Index', values=mesure, aggfunc='sum')
+        table = table.reindex(columns=grille, fill_value=0).fillna(0)
+        for nom, valeurs in table.iterrows():
+            series[(niveau, nom)] = valeurs.to_numpy()
+
+    index = pd.MultiIndex.from_tuples(list(series), names=['Niveau', 'Serie'])
+    mois = pd.PeriodIndex([pd.Period(year=int(m // 12), month=int(m % 12 + 1), freq='M') for m in grille])
+    return pd.DataFrame(np.array(list(series.values())).reshape(len(series), len(grille)), index=index, columns=mois)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from utils.ingestion import get_aggregate, register_aggregate, get_rows
+from utils.discounts import discount_rates
+
+# ==============================================================================
+# INDEX CLIENT -> LIGNES (FICHE CLIENT 360°)
+# ==============================================================================
+# L'index garde, dans l'ordre trié par client (puis date, commande et ligne),
+# les clés de tri de chaque ligne et sa position dans le dataset, ainsi qu'un
+# dictionnaire associant à chaque Nom_du_Client la plage (début, fin) de ses
+# lignes. La fiche d'un client lit les positions de sa plage dans le dataset :
+# son coût ne dépend que du nombre de lignes du client, et le dataset n'est
+# pas recopié. Les lignes ajoutées, triées de même, sont insérées dans l'ordre
+# existant par recherche dichotomique sur les clés (fusion de deux suites
+# triées, sans re-tri de l'historique).
+
+ORDRE_LIGNES_CLIENT = ['Date_Commande', 'Numéro_Commande', 'Numéro_Ligne_Commande']
+COLONNES_ADRESSE = ['Adresse_Ligne_1', 'Ville', 'Code_Postal', 'Pays']
+TYPE_CLES = np.dtype([('client', np.int64), ('date', np.int64), ('commande', np.int64), ('ligne', np.int64)])
+
+def _ranges(clients, codes):
+    """Plage (début, fin) de chaque client dans des codes triés"""
+    bornes = np.searchsorted(codes, np.arange(len(clients) + 1), side='left')
+    return {nom: (int(d), int(f)) for nom, d, f in zip(clients, bornes[:-1], bornes[1:])}
+
+def build_customer_layout(df):
+    """
+    Clés triées par client, positions des lignes dans le dataset (index des
+    lignes transmises par l'ingestion) et plages de chaque client.
+    """
+    codes, clients = pd.factorize(df['Nom_du_Client'], sort=True)
+    cles = np.empty(len(df), dtype=TYPE_CLES)
+    cles['client'] = codes
+    cles['date'] = df['Date_Commande'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+    cles['commande'] = df['Numéro_Commande'].to_numpy()
+    cles['ligne'] = df['Numéro_Ligne_Commande'].to_numpy()
+    ordre = np.lexsort((cles['ligne'], cles['commande'], cles['date'], cles['client']))
+    cles = cles[ordre]
+    clients = pd.Index(clients)
+    return {
+        'clients': clients,
+        'cles': cles,
+        'positions': df.index.to_numpy(dtype=np.int64)[ordre],
+        'plages': _ranges(clients, cles['client'])
+    }
+
+def merge_customer_layouts(disposition, disposition_ajout):
+    """Insère les lignes ajoutées (triées) dans l'ordre par client existant"""
+    clients = disposition['clients'].union(disposition_ajout['clients'])
+    cles, cles_ajout = disposition['cles'].copy(), disposition_ajout['cles'].copy()
+    # Codes clients ramenés au vocabulaire commun (trié : l'ordre est conservé)
+    for tableau, anciens in ((cles, disposition['clients']), (cles_ajout, disposition_ajout['clients'])):
+        correspondance = clients.get_indexer(anciens)
+        tableau['client'] = np.where(tableau['client'] >= 0, correspondance[tableau['client']], -1)
+
+    insertions = np.searchsorted(cles, cles_ajout, side='right')
+    ajoutees = np.zeros(len(cles) + len(cles_ajout), dtype=bool)
+    ajoutees[insertions + np.arange(len(cles_ajout))] = True
+    fusion_cles = np.empty(len(ajoutees), dtype=TYPE_CLES)
+    fusion_cles[~ajoutees], fusion_cles[ajoutees] = cles, cles_ajout
+    positions = np.empty(len(ajoutees), dtype=np.int64)
+    positions[~ajoutees], positions[ajoutees] = disposition['positions'], disposition_ajout['positions']
+    return {
+        'clients': clients,
+        'cles': fusion_cles,
+        'positions': positions,
+        'plages': _ranges(clients, fusion_cles['client'])
+    }
+
+register_aggregate('lignes_clients', build_customer_layout, merge_customer_layouts)
+
+def list_customers():
+    """Noms des clients indexés (ordre alphabétique)"""
+    return list(get_aggregate('lignes_clients')['plages'])
+
+def get_customer_rows(nom):
+    """Lignes d'un client (historique complet), résolues par l'index client -> plage"""
+    disposition = get_aggregate('lignes_clients')
+    plage = disposition['plages'].get(nom)
+    if plage is None:
+        return get_rows([])
+    return get_rows(disposition['positions'][plage[0]:plage[1]])
+
+def customer_profile(lignes):
+    """
+    Fiche d'un client à partir de ses lignes : synthèse, commandes, mix de
+    gammes, statuts, adresses et remises par gamme.
+    """
+    lignes = lignes.assign(Remise=discount_rates(lignes) * 100)
+    commandes = lignes.groupby('Numéro_Commande', sort=False).agg(
+        Date_Commande=('Date_Commande', 'first'),
+        Statut=('Statut', 'first'),
+        Nb_Lignes=('Numéro_Ligne_Commande', 'size'),
+        Quantité_Commandée=('Quantité_Commandée', 'sum'),
+        **{"Chiffre d'Affaires": ("Chiffre d'Affaires", 'sum')},
+        Remise_Moyenne=('Remise', 'mean')
+    )
+    ca = lignes["Chiffre d'Affaires"]
+    gammes = lignes.groupby('Gamme_de_Produits').agg(
+        **{"Chiffre d'Affaires": ("Chiffre d'Affaires", 'sum')},
+        Quantité_Commandée=('Quantité_Commandée', 'sum'),
+        Nb_Produits=('Code_Produit', 'nunique')
+    )
+    gammes['Remise_Ponderee_CA'] = (lignes['Remise'] * ca).groupby(lignes['Gamme_de_Produits']).sum() / gammes["Chiffre d'Affaires"]
+    gammes['Part_CA'] = gammes["Chiffre d'Affaires"] / ca.sum() * 100
+    statuts = commandes.groupby('Statut').agg(
+        Nb_Commandes=('Statut', 'size'), **{"Chiffre d'Affaires": ("Chiffre d'Affaires", 'sum')}
+    )
+    adresses = lignes.groupby(COLONNES_ADRESSE, sort=False).agg(
+        Premiere_Commande=('Date_Commande', 'min'),
+        Derniere_Commande=('Date_Commande', 'max'),
+        Nb_Lignes=('Date_Commande', 'size')
+    ).reset_index()
+    synthese = {
+        'ca': ca.sum(),
+        'commandes': len(commandes),
+        'panier': ca.sum() / len(commandes) if len(commandes) else 0.0,
+        'premiere_commande': lignes['Date_Commande'].min(),
+        'derniere_commande': lignes['Date_Commande'].max(),
+        'remise_ponderee': (lignes['Remise'] * ca).sum() / ca.sum() if ca.sum() else np.nan,
+        'produits': lignes['Code_Produit'].nunique()
+    }
+    return {
+        'synthese': synthese,
+        'commandes': commandes.reset_index(),
+        'gammes': gammes.sort_values("Chiffre d'Affaires", ascending=False),
+        'statuts': statuts,
+        'adresses': adresses
+    }
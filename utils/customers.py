@@ -0,0 +1,126 @@
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import register_aggregate, get_aggregate
+
+# ==============================================================================
+# TABLE DES COMMANDES (PRÉ-AGRÉGAT MAINTENU PAR DELTA)
+# ==============================================================================
+# Une ligne par commande : client, pays, date, statut, et mesures ventilées par
+# gamme (colonnes larges). Un filtre de gammes se résout en sommant les colonnes
+# sélectionnées, sans relire les lignes de commande : les comptages de
+# commandes distinctes restent exacts quelle que soit la sélection.
+
+ATTRIBUTS_COMMANDE = {
+    'Nom_du_Client': 'first',
+    'Pays': 'first',
+    'Année': 'first',
+    'Date_Commande': 'min',
+    'Statut': 'first'
+}
+MESURES_GAMME = {
+    'ca': "Chiffre d'Affaires",
+    'ca_premium': 'CA_Premium',
+    'quantite': 'Quantité_Commandée',
+    'lignes': 'Numéro_Ligne_Commande'
+}
+TAILLES_PREMIUM = ['Medium', 'Large']
+PREFIXE_MIX = 'Mix_'  # part du CA client réalisée dans chaque gamme
+
+def build_order_table(df):
+    """Construit la table des commandes : attributs et mesures par gamme"""
+    attributs = df.groupby('Numéro_Commande', sort=True).agg(ATTRIBUTS_COMMANDE)
+    premium = df['Taille de Transaction'].isin(TAILLES_PREMIUM)
+    df = df.assign(CA_Premium=df["Chiffre d'Affaires"].where(premium, 0.0))
+    cles = ['Numéro_Commande', 'Gamme_de_Produits']
+    mesures = df.groupby(cles).agg({
+        colonne: 'size' if nom == 'lignes' else 'sum' for nom, colonne in MESURES_GAMME.items()
+    })
+    table = {'commandes': attributs}
+    for nom, colonne in MESURES_GAMME.items():
+        table[nom] = mesures[colonne].unstack(fill_value=0).reindex(attributs.index, fill_value=0)
+    return table
+
+def merge_order_tables(table, table_ajout):
+    """Fusionne la table des commandes avec celle des lignes ajoutées"""
+    attributs = pd.concat([table['commandes'], table_ajout['commandes']])
+    fusion = {'commandes': attributs.groupby(level=0, sort=True).agg(ATTRIBUTS_COMMANDE)}
+    for nom in MESURES_GAMME:
+        # Alignement préalable : une commande absente d'un côté, ou une gamme
+        # absente d'un bloc, compte pour 0 (pas NaN)
+        mesures, mesures_ajout = table[nom].align(table_ajout[nom], join='outer', fill_value=0)
+        fusion[nom] = (mesures + mesures_ajout).reindex(fusion['commandes'].index, fill_value=0)
+    return fusion
+
+register_aggregate('orders', build_order_table, merge_order_tables)
+
+def slice_orders(table, filters):
+    """
+    Commandes correspondant aux filtres de session, avec leurs mesures
+    restreintes aux gammes sélectionnées (commandes sans ligne sélectionnée exclues).
+    """
+    commandes = table['commandes']
+    gammes = table['lignes'].columns.intersection(filters['productlines'])
+    lignes = table['lignes'][gammes].to_numpy().sum(axis=1)
+    masque = (
+        commandes['Année'].isin(filters['years']).to_numpy() &
+        commandes['Pays'].isin(filters['countries']).to_numpy() &
+        (lignes > 0)
+    )
+    selection = commandes[masque].copy()
+    ca_gammes = table['ca'][gammes].to_numpy()[masque]
+    selection["Chiffre d'Affaires"] = ca_gammes.sum(axis=1)
+    selection['CA_Premium'] = table['ca_premium'][gammes].to_numpy()[masque].sum(axis=1)
+    selection['Quantité_Commandée'] = table['quantite'][gammes].to_numpy()[masque].sum(axis=1)
+    selection['Nb_Lignes'] = lignes[masque]
+    for j, gamme in enumerate(gammes):
+        selection[PREFIXE_MIX + gamme] = ca_gammes[:, j]
+    return selection
+
+def get_reference_date():
+    """Date de référence des récences : lendemain de la dernière commande du dataset"""
+    return get_aggregate('orders')['commandes']['Date_Commande'].max() + pd.Timedelta(days=1)
+
+# ==============================================================================
+# TABLE DES CARACTÉRISTIQUES CLIENTS
+# ==============================================================================
+
+def build_customer_features(commandes, date_reference):
+    """
+    Caractéristiques par client : récence, fréquence, montant, ancienneté,
+    part premium (transactions Medium/Large) et mix de CA par gamme.
+    """
+    colonnes_mix = [c for c in commandes.columns if c.startswith(PREFIXE_MIX)]
+    features = commandes.groupby('Nom_du_Client').agg(
+        Pays=('Pays', 'first'),
+        Nb_Commandes=('Statut', 'size'),
+        **{"Chiffre d'Affaires": ("Chiffre d'Affaires", 'sum')},
+        CA_Premium=('CA_Premium', 'sum'),
+        Quantité_Commandée=('Quantité_Commandée', 'sum'),
+        Premiere_Commande=('Date_Commande', 'min'),
+        Derniere_Commande=('Date_Commande', 'max'),
+        **{c: (c, 'sum') for c in colonnes_mix}
+    )
+    features['Panier_Moyen'] = features["Chiffre d'Affaires"] / features['Nb_Commandes']
+    features['Part_Premium'] = features['CA_Premium'] / features["Chiffre d'Affaires"]
+    features[colonnes_mix] = features[colonnes_mix].div(features["Chiffre d'Affaires"], axis=0)
+    features['Recence_Jours'] = (date_reference - features['Derniere_Commande']).dt.days
+    features['Anciennete_Jours'] = (date_reference - features['Premiere_Commande']).dt.days
+    return features
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_customer_features(version, years, countries, productlines):
+    """Table clients d'une sélection, mise en cache par version des données"""
+    filters = {'years': list(years), 'countries': list(countries), 'productlines': list(productlines)}
+    commandes = slice_orders(get_aggregate('orders'), filters)
+    return build_customer_features(commandes, get_reference_date())
+
+def get_customer_features(filters):
+    """Table des caractéristiques clients pour les filtres de session"""
+    return _cached_customer_features(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines'])
+    )
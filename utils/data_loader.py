@@ -1,27 +1,33 @@
-import pandas as pd
 import streamlit as st
-from config import get_data_path
+from utils.ingestion import refresh_dataset, get_dataset_state, get_dataframe, get_aggregate, has_row_store
 
-@st.cache_data(ttl=3600)
 def load_data(filepath=None):
     """
-    Charge les données depuis le fichier CSV déjà nettoyé.
+    Charge les données depuis le fichier CSV déjà nettoyé,
+    ou depuis le dossier de partitions Année/Mois s'il existe.
+    Les lignes ajoutées en fin de fichier depuis le dernier appel sont
+    intégrées incrémentalement, sans relire l'historique.
+    Avec le moteur SQL, les lignes restent dans la base : seules les cellules
+    du cube (années, mois, pays, gammes et mesures additives) sont retournées,
+    pour la barre latérale et les totaux.
     """
-    # Si aucun chemin n'est fourni, utiliser le système de détection automatique
-    if filepath is None:
-        filepath = get_data_path()
-        if filepath is None:
-            return None
-    
     try:
-        df = pd.read_csv(filepath)
-        # Assurer que la colonne de date est bien au format datetime
-        df['Date_Commande'] = pd.to_datetime(df['Date_Commande'])
-        return df
+        state = refresh_dataset(filepath)
+        if state is None:
+            return None
+        return get_aggregate('cube').reset_index() if has_row_store() else get_dataframe(state)
     except Exception as e:
         st.error(f"Erreur lors du chargement des données: {e}")
         return None
 
+def get_data_version():
+    """Version des données chargées, utilisée comme clé de cache par les analyses"""
+    return get_dataset_state().get('version')
+
+def get_partition_index():
+    """Index des partitions par année, maintenu à chaque ajout de lignes"""
+    return get_dataset_state().get('partition_index')
+
 def validate_data(df):
     """Valide que les données sont chargées correctement"""
     if df is None:
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+
+# ==============================================================================
+# REMISES : PRIX RÉALISÉ VS PRIX CONSEIL
+# ==============================================================================
+# Taux de remise d'une ligne = 1 - prix unitaire réalisé / Prix Conseil (négatif
+# quand le produit est vendu au-dessus du prix conseil). Prix_Unitaire est
+# plafonné à 100 dans l'export : le prix réalisé est donc CA / quantité, égal
+# à Prix_Unitaire sous le plafond. Les distributions sont pré-agrégées par
+# cellule de filtre (Année, Pays, Gamme) et par dimension d'analyse sous forme
+# de moments additifs et d'histogrammes à classes fixes : toute sélection se
+# lit par somme des cellules, quantiles compris (interpolés dans les classes).
+
+DIMENSIONS_REMISE = {
+    'Produit': 'Code_Produit',
+    'Gamme': 'Gamme_de_Produits',
+    'Pays': 'Pays',
+    'Client': 'Nom_du_Client',
+    'Taille de transaction': 'Taille de Transaction'
+}
+CELLULE_REMISE = ['Année', 'Pays', 'Gamme_de_Produits']
+BORNE_MIN_REMISE, BORNE_MAX_REMISE = -1.0, 1.0  # taux hors bornes comptés dans les classes extrêmes
+NB_CLASSES_REMISE = 200
+QUANTILES_REMISE = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+def effective_unit_price(df):
+    """Prix unitaire réalisé de chaque ligne (CA / quantité)"""
+    return df["Chiffre d'Affaires"].to_numpy(dtype=np.float64) / df['Quantité_Commandée'].to_numpy(dtype=np.float64)
+
+def discount_rates(df):
+    """Taux de remise de chaque ligne vs Prix Conseil"""
+    return 1 - effective_unit_price(df) / df['Prix Conseil'].to_numpy(dtype=np.float64)
+
+def discount_class(taux):
+    """Classe d'histogramme de chaque taux de remise"""
+    largeur = (BORNE_MAX_REMISE - BORNE_MIN_REMISE) / NB_CLASSES_REMISE
+    return np.clip(np.floor((taux - BORNE_MIN_REMISE) / largeur), 0, NB_CLASSES_REMISE - 1).astype(np.int64)
+
+def build_discount_aggregates(df):
+    """Moments et histogrammes des taux de remise par cellule et dimension"""
+    taux = discount_rates(df)
+    ca = df["Chiffre d'Affaires"].to_numpy(dtype=np.float64)
+    lignes = df[list(dict.fromkeys(CELLULE_REMISE + list(DIMENSIONS_REMISE.values())))].assign(
+        n=1, somme=taux, somme_carres=taux ** 2, somme_ponderee=taux * ca, ca=ca, Classe=discount_class(taux)
+    )
+    agregats = {}
+    for colonne in DIMENSIONS_REMISE.values():
+        cles = list(dict.fromkeys(CELLULE_REMISE + [colonne]))
+        agregats[colonne] = {
+            'moments': lignes.groupby(cles, sort=True)[['n', 'somme', 'somme_carres', 'somme_ponderee', 'ca']].sum(),
+            'histogrammes': lignes.groupby(cles + ['Classe'], sort=True).size()
+        }
+    return agregats
+
+def merge_discount_aggregates(agregats, agregats_ajout):
+    """Fusionne les pré-agrégats de remises avec ceux des lignes ajoutées"""
+    return {
+        colonne: {
+            nom: valeur.add(agregats_ajout[colonne][nom], fill_value=0)
+            for nom, valeur in parties.items()
+        }
+        for colonne, parties in agregats.items()
+    }
+
+register_aggregate('remises', build_discount_aggregates, merge_discount_aggregates)
+
+def histogram_quantiles(comptes, probabilites):
+    """Quantiles de chaque ligne d'une matrice d'histogrammes, interpolés dans la classe"""
+    largeur = (BORNE_MAX_REMISE - BORNE_MIN_REMISE) / NB_CLASSES_REMISE
+    cumuls = np.cumsum(comptes, axis=1)
+    totaux = cumuls[:, -1:]
+    resultats = np.empty((len(comptes), len(probabilites)))
+    lignes = np.arange(len(comptes))
+    for k, p in enumerate(probabilites):
+        cible = p * totaux
+        classes = np.minimum((cumuls < cible).sum(axis=1), comptes.shape[1] - 1)
+        avant = cumuls[lignes, classes] - comptes[lignes, classes]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.clip((cible[:, 0] - avant) / comptes[lignes, classes], 0, 1)
+        resultats[:, k] = BORNE_MIN_REMISE + (classes + np.nan_to_num(fraction)) * largeur
+    return resultats
+
+def _select_cells(table, filters):
+    """Lignes d'un pré-agrégat correspondant aux filtres de session"""
+    index = table.index
+    return table[
+        index.get_level_values('Année').isin(filters['years']) &
+        index.get_level_values('Pays').isin(filters['countries']) &
+        index.get_level_values('Gamme_de_Produits').isin(filters['productlines'])
+    ]
+
+def summarize_discounts(agregats, filters, colonne):
+    """Statistiques de remise par valeur de la dimension pour une sélection"""
+    moments = _select_cells(agregats[colonne]['moments'], filters).groupby(level=colonne).sum()
+    comptes = (
+        _select_cells(agregats[colonne]['histogrammes'], filters)
+        .groupby(level=[colonne, 'Classe']).sum()
+        .unstack(fill_value=0)
+        .reindex(index=moments.index, columns=range(NB_CLASSES_REMISE), fill_value=0)
+    )
+    n = moments['n']
+    moyenne = moments['somme'] / n
+    variance = (moments['somme_carres'] / n - moyenne ** 2).clip(lower=0) * n / (n - 1).where(n > 1)
+    resume = pd.DataFrame({
+        'Nb_Lignes': n.astype('int64'),
+        'Remise_Moyenne': moyenne * 100,
+        'Remise_Ponderee_CA': moments['somme_ponderee'] / moments['ca'] * 100,
+        'Ecart_Type': np.sqrt(variance) * 100,
+        "Chiffre d'Affaires": moments['ca']
+    })
+    quantiles = histogram_quantiles(comptes.to_numpy(dtype=np.float64), QUANTILES_REMISE) * 100
+    for k, p in enumerate(QUANTILES_REMISE):
+        resume[f"P{int(p * 100)}"] = quantiles[:, k]
+    return resume
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_discounts(version, years, countries, productlines, colonne):
+    """Statistiques de remise mises en cache par version des données et sélection"""
+    filters = {'years': list(years), 'countries': list(countries), 'productlines': list(productlines)}
+    return summarize_discounts(get_aggregate('remises'), filters, colonne)
+
+def get_discount_summary(filters, dimension):
+    """Distribution des remises par produit, gamme, pays, client ou taille de transaction"""
+    return _cached_discounts(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        DIMENSIONS_REMISE[dimension]
+    )
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+from utils.discounts import effective_unit_price
+
+# ==============================================================================
+# ÉLASTICITÉ-PRIX PAR PRODUIT (RÉGRESSIONS LOG-LOG GROUPÉES)
+# ==============================================================================
+# Pour chaque produit, ln(quantité) = a + b ln(prix) : la pente b est
+# l'élasticité. Les moindres carrés ne dépendent que des sommes n, Σx, Σy,
+# Σx², Σxy, Σy², additives : elles sont pré-agrégées par cellule de filtre et
+# produit, puis toutes les régressions sont résolues ensemble sous forme
+# fermée, sans boucle d'ajustement par produit.
+
+CELLULE_ELASTICITE = ['Année', 'Pays', 'Gamme_de_Produits', 'Code_Produit']
+SOMMES_ELASTICITE = ['n', 'sx', 'sy', 'sxx', 'sxy', 'syy']
+MIN_OBSERVATIONS_ELASTICITE = 10
+NIVEAUX_CONFIANCE = ['Élevée', 'Moyenne', 'Faible']
+Z_ELASTICITE = 1.96  # intervalle de confiance à 95 % (approximation normale)
+
+def build_elasticity_sums(df):
+    """Sommes suffisantes des régressions log-log par cellule et produit"""
+    x = np.log(effective_unit_price(df))
+    y = np.log(df['Quantité_Commandée'].to_numpy(dtype=np.float64))
+    lignes = df[CELLULE_ELASTICITE].assign(n=1, sx=x, sy=y, sxx=x * x, sxy=x * y, syy=y * y)
+    return lignes.groupby(CELLULE_ELASTICITE, sort=True)[SOMMES_ELASTICITE].sum()
+
+def merge_elasticity_sums(sommes, sommes_ajout):
+    """Fusionne les sommes suffisantes avec celles des lignes ajoutées"""
+    return sommes.add(sommes_ajout, fill_value=0)
+
+register_aggregate('elasticite', build_elasticity_sums, merge_elasticity_sums)
+
+def grouped_loglog(sommes):
+    """
+    Régressions simples de toutes les lignes de `sommes` à la fois :
+    pente (élasticité), erreur type, intervalle de confiance, R² et effectif.
+    """
+    n = sommes['n'].to_numpy(dtype=np.float64)
+    sx, sy = sommes['sx'].to_numpy(), sommes['sy'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Sxx = sommes['sxx'].to_numpy() - sx * sx / n
+        Sxy = sommes['sxy'].to_numpy() - sx * sy / n
+        Syy = sommes['syy'].to_numpy() - sy * sy / n
+        # Prix constant (Sxx ~ 0) : pente non identifiable
+        identifiable = Sxx > 1e-12 * np.maximum(sommes['sxx'].to_numpy(), 1)
+        pente = np.where(identifiable, Sxy / Sxx, np.nan)
+        residus = np.maximum(Syy - pente * Sxy, 0)
+        erreur = np.sqrt(residus / (n - 2) / Sxx)
+        r2 = np.where(Syy > 0, 1 - residus / Syy, np.nan)
+    erreur = np.where(n > 2, erreur, np.nan)
+    resultat = pd.DataFrame({
+        'Elasticite': pente,
+        'Erreur_Type': erreur,
+        'IC_Bas': pente - Z_ELASTICITE * erreur,
+        'IC_Haut': pente + Z_ELASTICITE * erreur,
+        'R2': r2,
+        'Nb_Observations': n.astype(np.int64)
+    }, index=sommes.index)
+    resultat['Statistique_t'] = resultat['Elasticite'] / resultat['Erreur_Type']
+    return resultat
+
+def confidence_label(resultats):
+    """Niveau de confiance de chaque estimation selon l'effectif et la statistique t"""
+    t = resultats['Statistique_t'].abs()
+    assez = resultats['Nb_Observations'] >= MIN_OBSERVATIONS_ELASTICITE
+    niveaux = np.select([assez & (t >= 2.58), assez & (t >= Z_ELASTICITE)], NIVEAUX_CONFIANCE[:2], NIVEAUX_CONFIANCE[2])
+    return pd.Series(pd.Categorical(niveaux, categories=NIVEAUX_CONFIANCE, ordered=True), index=resultats.index)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_elasticities(version, years, countries, productlines):
+    """Élasticités par produit mises en cache par version des données et sélection"""
+    sommes = get_aggregate('elasticite')
+    index = sommes.index
+    selection = sommes[
+        index.get_level_values('Année').isin(years) &
+        index.get_level_values('Pays').isin(countries) &
+        index.get_level_values('Gamme_de_Produits').isin(productlines)
+    ]
+    par_produit = selection.groupby(level=['Code_Produit', 'Gamme_de_Produits']).sum()
+    resultats = grouped_loglog(par_produit)
+    resultats['Confiance'] = confidence_label(resultats)
+    return resultats.reset_index('Gamme_de_Produits')
+
+def get_price_elasticities(filters):
+    """Élasticité-prix de la quantité de chaque produit pour les filtres de session"""
+    return _cached_elasticities(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines'])
+    )
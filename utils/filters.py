@@ -1,15 +1,50 @@
+import weakref
 import streamlit as st
 import pandas as pd
+from utils.data_loader import get_partition_index
+from config import QUERY_BACKEND
+from utils.partitions import prune_partitions
+from utils.session_manager import get_session_filters
+from utils.sql_backend import query_filtered
+
+# Positions dans le dataset des lignes de chaque cadre produit par le filtrage
+# (clé : id du cadre, valide tant que ce cadre existe). Seul le cadre exact
+# retourné par get_filtered_data y a droit : un cadre dérivé (ré-indexé,
+# trié, sous-filtré) n'a pas de positions et ses codes sont recalculés.
+_POSITIONS = {}
+
+def _register_positions(df, positions):
+    """Associe au cadre filtré les positions de ses lignes dans le dataset"""
+    cle = id(df)
+    _POSITIONS[cle] = (weakref.ref(df), positions)
+    weakref.finalize(df, _POSITIONS.pop, cle, None)
+    return df
+
+def filtered_positions(df):
+    """Positions dans le dataset des lignes d'un cadre issu du filtrage (None sinon)"""
+    entree = _POSITIONS.get(id(df))
+    if entree is None or entree[0]() is not df:
+        return None
+    return entree[1]
 
 def get_filtered_data(df):
     """Retourne le dataframe filtré avec gestion des erreurs"""
     try:
-        filtered_df = df[
-            df['Année'].isin(st.session_state.selected_years) &
-            df['Pays'].isin(st.session_state.selected_countries) &
-            df['Gamme_de_Produits'].isin(st.session_state.selected_productlines)
+        # Moteur SQL : le filtrage est exécuté par la base embarquée
+        if QUERY_BACKEND == 'sql':
+            filtered_df, positions = query_filtered(get_session_filters())
+            return _register_positions(filtered_df, positions)
+        
+        # Élagage des partitions : seules les années sélectionnées sont parcourues
+        index = get_partition_index()
+        df_annees = prune_partitions(df, st.session_state.selected_years, index)
+        
+        filtered_df = df_annees[
+            df_annees['Pays'].isin(st.session_state.selected_countries) &
+            df_annees['Gamme_de_Produits'].isin(st.session_state.selected_productlines)
         ]
-        return filtered_df
+        # Le dataset chargé est indexé par position : l'index filtré donne les positions
+        return _register_positions(filtered_df, filtered_df.index.to_numpy())
     except Exception as e:
         st.error(f"Erreur lors de l'application des filtres: {e}")
         return df
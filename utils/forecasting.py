@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate
+from utils.cube import monthly_series
+
+# ==============================================================================
+# PRÉVISIONS HOLT-WINTERS PAR LOT DE SÉRIES
+# ==============================================================================
+# Lissage exponentiel additif (niveau, tendance, saisonnalité de 12 mois)
+# appliqué à toutes les séries mensuelles de CA en même temps : total, chaque
+# gamme et chaque pays. Les paramètres sont choisis par recherche sur grille,
+# évaluée pour toutes les séries et toutes les combinaisons en une seule
+# récurrence vectorisée (tableaux combinaisons x séries).
+
+PERIODE_SAISON = 12
+GRILLE_ALPHA = [0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9]
+GRILLE_BETA = [0.0, 0.05, 0.1, 0.2]
+GRILLE_GAMMA = [0.05, 0.1, 0.3, 0.5]
+Z_INTERVALLE = 1.96  # intervalle de prévision à 95 %
+
+def _initial_states(Y, m, saisonnier):
+    """États initiaux : niveau et tendance des deux premières saisons, indices saisonniers"""
+    if saisonnier:
+        premiere, seconde = Y[:, :m].mean(axis=1), Y[:, m:2 * m].mean(axis=1)
+        niveau, tendance = premiere, (seconde - premiere) / m
+        saisons = Y[:, :m] - premiere[:, None]
+    else:
+        niveau, tendance = Y[:, 0], (Y[:, -1] - Y[:, 0]) / max(Y.shape[1] - 1, 1)
+        saisons = np.zeros((len(Y), m))
+    return niveau, tendance, saisons
+
+def _smooth(Y, alpha, beta, gamma, m, saisonnier):
+    """
+    Récurrence Holt-Winters additive vectorisée sur toutes les lignes de Y.
+    Retourne états finaux, prévisions à un pas et somme des carrés des erreurs.
+    """
+    n, T = Y.shape
+    niveau, tendance, saisons = _initial_states(Y, m, saisonnier)
+    saisons = saisons.copy()
+    ajustees = np.empty((n, T))
+    sse = np.zeros(n)
+    debut_erreurs = m if saisonnier else 1
+    for t in range(T):
+        s = t % m
+        prevision = niveau + tendance + saisons[:, s]
+        ajustees[:, t] = prevision
+        if t >= debut_erreurs:
+            sse += (Y[:, t] - prevision) ** 2
+        nouveau_niveau = alpha * (Y[:, t] - saisons[:, s]) + (1 - alpha) * (niveau + tendance)
+        tendance = beta * (nouveau_niveau - niveau) + (1 - beta) * tendance
+        if saisonnier:
+            saisons[:, s] = gamma * (Y[:, t] - nouveau_niveau) + (1 - gamma) * saisons[:, s]
+        niveau = nouveau_niveau
+    return niveau, tendance, saisons, ajustees, sse, T - debut_erreurs
+
+def holt_winters_batch(Y, horizon, m=PERIODE_SAISON):
+    """
+    Ajuste Holt-Winters à chaque série (ligne de Y) et prévoit `horizon` mois.
+    Les paramètres (alpha, beta, gamma) minimisent l'erreur à un pas de chaque série.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    S, T = Y.shape
+    saisonnier = T >= 2 * m
+    grille = np.array([
+        (a, b, g) for a in GRILLE_ALPHA for b in GRILLE_BETA for g in (GRILLE_GAMMA if saisonnier else [0.0])
+    ])
+    P = len(grille)
+
+    # Toutes les combinaisons pour toutes les séries : P x S lignes
+    lignes = np.tile(Y, (P, 1))
+    alpha, beta, gamma = (np.repeat(grille[:, k], S) for k in range(3))
+    *_, sse, _ = _smooth(lignes, alpha, beta, gamma, m, saisonnier)
+    meilleurs = sse.reshape(P, S).argmin(axis=0)
+    parametres = grille[meilleurs]
+
+    # Passe finale avec les paramètres retenus
+    niveau, tendance, saisons, ajustees, sse, n_erreurs = _smooth(
+        Y, parametres[:, 0], parametres[:, 1], parametres[:, 2], m, saisonnier
+    )
+    h = np.arange(1, horizon + 1)
+    indices_saison = (T + h - 1) % m
+    previsions = niveau[:, None] + h[None, :] * tendance[:, None] + saisons[:, indices_saison]
+
+    # Variance de prévision à h pas : sigma² (1 + somme des c_j², j < h)
+    sigma = np.sqrt(sse / max(n_erreurs, 1))
+    j = np.arange(1, horizon)
+    c = parametres[:, [0]] * (1 + j[None, :] * parametres[:, [1]]) + parametres[:, [2]] * (j % m == 0)[None, :]
+    cumul = np.concatenate([np.zeros((S, 1)), np.cumsum(c ** 2, axis=1)], axis=1)
+    ecart = Z_INTERVALLE * sigma[:, None] * np.sqrt(1 + cumul)
+    return {
+        'previsions': np.maximum(previsions, 0),
+        'bas': np.maximum(previsions - ecart, 0),
+        'haut': previsions + ecart,
+        'ajustees': ajustees,
+        'parametres': parametres,
+        'sigma': sigma
+    }
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_forecasts(version, countries, productlines, horizon):
+    """Prévisions de toutes les séries, mises en cache par version des données"""
+    cube = get_aggregate('cube')
+    annees = sorted(cube.index.get_level_values('Année').unique())
+    filters = {'years': annees, 'countries': list(countries), 'productlines': list(productlines)}
+    historique = monthly_series(cube, filters)
+    historique = historique[historique.sum(axis=1) > 0]
+    if historique.empty:
+        return None
+    resultat = holt_winters_batch(historique.to_numpy(), horizon)
+    futurs = pd.period_range(historique.columns[-1] + 1, periods=horizon, freq='M')
+
+    def cadre(valeurs, colonnes):
+        return pd.DataFrame(valeurs, index=historique.index, columns=colonnes)
+
+    return {
+        'historique': historique,
+        'ajustees': cadre(resultat['ajustees'], historique.columns),
+        'previsions': cadre(resultat['previsions'], futurs),
+        'bas': cadre(resultat['bas'], futurs),
+        'haut': cadre(resultat['haut'], futurs),
+        'parametres': cadre(resultat['parametres'], ['alpha', 'beta', 'gamma'])
+    }
+
+def get_forecasts(filters, horizon):
+    """
+    Prévisions mensuelles du CA (total, gammes, pays) pour les pays et gammes
+    sélectionnés ; l'historique complet est utilisé quel que soit le filtre d'années.
+    """
+    return _cached_forecasts(
+        get_data_version(),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        horizon
+    )
@@ -0,0 +1,406 @@
+import hashlib
+import io
+import os
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import get_data_path, get_partitions_path
+from utils.partitions import list_partitions, sort_by_partitions, build_partition_index, extend_partition_index
+from utils.cube import build_cube, merge_cubes
+from utils.kernels import build_column_codes, merge_column_codes
+
+# ==============================================================================
+# INGESTION INCRÉMENTALE (AJOUTS EN FIN DE FICHIER)
+# ==============================================================================
+# L'export des ventes grandit par ajout de lignes. Pour chaque fichier source,
+# on mémorise le nombre d'octets déjà lus : au rafraîchissement, seuls les
+# octets ajoutés depuis sont analysés, puis le dataset, l'index de partitions
+# et les pré-agrégats sont mis à jour avec ce delta. Si le contenu déjà lu a
+# changé (fichier réécrit ou tronqué), on recharge tout. Le dataset est une
+# liste de blocs (chargement initial puis un bloc par ajout) : un ajout ne
+# recopie pas l'historique, les blocs ne sont concaténés qu'à la lecture.
+#
+# Avec un stockage externe des lignes (moteur SQL), le dataset n'est pas gardé
+# en mémoire : la source est lue par morceaux de lignes complètes, chaque
+# morceau est écrit dans le stockage et intégré aux pré-agrégats, puis libéré.
+
+TAILLE_SIGNATURE = 64  # octets relus avant l'offset pour détecter une réécriture
+TAILLE_MORCEAU = 64 * 1024 * 1024  # octets lus par morceau (stockage externe)
+TAILLE_BLOC = 500_000  # lignes relues par bloc dans le stockage externe
+
+# Colonnes de l'export des ventes et leurs types (dataset vide : source sans ligne)
+SCHEMA_VENTES = {
+    'Numéro_Commande': 'int64',
+    'Quantité_Commandée': 'int64',
+    'Prix_Unitaire': 'float64',
+    'Numéro_Ligne_Commande': 'int64',
+    "Chiffre d'Affaires": 'float64',
+    'Date_Commande': 'str',
+    'Statut': 'str',
+    'Trimestre_ID': 'int64',
+    'Mois': 'int64',
+    'Année': 'int64',
+    'Gamme_de_Produits': 'str',
+    'Prix Conseil': 'int64',
+    'Code_Produit': 'str',
+    'Nom_du_Client': 'str',
+    'Adresse_Ligne_1': 'str',
+    'Ville': 'str',
+    'Code_Postal': 'str',
+    'Pays': 'str',
+    'Taille de Transaction': 'str'
+}
+# Colonnes texte lues comme telles dans chaque bloc (types stables d'un bloc à l'autre)
+TYPES_TEXTE = {colonne: type_ for colonne, type_ in SCHEMA_VENTES.items() if type_ == 'str'}
+
+# Pré-agrégats maintenus par delta : nom -> (construction, fusion)
+_AGREGATS = {
+    'cube': (build_cube, merge_cubes),
+    'codes': (build_column_codes, merge_column_codes),
+}
+
+def register_aggregate(nom, construction, fusion):
+    """
+    Déclare un pré-agrégat maintenu incrémentalement à chaque ajout de lignes.
+    Les lignes passées à `construction` sont indexées par leur position dans
+    le dataset (chargement complet ou bloc ajouté).
+    """
+    _AGREGATS[nom] = (construction, fusion)
+
+# Stockage externe des lignes (None : blocs pandas en mémoire)
+_STOCKAGE = {'lignes': None}
+
+def register_row_store(ouvrir, ajouter, valider, lire):
+    """
+    Déclare un stockage externe des lignes, à la place du dataset en mémoire.
+    Au chargement complet, `ouvrir(source, empreinte)` indique si le stockage
+    contient déjà exactement ce contenu ; sinon il est vidé et chaque bloc lu
+    (indexé par positions) lui est passé par `ajouter(bloc)`, comme chaque
+    ajout de lignes. `valider(source, empreinte, n_lignes)` enregistre l'état
+    une fois les blocs écrits ; `lire(positions)` relit des lignes.
+    """
+    _STOCKAGE['lignes'] = (ouvrir, ajouter, valider, lire)
+
+def has_row_store():
+    """Indique si les lignes sont dans un stockage externe (pas de dataset en mémoire)"""
+    return _STOCKAGE['lignes'] is not None
+
+@st.cache_resource
+def get_dataset_state():
+    """État partagé du dataset (blocs de données, offsets de lecture, index, pré-agrégats)"""
+    return {'lock': threading.Lock(), 'source': None}
+
+def prepare_data(df):
+    """Typage des dates et tri par clés de partition"""
+    df['Date_Commande'] = pd.to_datetime(df['Date_Commande'])
+    return sort_by_partitions(df)
+
+def _list_source_files(source):
+    """Liste les fichiers CSV constituant la source (fichier plat ou partitions)"""
+    if os.path.isdir(source):
+        return [chemin for _, _, chemin in list_partitions(source)]
+    return [source]
+
+def _read_signature(fichier, offset):
+    """Relit les derniers octets consommés d'un fichier"""
+    with open(fichier, 'rb') as f:
+        f.seek(max(0, offset - TAILLE_SIGNATURE))
+        return f.read(min(offset, TAILLE_SIGNATURE))
+
+def _empty_frame():
+    """Dataset vide typé (source sans ligne)"""
+    return pd.DataFrame({colonne: pd.Series(dtype=type_) for colonne, type_ in SCHEMA_VENTES.items()})
+
+def _parse(entete, donnees):
+    """Lit un bloc de lignes CSV complètes précédées de l'en-tête du fichier"""
+    return pd.read_csv(io.BytesIO(entete + donnees), dtype=TYPES_TEXTE)
+
+def _new_tracking(fichier):
+    """Suivi d'un fichier dont rien n'a encore été lu"""
+    empreinte = hashlib.blake2b(digest_size=16)
+    empreinte.update(fichier.encode() + b'\0')
+    return {'offset': 0, 'entete': None, 'signature': b'', 'empreinte': empreinte}
+
+def _consume(suivi, consommes):
+    """
+    Suivi d'un fichier après lecture de lignes complètes (offset, en-tête,
+    signature, empreinte du contenu lu) et lignes de données consommées.
+    """
+    entete, donnees = suivi['entete'], consommes
+    if entete is None and consommes:
+        entete, _, donnees = consommes.partition(b'\n')
+        entete += b'\n'
+    empreinte = suivi['empreinte'].copy()
+    empreinte.update(consommes)
+    return {
+        'offset': suivi['offset'] + len(consommes),
+        'entete': entete,
+        'signature': (suivi['signature'] + consommes[-TAILLE_SIGNATURE:])[-TAILLE_SIGNATURE:],
+        'empreinte': empreinte
+    }, donnees
+
+def _source_fingerprint(fichiers):
+    """Empreinte du contenu lu de la source (identifie le dataset d'un processus à l'autre)"""
+    empreinte = hashlib.blake2b(digest_size=16)
+    for fichier in sorted(fichiers):
+        suivi = fichiers[fichier]
+        empreinte.update(f"{fichier}:{suivi['offset']}:{suivi['empreinte'].hexdigest()}\n".encode())
+    return empreinte.hexdigest()
+
+def _read_chunks(fichier, fin=None):
+    """Lit un fichier par morceaux de lignes complètes, jusqu'à l'octet `fin` ou la dernière fin de ligne"""
+    with open(fichier, 'rb') as f:
+        reste, lus = b'', 0
+        while fin is None or lus < fin:
+            morceau = f.read(TAILLE_MORCEAU if fin is None else min(TAILLE_MORCEAU, fin - lus))
+            if not morceau:
+                break
+            lus += len(morceau)
+            reste += morceau
+            coupe = reste.rfind(b'\n') + 1
+            if coupe:
+                yield reste[:coupe]
+                reste = reste[coupe:]
+
+def _push_partial(pile, n_lignes, partiel, fusion):
+    """
+    Empile le pré-agrégat d'un morceau en fusionnant les partiels de tailles
+    voisines (fusion binaire : chaque ligne est recopiée O(log k) fois pour k
+    morceaux, au lieu de k fois en fusionnant chaque morceau au total).
+    """
+    while pile and pile[-1][0] <= n_lignes:
+        n_precedent, precedent = pile.pop()
+        partiel = fusion(precedent, partiel)
+        n_lignes += n_precedent
+    pile.append((n_lignes, partiel))
+
+def _fold_partials(pile, fusion):
+    """Fusionne les partiels restants d'une pile, dans l'ordre des lignes"""
+    _, agregat = pile[-1]
+    for _, precedent in reversed(pile[:-1]):
+        agregat = fusion(precedent, agregat)
+    return agregat
+
+def _read_full(state, source):
+    """Chargement complet de la source et reconstruction de tous les index"""
+    if has_row_store():
+        return _read_full_to_store(state, source)
+    fichiers = {}
+    blocs = []
+    for fichier in _list_source_files(source):
+        with open(fichier, 'rb') as f:
+            contenu = f.read()
+        # Comme pour les ajouts, seules les lignes complètes sont consommées
+        contenu = contenu[:contenu.rfind(b'\n') + 1]
+        fichiers[fichier], donnees = _consume(_new_tracking(fichier), contenu)
+        if donnees.strip():
+            blocs.append(_parse(fichiers[fichier]['entete'], donnees))
+
+    # Source vide (ou en-tête seul) : dataset vide typé, tableau de bord vide
+    df = prepare_data(pd.concat(blocs, ignore_index=True) if blocs else _empty_frame())
+    state.update({
+        'source': source,
+        'fichiers': fichiers,
+        'blocs': [df],
+        'n_lignes': len(df),
+        'partition_index': build_partition_index(df),
+        'aggregates': {nom: construction(df) for nom, (construction, _) in _AGREGATS.items()},
+        'empreinte': _source_fingerprint(fichiers),
+        'generation': state.get('generation', 0) + 1
+    })
+
+def _read_full_to_store(state, source):
+    """
+    Chargement complet vers le stockage externe : un premier passage calcule
+    l'empreinte du contenu (le stockage est repris tel quel s'il la porte
+    déjà), le second lit la source par morceaux, écrit chaque morceau et
+    l'intègre aux pré-agrégats. Aucun dataset n'est gardé en mémoire.
+    """
+    ouvrir, ajouter, valider, _ = _STOCKAGE['lignes']
+    fichiers = {}
+    for fichier in _list_source_files(source):
+        suivi = _new_tracking(fichier)
+        for morceau in _read_chunks(fichier):
+            suivi, _ = _consume(suivi, morceau)
+        fichiers[fichier] = suivi
+    empreinte = _source_fingerprint(fichiers)
+    deja_stocke = ouvrir(source, empreinte)
+
+    piles = {nom: [] for nom in _AGREGATS}
+    partition_index = {'n_rows': 0, 'bornes': {}}
+    n_lignes = 0
+
+    def integrer(bloc):
+        bloc.index = pd.RangeIndex(n_lignes, n_lignes + len(bloc))
+        if not deja_stocke:
+            ajouter(bloc)
+        for nom, (construction, fusion) in _AGREGATS.items():
+            _push_partial(piles[nom], len(bloc), construction(bloc), fusion)
+        return extend_partition_index(partition_index, bloc, n_lignes)
+
+    for fichier, suivi in fichiers.items():
+        premier = True
+        for morceau in _read_chunks(fichier, suivi['offset']):
+            if premier:
+                _, _, morceau = morceau.partition(b'\n')
+                premier = False
+            if morceau.strip():
+                bloc = prepare_data(_parse(suivi['entete'], morceau))
+                partition_index = integrer(bloc)
+                n_lignes += len(bloc)
+    if n_lignes == 0:
+        # Source vide : table et pré-agrégats créés à partir du dataset vide typé
+        partition_index = integrer(prepare_data(_empty_frame()))
+    valider(source, empreinte, n_lignes)
+
+    state.update({
+        'source': source,
+        'fichiers': fichiers,
+        'blocs': None,
+        'n_lignes': n_lignes,
+        'partition_index': partition_index,
+        'aggregates': {nom: _fold_partials(piles[nom], fusion) for nom, (_, fusion) in _AGREGATS.items()},
+        'empreinte': empreinte,
+        'generation': state.get('generation', 0) + 1
+    })
+
+def _read_delta(state, source):
+    """
+    Retourne les octets ajoutés à chaque fichier depuis la dernière lecture,
+    ou None si un contenu déjà lu a été modifié.
+    """
+    fichiers_actuels = _list_source_files(source)
+    if set(state['fichiers']) - set(fichiers_actuels):
+        return None  # une partition a disparu
+
+    ajouts = []
+    for fichier in fichiers_actuels:
+        taille = os.path.getsize(fichier)
+        suivi = state['fichiers'].get(fichier)
+
+        if suivi is None:
+            # Nouvelle partition : lue entièrement
+            suivi = _new_tracking(fichier)
+        elif taille < suivi['offset'] or _read_signature(fichier, suivi['offset']) != suivi['signature']:
+            return None
+        if taille == suivi['offset']:
+            continue
+
+        with open(fichier, 'rb') as f:
+            f.seek(suivi['offset'])
+            octets = f.read(taille - suivi['offset'])
+        # Seules les lignes complètes sont consommées (écriture éventuellement en cours)
+        fin = octets.rfind(b'\n') + 1
+        if fin == 0:
+            continue
+        nouveau_suivi, donnees = _consume(suivi, octets[:fin])
+        ajouts.append((fichier, nouveau_suivi, donnees))
+    return ajouts
+
+def _apply_delta(state, ajouts):
+    """Intègre les lignes ajoutées : dataset (ou stockage), index de partitions et pré-agrégats"""
+    blocs = []
+    for fichier, suivi, donnees in ajouts:
+        state['fichiers'][fichier] = suivi
+        if donnees.strip():
+            blocs.append(_parse(suivi['entete'], donnees))
+    state['empreinte'] = _source_fingerprint(state['fichiers'])
+
+    if blocs:
+        delta = prepare_data(pd.concat(blocs, ignore_index=True))
+        debut = state['n_lignes']
+        delta.index = pd.RangeIndex(debut, debut + len(delta))
+        if has_row_store():
+            _STOCKAGE['lignes'][1](delta)
+        else:
+            state['blocs'].append(delta)
+        state['n_lignes'] += len(delta)
+        state['partition_index'] = extend_partition_index(state['partition_index'], delta, debut)
+        for nom, (construction, fusion) in _AGREGATS.items():
+            if nom in state['aggregates']:
+                state['aggregates'][nom] = fusion(state['aggregates'][nom], construction(delta))
+    if has_row_store():
+        _STOCKAGE['lignes'][2](state['source'], state['empreinte'], state['n_lignes'])
+
+def refresh_dataset(filepath=None):
+    """
+    Met à jour le dataset partagé avec les lignes ajoutées depuis le dernier
+    rafraîchissement et retourne son état (None si aucune source n'est trouvée).
+    """
+    source = filepath or get_partitions_path() or get_data_path()
+    if source is None:
+        return None
+
+    state = get_dataset_state()
+    with state['lock']:
+        if state['source'] != source:
+            _read_full(state, source)
+        else:
+            ajouts = _read_delta(state, source)
+            if ajouts is None:
+                _read_full(state, source)
+            elif ajouts:
+                _apply_delta(state, ajouts)
+        state['version'] = f"{source}:{state['generation']}:{state['n_lignes']}"
+    return state
+
+def _rows(state, debut=0):
+    """
+    Lignes du dataset à partir de la position `debut` (index = positions).
+    Le dataset complet est concaténé une fois et remplace ses blocs ; une
+    lecture partielle ne concatène que les blocs couvrant la fin. Avec un
+    stockage externe, les lignes y sont relues.
+    """
+    if has_row_store():
+        return _STOCKAGE['lignes'][3](np.arange(debut, state['n_lignes']))
+    blocs = state['blocs']
+    if debut == 0:
+        if len(blocs) > 1:
+            state['blocs'] = [pd.concat(blocs, ignore_index=True)]
+        return state['blocs'][0]
+    depart, k = state['n_lignes'], len(blocs)
+    while k > 0 and depart > debut:
+        k -= 1
+        depart -= len(blocs[k])
+    fin = pd.concat(blocs[k:]) if len(blocs) - k > 1 else blocs[k]
+    return fin.iloc[debut - depart:]
+
+def get_dataframe(state, debut=0):
+    """Dataset chargé (ou ses lignes à partir de la position `debut`)"""
+    with state['lock']:
+        return _rows(state, debut)
+
+def get_rows(positions):
+    """Lignes du dataset aux positions données, dans cet ordre (index = positions)"""
+    state = get_dataset_state()
+    with state['lock']:
+        if has_row_store():
+            return _STOCKAGE['lignes'][3](positions)
+        return _rows(state).take(positions)
+
+def _build_aggregate(state, construction, fusion):
+    """Construit un pré-agrégat sur tout le dataset (par morceaux relus dans un stockage externe)"""
+    if not has_row_store():
+        return construction(_rows(state))
+    lire = _STOCKAGE['lignes'][3]
+    pile = []
+    for debut in range(0, state['n_lignes'], TAILLE_BLOC):
+        fin = min(debut + TAILLE_BLOC, state['n_lignes'])
+        _push_partial(pile, fin - debut, construction(lire(np.arange(debut, fin))), fusion)
+    if not pile:
+        return construction(prepare_data(_empty_frame()))
+    return _fold_partials(pile, fusion)
+
+def get_aggregate(nom):
+    """Retourne un pré-agrégat à jour (construit à la demande s'il vient d'être déclaré)"""
+    state = get_dataset_state()
+    if state['source'] is None:
+        state = refresh_dataset()
+        if state is None:
+            raise FileNotFoundError("Aucune source de données : pré-agrégat indisponible")
+    with state['lock']:
+        if nom not in state['aggregates']:
+            construction, fusion = _AGREGATS[nom]
+            state['aggregates'][nom] = _build_aggregate(state, construction, fusion)
+        return state['aggregates'][nom]
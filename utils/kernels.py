@@ -0,0 +1,272 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# NOYAUX D'AGRÉGATION PAR GROUPE (CODES ENTIERS + BINCOUNT)
+# ==============================================================================
+# Les colonnes catégorielles sont codées en entiers une fois par version des
+# données (dictionnaire maintenu par l'ingestion incrémentale). Les clés d'un
+# regroupement sont combinées en un code unique par groupe, puis chaque mesure
+# est agrégée en une passe vectorisée (np.bincount / ufunc.at) au lieu du
+# groupby pandas.
+
+TAILLE_MAX_DENSE = 1 << 22  # au-delà, les combinaisons de codes sont compactées par tri
+
+KERNEL_FUNCTIONS = {'sum', 'count', 'size', 'mean', 'min', 'max', 'std', 'var', 'first', 'nunique'}
+
+# Colonnes codées à l'avance (clés de regroupement et colonnes comptées en distinct)
+CODED_COLUMNS = [
+    'Année', 'Trimestre_ID', 'Mois', 'Pays', 'Ville', 'Gamme_de_Produits', 'Code_Produit',
+    'Nom_du_Client', 'Statut', 'Taille de Transaction', 'Numéro_Commande'
+]
+
+# ==============================================================================
+# DICTIONNAIRE DE CODES PAR COLONNE
+# ==============================================================================
+
+def _sorted_ranks(uniques):
+    """Rang de chaque valeur du dictionnaire dans l'ordre trié"""
+    ordre = np.argsort(np.asarray(uniques), kind='stable')
+    rangs = np.empty(len(uniques), dtype=np.int64)
+    rangs[ordre] = np.arange(len(uniques))
+    return rangs, uniques.take(ordre)
+
+def build_column_codes(df):
+    """Code les colonnes catégorielles : {colonne: codes, dictionnaire, rangs triés}"""
+    dictionnaire = {}
+    for colonne in CODED_COLUMNS:
+        if colonne not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[colonne])
+        rangs, uniques_triees = _sorted_ranks(pd.Index(uniques))
+        dictionnaire[colonne] = {
+            'codes': codes.astype(np.int32),
+            'uniques': pd.Index(uniques),
+            'rangs': rangs,
+            'uniques_triees': uniques_triees
+        }
+    dictionnaire['n_rows'] = len(df)
+    return dictionnaire
+
+def merge_column_codes(dictionnaire, dictionnaire_ajout):
+    """Étend le dictionnaire avec les codes d'un bloc de lignes ajoutées"""
+    fusion = {'n_rows': dictionnaire['n_rows'] + dictionnaire_ajout['n_rows']}
+    for colonne, entree in dictionnaire.items():
+        if colonne == 'n_rows':
+            continue
+        ajout = dictionnaire_ajout[colonne]
+        correspondance = entree['uniques'].get_indexer(ajout['uniques'])
+        nouvelles = ajout['uniques'][correspondance < 0]
+        correspondance[correspondance < 0] = len(entree['uniques']) + np.arange(len(nouvelles))
+        uniques = entree['uniques'].append(nouvelles)
+        codes_ajout = np.where(ajout['codes'] >= 0, correspondance[ajout['codes']], -1)
+        rangs, uniques_triees = _sorted_ranks(uniques)
+        fusion[colonne] = {
+            'codes': np.concatenate([entree['codes'], codes_ajout.astype(np.int32)]),
+            'uniques': uniques,
+            'rangs': rangs,
+            'uniques_triees': uniques_triees
+        }
+    return fusion
+
+def column_codes(df, colonne, dictionnaire=None, positions=None):
+    """Codes triés d'une colonne (-1 si manquant) et valeurs correspondantes"""
+    entree = dictionnaire.get(colonne) if dictionnaire is not None and positions is not None else None
+    if entree is not None:
+        codes = entree['codes'][positions]
+        # Contrôle de cohérence sur la première ligne
+        if not len(codes) or entree['uniques'][codes[0]] == df[colonne].iloc[0]:
+            return np.where(codes >= 0, entree['rangs'][codes], -1), entree['uniques_triees']
+    codes, uniques = pd.factorize(df[colonne], sort=True)
+    return codes.astype(np.int64), pd.Index(uniques)
+
+# ==============================================================================
+# CODES DE GROUPE
+# ==============================================================================
+
+def group_codes(df, by, dictionnaire=None, positions=None):
+    """
+    Code entier de groupe de chaque ligne (-1 si une clé est manquante)
+    et index des groupes présents, trié comme celui de groupby. Les codes du
+    dictionnaire ne sont utilisés que si `positions` (position de chaque
+    ligne de `df` dans le dataset codé) est fourni par l'appelant.
+    """
+    if positions is not None and len(positions) != len(df):
+        raise ValueError("Une position dans le dataset codé est attendue par ligne")
+    codes_cles, uniques_cles = [], []
+    for colonne in by:
+        codes, uniques = column_codes(df, colonne, dictionnaire, positions)
+        codes_cles.append(codes)
+        uniques_cles.append(uniques)
+
+    tailles = [len(u) for u in uniques_cles]
+    codes = np.zeros(len(df), dtype=np.int64)
+    manquant = np.zeros(len(df), dtype=bool)
+    for code_cle, taille in zip(codes_cles, tailles):
+        codes = codes * taille + code_cle
+        manquant |= code_cle < 0
+
+    valides = codes[~manquant]
+    total = int(np.prod(tailles, dtype=np.int64))
+    if total <= TAILLE_MAX_DENSE:
+        presents = np.flatnonzero(np.bincount(valides, minlength=total))
+        remap = np.full(total, -1, dtype=np.int64)
+        remap[presents] = np.arange(len(presents))
+        valides = remap[valides]
+    else:
+        presents, valides = np.unique(valides, return_inverse=True)
+    codes[~manquant] = valides
+    codes[manquant] = -1
+
+    # Décomposition des codes combinés en valeurs de clés
+    niveaux = []
+    reste = presents
+    for taille, uniques in zip(reversed(tailles), reversed(uniques_cles)):
+        niveaux.append(uniques.take(reste % taille))
+        reste = reste // taille
+    niveaux.reverse()
+
+    if len(by) == 1:
+        index = niveaux[0].rename(by[0])
+    else:
+        index = pd.MultiIndex.from_arrays(niveaux, names=by)
+    return codes, index, positions
+
+# ==============================================================================
+# NOYAUX
+# ==============================================================================
+
+def group_sum(codes, valeurs, n_groupes):
+    """Somme par groupe (valeurs manquantes ignorées)"""
+    ok = (codes >= 0) & ~np.isnan(valeurs)
+    return np.bincount(codes[ok], weights=valeurs[ok], minlength=n_groupes)
+
+def group_count(codes, valeurs, n_groupes):
+    """Nombre de valeurs non manquantes par groupe"""
+    ok = (codes >= 0) & ~np.isnan(valeurs)
+    return np.bincount(codes[ok], minlength=n_groupes)
+
+def group_size(codes, n_groupes):
+    """Nombre de lignes par groupe"""
+    return np.bincount(codes[codes >= 0], minlength=n_groupes)
+
+def group_mean(codes, valeurs, n_groupes):
+    """Moyenne par groupe"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return group_sum(codes, valeurs, n_groupes) / group_count(codes, valeurs, n_groupes)
+
+def group_var(codes, valeurs, n_groupes, ddof=1):
+    """Variance par groupe en deux passes (écarts à la moyenne du groupe)"""
+    ok = (codes >= 0) & ~np.isnan(valeurs)
+    codes_ok, valeurs_ok = codes[ok], valeurs[ok]
+    effectifs = np.bincount(codes_ok, minlength=n_groupes)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moyennes = np.bincount(codes_ok, weights=valeurs_ok, minlength=n_groupes) / effectifs
+        ecarts = np.bincount(codes_ok, weights=(valeurs_ok - moyennes[codes_ok]) ** 2, minlength=n_groupes)
+        return np.where(effectifs > ddof, ecarts / (effectifs - ddof), np.nan)
+
+def group_min(codes, valeurs, n_groupes):
+    """Minimum par groupe"""
+    ok = (codes >= 0) & ~np.isnan(valeurs)
+    resultat = np.full(n_groupes, np.inf)
+    np.minimum.at(resultat, codes[ok], valeurs[ok])
+    return np.where(np.isinf(resultat), np.nan, resultat)
+
+def group_max(codes, valeurs, n_groupes):
+    """Maximum par groupe"""
+    ok = (codes >= 0) & ~np.isnan(valeurs)
+    resultat = np.full(n_groupes, -np.inf)
+    np.maximum.at(resultat, codes[ok], valeurs[ok])
+    return np.where(np.isinf(resultat), np.nan, resultat)
+
+def group_first_position(codes, valides, n_groupes):
+    """Position de la première valeur non manquante de chaque groupe"""
+    lignes = np.flatnonzero((codes >= 0) & valides)
+    positions = np.full(n_groupes, len(codes), dtype=np.int64)
+    np.minimum.at(positions, codes[lignes], lignes)
+    return positions
+
+def group_nunique(codes, codes_valeurs, n_valeurs, n_groupes):
+    """Nombre de valeurs distinctes par groupe (paires groupe/valeur uniques)"""
+    ok = (codes >= 0) & (codes_valeurs >= 0)
+    n_valeurs = max(n_valeurs, 1)
+    paires = codes[ok] * n_valeurs + codes_valeurs[ok]
+    if n_groupes * n_valeurs <= TAILLE_MAX_DENSE:
+        vues = np.zeros(n_groupes * n_valeurs, dtype=bool)
+        vues[paires] = True
+        return vues.reshape(n_groupes, n_valeurs).sum(axis=1)
+    # Déduplication par table de hachage (plus rapide que le tri de np.unique)
+    return np.bincount(pd.unique(paires) // n_valeurs, minlength=n_groupes)
+
+def first_values(serie, positions_premiers):
+    """Valeurs aux positions des premiers éléments (manquant si le groupe n'en a pas)"""
+    absents = positions_premiers == len(serie)
+    premiers = serie.iloc[np.where(absents, 0, positions_premiers)].to_numpy()
+    if absents.any():
+        premiers = premiers.astype(object)
+        premiers[absents] = np.nan
+    return premiers
+
+def cast_result(serie, fonction, resultat):
+    """Rétablit le type produit par groupby (sommes et extrema de colonnes entières)"""
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        if fonction == 'sum':
+            return np.rint(resultat).astype(np.int64)
+        if fonction in ('min', 'max'):
+            return resultat.astype(serie.dtype)
+    return resultat
+
+def aggregate_codes(df, codes, n_groupes, colonne, fonction, dictionnaire=None, positions=None):
+    """Applique une fonction d'agrégation à une colonne, en conservant les types de groupby"""
+    serie = df[colonne]
+
+    if fonction == 'size':
+        return group_size(codes, n_groupes)
+    if fonction == 'nunique':
+        codes_valeurs, uniques = column_codes(df, colonne, dictionnaire, positions)
+        return group_nunique(codes, codes_valeurs, len(uniques), n_groupes)
+    if fonction == 'first':
+        return first_values(serie, group_first_position(codes, serie.notna().to_numpy(), n_groupes))
+    if fonction == 'count' and not pd.api.types.is_numeric_dtype(serie.dtype):
+        return np.bincount(codes[(codes >= 0) & serie.notna().to_numpy()], minlength=n_groupes)
+
+    valeurs = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    if fonction == 'count':
+        return group_count(codes, valeurs, n_groupes)
+    if fonction == 'sum':
+        return cast_result(serie, fonction, group_sum(codes, valeurs, n_groupes))
+    if fonction == 'mean':
+        return group_mean(codes, valeurs, n_groupes)
+    if fonction == 'min':
+        return cast_result(serie, fonction, group_min(codes, valeurs, n_groupes))
+    if fonction == 'max':
+        return cast_result(serie, fonction, group_max(codes, valeurs, n_groupes))
+    if fonction == 'std':
+        return np.sqrt(group_var(codes, valeurs, n_groupes))
+    if fonction == 'var':
+        return group_var(codes, valeurs, n_groupes)
+    raise ValueError(f"Fonction d'agrégation non supportée : {fonction}")
+
+def supports_kernels(df, aggs):
+    """Vrai si chaque agrégat est une fonction des noyaux applicable à sa colonne"""
+    for colonne, fonction in aggs.items():
+        if not isinstance(fonction, str) or fonction not in KERNEL_FUNCTIONS:
+            return False
+        dtype = df[colonne].dtype
+        numerique = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        if fonction in ('sum', 'mean', 'min', 'max', 'std', 'var') and not numerique:
+            return False
+    return True
+
+def kernel_aggregate(df, by, aggs, dictionnaire=None, positions=None):
+    """
+    Équivalent de df.groupby(by).agg(aggs) calculé par les noyaux vectorisés
+    (codes du dictionnaire lus aux `positions` des lignes quand elles sont fournies)
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    codes, index, positions = group_codes(df, by, dictionnaire, positions)
+    colonnes = {
+        colonne: aggregate_codes(df, codes, len(index), colonne, fonction, dictionnaire, positions)
+        for colonne, fonction in aggs.items()
+    }
+    return pd.DataFrame(colonnes, index=index)
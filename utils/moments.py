@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+
+# ==============================================================================
+# ACCUMULATEURS DE MOMENTS FUSIONNABLES (WELFORD / CHAN)
+# ==============================================================================
+# Chaque cellule garde (effectif, moyenne, M2 = Σ(x - moyenne)², min, max).
+# Deux cellules se combinent exactement (Chan et al.) :
+#   n = na + nb,  δ = mb - ma,  m = ma + δ nb / n,  M2 = M2a + M2b + δ² na nb / n
+# et un groupe de k cellules en une passe : M2 = Σ M2_i + Σ n_i (m_i - m)².
+# La variance d'une sélection quelconque de cellules est donc exacte et
+# numériquement stable, sans relire les lignes ni sommer des carrés bruts.
+
+CELLULE_PRIX = ['Année', 'Pays', 'Gamme_de_Produits', 'Code_Produit']
+COLONNES_MOMENTS = ['n', 'moyenne', 'm2', 'min', 'max']
+
+def moment_accumulators(df, by, colonne):
+    """Accumulateurs (n, moyenne, M2, min, max) d'une colonne par groupe, en deux passes"""
+    groupes = df.groupby(by, sort=True)[colonne]
+    accumulateurs = groupes.agg(['size', 'mean', 'min', 'max']).rename(columns={'size': 'n', 'mean': 'moyenne'})
+    ecarts = df[colonne] - groupes.transform('mean')
+    accumulateurs['m2'] = (ecarts ** 2).groupby([df[c] for c in by], sort=True).sum().to_numpy()
+    return accumulateurs[COLONNES_MOMENTS]
+
+def combine_moments(accumulateurs, by):
+    """Combine les accumulateurs des cellules de chaque groupe (formule de Chan généralisée)"""
+    groupes = [accumulateurs.index.get_level_values(niveau) for niveau in by]
+    n = accumulateurs['n'].to_numpy(dtype=np.float64)
+    cellules = pd.DataFrame({
+        'n': n,
+        'poids': accumulateurs['moyenne'].to_numpy() * n,
+        'm2': accumulateurs['m2'].to_numpy(),
+        'min': accumulateurs['min'].to_numpy(),
+        'max': accumulateurs['max'].to_numpy()
+    })
+    # Moyenne du groupe rapportée à chaque cellule, puis dispersion entre cellules
+    sommes = cellules[['n', 'poids']].groupby(groupes).transform('sum')
+    moyenne_groupe = sommes['poids'] / sommes['n']
+    cellules['dispersion'] = cellules['m2'] + n * (accumulateurs['moyenne'].to_numpy() - moyenne_groupe) ** 2
+    combine = cellules.groupby(groupes, sort=True).agg(
+        n=('n', 'sum'), poids=('poids', 'sum'), m2=('dispersion', 'sum'), min=('min', 'min'), max=('max', 'max')
+    )
+    combine['moyenne'] = combine['poids'] / combine['n']
+    combine['n'] = combine['n'].astype(np.int64)
+    combine.index.names = by
+    return combine[COLONNES_MOMENTS]
+
+def merge_moment_tables(accumulateurs, accumulateurs_ajout):
+    """Fusionne deux tables d'accumulateurs de mêmes clés (cellules communes combinées)"""
+    fusion = pd.concat([accumulateurs, accumulateurs_ajout])
+    return combine_moments(fusion, list(fusion.index.names))
+
+def moment_statistics(accumulateurs):
+    """Moyenne, écart-type (échantillon), min, max et effectif"""
+    n = accumulateurs['n']
+    return pd.DataFrame({
+        'Moyenne': accumulateurs['moyenne'],
+        'Ecart_Type': np.sqrt(accumulateurs['m2'] / (n - 1).where(n > 1)),
+        'Min': accumulateurs['min'],
+        'Max': accumulateurs['max'],
+        'Nb': n
+    })
+
+# ==============================================================================
+# VARIABILITÉ DES PRIX PAR PRODUIT
+# ==============================================================================
+
+def build_price_moments(df):
+    """Accumulateurs de Prix_Unitaire par cellule de filtre et produit (et prix conseil)"""
+    accumulateurs = moment_accumulators(df, CELLULE_PRIX, 'Prix_Unitaire')
+    conseil = df.groupby(CELLULE_PRIX, sort=True)['Prix Conseil'].first()
+    return {'moments': accumulateurs, 'prix_conseil': conseil.groupby(level='Code_Produit').first()}
+
+def merge_price_moments(table, table_ajout):
+    """Fusionne les accumulateurs de prix avec ceux des lignes ajoutées"""
+    conseil = pd.concat([table['prix_conseil'], table_ajout['prix_conseil']])
+    return {
+        'moments': merge_moment_tables(table['moments'], table_ajout['moments']),
+        'prix_conseil': conseil.groupby(level=0).first()
+    }
+
+register_aggregate('moments_prix', build_price_moments, merge_price_moments)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_price_variability(version, years, countries, productlines):
+    """Statistiques de prix par produit, mises en cache par version des données et sélection"""
+    table = get_aggregate('moments_prix')
+    moments = table['moments']
+    index = moments.index
+    selection = moments[
+        index.get_level_values('Année').isin(years) &
+        index.get_level_values('Pays').isin(countries) &
+        index.get_level_values('Gamme_de_Produits').isin(productlines)
+    ]
+    par_produit = moment_statistics(combine_moments(selection, ['Code_Produit', 'Gamme_de_Produits']))
+    par_produit.columns = ['Prix_Moyen', 'Ecart_Type', 'Prix_Min', 'Prix_Max', 'Nb_Ventes']
+    par_produit['Prix_Conseil'] = table['prix_conseil'].reindex(par_produit.index.get_level_values('Code_Produit')).to_numpy()
+    return par_produit
+
+def get_price_variability(filters):
+    """Moyenne, écart-type, min, max et nombre de ventes de Prix_Unitaire par produit"""
+    return _cached_price_variability(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines'])
+    )
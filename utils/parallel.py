@@ -0,0 +1,233 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from multiprocessing import get_context, shared_memory
+import numpy as np
+import pandas as pd
+from utils.kernels import (
+    group_codes, column_codes, group_size, group_sum, group_count, group_min, group_max,
+    group_first_position, first_values, cast_result
+)
+from utils.sketches import hll_registers, hll_merge, hll_estimate, HLL_PRECISION
+
+# ==============================================================================
+# AGRÉGATION MAP-REDUCE MULTI-CŒUR
+# ==============================================================================
+# Le dataset est découpé en plages de lignes (alignées sur les partitions
+# annuelles quand elles sont connues). Les colonnes utiles sont copiées une
+# fois en mémoire partagée ; chaque processus calcule les agrégats partiels
+# de ses plages, fusionnés ensuite sans perte : sommes et effectifs additionnés,
+# variances combinées (Chan), extrema, premières positions, et comptages
+# distincts par union des paires (groupe, valeur) ou fusion de sketches HLL.
+# Ce module n'importe pas Streamlit : il est rechargé par chaque processus.
+
+PLAGES_PAR_PROCESSUS = 2  # plusieurs plages par processus pour équilibrer la charge
+
+_POOL = {'executor': None, 'workers': 0}
+_POOL_LOCK = threading.Lock()
+
+def get_process_pool(n_workers):
+    """Pool de processus partagé (démarrage 'spawn', sûr avec les threads du serveur)"""
+    with _POOL_LOCK:
+        if _POOL['executor'] is None or _POOL['workers'] != n_workers:
+            if _POOL['executor'] is not None:
+                _POOL['executor'].shutdown()
+            _POOL['executor'] = ProcessPoolExecutor(n_workers, mp_context=get_context('spawn'))
+            _POOL['workers'] = n_workers
+        return _POOL['executor']
+
+def split_ranges(n_rows, n_parts, bornes=None):
+    """
+    Découpe [0, n_rows) en plages d'environ n_rows / n_parts lignes, sans
+    chevaucher deux partitions annuelles si leurs bornes sont fournies
+    (index de partitions du dataset complet, cf. utils.partitions).
+    """
+    taille = max(1, -(-n_rows // max(n_parts, 1)))
+    if bornes:
+        partitions = sorted(plage for plages in bornes.values() for plage in plages)
+    else:
+        partitions = [(0, n_rows)]
+    plages = [
+        (debut, min(debut + taille, fin))
+        for debut_partition, fin in partitions
+        for debut in range(debut_partition, fin, taille)
+    ]
+    return plages or [(0, n_rows)]
+
+# ==============================================================================
+# MÉMOIRE PARTAGÉE
+# ==============================================================================
+
+def _share(tableau, blocs):
+    """Copie un tableau en mémoire partagée et retourne son descripteur"""
+    bloc = shared_memory.SharedMemory(create=True, size=max(tableau.nbytes, 1))
+    np.ndarray(tableau.shape, dtype=tableau.dtype, buffer=bloc.buf)[:] = tableau
+    blocs.append(bloc)
+    return bloc.name, tableau.dtype.str, tableau.shape
+
+def _attach(descripteur, blocs):
+    """Vue sur un tableau en mémoire partagée"""
+    nom, dtype, forme = descripteur
+    bloc = shared_memory.SharedMemory(name=nom)
+    blocs.append(bloc)
+    return np.ndarray(forme, dtype=np.dtype(dtype), buffer=bloc.buf)
+
+# ==============================================================================
+# MAP : AGRÉGATS PARTIELS D'UNE PLAGE
+# ==============================================================================
+
+def _partial(fonction, groupes, colonne, n_groupes, debut, n_valeurs, distinct):
+    """Agrégat partiel d'une colonne sur une plage de lignes"""
+    if fonction == 'size':
+        return group_size(groupes, n_groupes)
+    if fonction == 'nunique':
+        ok = (groupes >= 0) & (colonne >= 0)
+        if distinct == 'sketch':
+            return hll_registers(groupes[ok], colonne[ok], n_groupes)
+        return pd.unique(groupes[ok] * max(n_valeurs, 1) + colonne[ok])
+    if fonction == 'first':
+        positions = group_first_position(groupes, colonne, n_groupes)
+        return np.where(positions == len(groupes), np.iinfo(np.int64).max, positions + debut)
+    if colonne.dtype == bool:  # comptage d'une colonne non numérique
+        return np.bincount(groupes[(groupes >= 0) & colonne], minlength=n_groupes)
+    if fonction == 'count':
+        return group_count(groupes, colonne, n_groupes)
+    if fonction == 'sum':
+        return group_sum(groupes, colonne, n_groupes)
+    if fonction == 'mean':
+        return group_sum(groupes, colonne, n_groupes), group_count(groupes, colonne, n_groupes)
+    if fonction == 'min':
+        return group_min(groupes, colonne, n_groupes)
+    if fonction == 'max':
+        return group_max(groupes, colonne, n_groupes)
+    # var / std : (effectif, moyenne, somme des carrés des écarts)
+    ok = (groupes >= 0) & ~np.isnan(colonne)
+    groupes_ok, valeurs_ok = groupes[ok], colonne[ok]
+    effectifs = np.bincount(groupes_ok, minlength=n_groupes)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moyennes = np.bincount(groupes_ok, weights=valeurs_ok, minlength=n_groupes) / effectifs
+    ecarts = np.bincount(groupes_ok, weights=(valeurs_ok - moyennes[groupes_ok]) ** 2, minlength=n_groupes)
+    return effectifs, np.nan_to_num(moyennes), ecarts
+
+def _map_range(descripteurs, specs, n_groupes, debut, fin, distinct):
+    """Exécuté dans un processus : agrégats partiels de la plage [debut, fin)"""
+    blocs = []
+    try:
+        groupes = _attach(descripteurs['groupes'], blocs)[debut:fin]
+        partiels = [
+            _partial(fonction, groupes, _attach(descripteurs[cle], blocs)[debut:fin],
+                     n_groupes, debut, n_valeurs, distinct)
+            for cle, fonction, n_valeurs in specs
+        ]
+        # Copie des résultats avant de libérer les vues sur la mémoire partagée
+        partiels = [tuple(np.array(p) for p in x) if isinstance(x, tuple) else np.array(x) for x in partiels]
+        del groupes
+        return partiels
+    finally:
+        for bloc in blocs:
+            bloc.close()
+
+# ==============================================================================
+# REDUCE : FUSION EXACTE DES PARTIELS
+# ==============================================================================
+
+def _merge(fonction, a, b, distinct):
+    """Fusionne les agrégats partiels de deux plages"""
+    if fonction in ('size', 'count', 'sum'):
+        return a + b
+    if fonction == 'mean':
+        return a[0] + b[0], a[1] + b[1]
+    if fonction == 'min':
+        return np.fmin(a, b)
+    if fonction == 'max':
+        return np.fmax(a, b)
+    if fonction == 'first':
+        return np.minimum(a, b)
+    if fonction == 'nunique':
+        return hll_merge(a, b) if distinct == 'sketch' else pd.unique(np.concatenate([a, b]))
+    # var / std : combinaison de Chan
+    n_a, moyenne_a, m2_a = a
+    n_b, moyenne_b, m2_b = b
+    n = n_a + n_b
+    delta = moyenne_b - moyenne_a
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moyenne = np.where(n > 0, moyenne_a + delta * n_b / n, 0.0)
+        m2 = np.where(n > 0, m2_a + m2_b + delta ** 2 * n_a * n_b / n, 0.0)
+    return n, moyenne, m2
+
+def _finalize(serie, fonction, partiel, n_groupes, n_valeurs, distinct):
+    """Valeur finale d'un agrégat à partir de son partiel fusionné"""
+    if fonction in ('sum', 'min', 'max'):
+        return cast_result(serie, fonction, partiel)
+    if fonction == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return partiel[0] / partiel[1]
+    if fonction == 'first':
+        return first_values(serie, np.minimum(partiel, len(serie)))
+    if fonction == 'nunique':
+        if distinct == 'sketch':
+            return hll_estimate(partiel)
+        return np.bincount(partiel // max(n_valeurs, 1), minlength=n_groupes)
+    if fonction in ('var', 'std'):
+        n, _, m2 = partiel
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = np.where(n > 1, m2 / (n - 1), np.nan)
+        return np.sqrt(variance) if fonction == 'std' else variance
+    return partiel
+
+# ==============================================================================
+# EXÉCUTEUR
+# ==============================================================================
+
+def _column_array(df, colonne, fonction, dictionnaire, positions):
+    """Tableau transmis aux processus pour une colonne et sa fonction"""
+    serie = df[colonne]
+    if fonction == 'nunique':
+        codes, uniques = column_codes(df, colonne, dictionnaire, positions)
+        return codes.astype(np.int64), len(uniques)
+    if fonction == 'size':
+        return np.zeros(0, dtype=np.int8), 0
+    if fonction == 'first' or not pd.api.types.is_numeric_dtype(serie.dtype):
+        return serie.notna().to_numpy(), 0
+    return serie.to_numpy(dtype=np.float64, na_value=np.nan), 0
+
+def parallel_aggregate(df, by, aggs, dictionnaire=None, n_workers=None, distinct='exact', bornes=None, positions=None):
+    """
+    Équivalent de df.groupby(by).agg(aggs) calculé en map-reduce sur un pool
+    de processus. distinct='sketch' remplace le comptage distinct exact par
+    des sketches HyperLogLog (mémoire bornée, erreur ~1.6 %).
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    n_workers = n_workers or os.cpu_count() or 1
+    groupes, index, positions = group_codes(df, by, dictionnaire, positions)
+    n_groupes = len(index)
+    if distinct == 'sketch' and n_groupes * (1 << HLL_PRECISION) > 1 << 28:
+        distinct = 'exact'  # sketches trop volumineux pour ce nombre de groupes
+
+    blocs = []
+    try:
+        descripteurs = {'groupes': _share(groupes, blocs)}
+        specs = []
+        for i, (colonne, fonction) in enumerate(aggs.items()):
+            tableau, n_valeurs = _column_array(df, colonne, fonction, dictionnaire, positions)
+            descripteurs[i] = _share(tableau, blocs)
+            specs.append((i, fonction, n_valeurs))
+
+        plages = split_ranges(len(df), n_workers * PLAGES_PAR_PROCESSUS, bornes)
+        executeur = get_process_pool(n_workers)
+        futures = [
+            executeur.submit(_map_range, descripteurs, specs, n_groupes, debut, fin, distinct)
+            for debut, fin in plages
+        ]
+        partiels = [future.result() for future in futures]
+    finally:
+        for bloc in blocs:
+            bloc.close()
+            bloc.unlink()
+
+    colonnes = {}
+    for j, (colonne, fonction) in enumerate(aggs.items()):
+        fusion = reduce(lambda a, b: _merge(fonction, a, b, distinct), (p[j] for p in partiels))
+        colonnes[colonne] = _finalize(df[colonne], fonction, fusion, n_groupes, specs[j][2], distinct)
+    return pd.DataFrame(colonnes, index=index)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# ANALYSE ABC / PARETO ET INDICES DE CONCENTRATION
+# ==============================================================================
+# Un seul tri par analyse : les parts cumulées (cumsum) donnent la classe ABC
+# de chaque élément, la courbe de Lorenz et l'indice de Gini. Les indices par
+# groupe (pays, gamme) sont calculés ensemble : tri lexicographique groupe /
+# montant, rangs dans le groupe et sommes par np.bincount, sans boucle.
+
+SEUILS_ABC = {'A': 0.8, 'B': 0.95}  # parts cumulées du CA couvertes par les classes A puis A + B
+POINTS_LORENZ = 200
+
+def abc_classes(montants, seuils=SEUILS_ABC):
+    """
+    Classe ABC de chaque élément (Series de montants) : A tant que la part
+    cumulée avant l'élément est sous le premier seuil, B sous le second, C sinon.
+    """
+    valeurs = montants.to_numpy(dtype=np.float64)
+    ordre = np.argsort(-valeurs, kind='stable')
+    tries = valeurs[ordre]
+    total = tries.sum()
+    parts = tries / total if total > 0 else np.zeros(len(tries))
+    cumulees = np.cumsum(parts)
+    avant = cumulees - parts
+    classes = np.select([avant < seuils['A'], avant < seuils['B']], ['A', 'B'], 'C')
+    return pd.DataFrame({
+        'Rang': np.arange(1, len(tries) + 1),
+        'Montant': tries,
+        'Part': parts * 100,
+        'Part_Cumulee': cumulees * 100,
+        'Classe': classes
+    }, index=montants.index[ordre])
+
+def abc_summary(classes):
+    """Nombre d'éléments et part du CA de chaque classe ABC"""
+    resume = classes.groupby('Classe').agg(Nb_Elements=('Rang', 'size'), Part_CA=('Part', 'sum'))
+    resume['Part_Elements'] = resume['Nb_Elements'] / resume['Nb_Elements'].sum() * 100
+    return resume.reindex(['A', 'B', 'C'], fill_value=0)
+
+def lorenz_curve(montants, n_points=POINTS_LORENZ):
+    """
+    Courbe de Lorenz (part cumulée des éléments, part cumulée du montant),
+    échantillonnée sur n_points pour rester légère quel que soit le catalogue.
+    """
+    valeurs = np.sort(np.asarray(montants, dtype=np.float64))
+    cumul = np.concatenate(([0.0], np.cumsum(valeurs)))
+    positions = np.unique(np.linspace(0, len(valeurs), min(n_points, len(valeurs)) + 1).round().astype(np.int64))
+    total = cumul[-1] if cumul[-1] > 0 else 1.0
+    return pd.DataFrame({
+        'Part_Elements': positions / max(len(valeurs), 1) * 100,
+        'Part_Montant': cumul[positions] / total * 100
+    })
+
+def concentration_indices(montants, groupes):
+    """
+    Indices de Gini et de Herfindahl-Hirschman (HHI, sur 10 000) des montants
+    de chaque groupe, avec le nombre d'éléments et l'équivalent en nombre
+    d'acteurs de même poids (1 / HHI).
+    """
+    codes, uniques = pd.factorize(np.asarray(groupes), sort=True)
+    valeurs = np.asarray(montants, dtype=np.float64)
+    ordre = np.lexsort((valeurs, codes))
+    codes, valeurs = codes[ordre], valeurs[ordre]
+    k = len(uniques)
+
+    effectifs = np.bincount(codes, minlength=k)
+    totaux = np.bincount(codes, weights=valeurs, minlength=k)
+    debuts = np.concatenate(([0], np.cumsum(effectifs)[:-1]))
+    rangs = np.arange(len(valeurs)) - debuts[codes] + 1  # rang croissant dans le groupe
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Gini = 2 Σ i x_(i) / (n Σ x) - (n + 1) / n
+        gini = 2 * np.bincount(codes, weights=rangs * valeurs, minlength=k) / (effectifs * totaux) - (effectifs + 1) / effectifs
+        parts = valeurs / totaux[codes]
+        hhi = np.bincount(codes, weights=parts ** 2, minlength=k)
+    return pd.DataFrame({
+        'Nb_Elements': effectifs,
+        'Gini': np.where(totaux > 0, gini, np.nan),
+        'HHI': np.where(totaux > 0, hhi * 10000, np.nan),
+        'Equivalent_Acteurs': np.where(hhi > 0, 1 / hhi, np.nan),
+        'Montant_Total': totaux
+    }, index=pd.Index(uniques, name='Groupe'))
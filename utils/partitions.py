@@ -0,0 +1,115 @@
+import os
+import numpy as np
+import pandas as pd
+from config import PARTITIONS_DIR, PARTITION_KEYS, get_data_path
+
+# ==============================================================================
+# STOCKAGE PARTITIONNÉ (Année=YYYY/Mois=MM.csv)
+# ==============================================================================
+
+def partition_file_path(root, annee, mois):
+    """Retourne le chemin du fichier d'une partition (Année, Mois)"""
+    return os.path.join(root, f"Année={int(annee)}", f"Mois={int(mois):02d}.csv")
+
+def write_partitions(df, root=PARTITIONS_DIR):
+    """Écrit le jeu de données sous forme de partitions Année/Mois"""
+    chemins = []
+    for (annee, mois), partition in df.groupby(PARTITION_KEYS, sort=True):
+        chemin = partition_file_path(root, annee, mois)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        partition.to_csv(chemin, index=False)
+        chemins.append(chemin)
+    return chemins
+
+def list_partitions(root=PARTITIONS_DIR, years=None):
+    """Liste les fichiers de partitions, en ignorant les années non sélectionnées"""
+    partitions = []
+    if not os.path.isdir(root):
+        return partitions
+
+    for dossier_annee in sorted(os.listdir(root)):
+        if not dossier_annee.startswith("Année="):
+            continue
+        annee = int(dossier_annee.split("=", 1)[1])
+        # Élagage : les dossiers hors sélection ne sont jamais ouverts
+        if years is not None and annee not in years:
+            continue
+        chemin_annee = os.path.join(root, dossier_annee)
+        for fichier in sorted(os.listdir(chemin_annee)):
+            if fichier.startswith("Mois=") and fichier.endswith(".csv"):
+                mois = int(fichier[len("Mois="):-len(".csv")])
+                partitions.append((annee, mois, os.path.join(chemin_annee, fichier)))
+    return partitions
+
+def read_partitions(root=PARTITIONS_DIR, years=None):
+    """Lit les partitions (éventuellement restreintes à certaines années)"""
+    partitions = list_partitions(root, years)
+    if not partitions:
+        return None
+    return pd.concat([pd.read_csv(chemin) for _, _, chemin in partitions], ignore_index=True)
+
+# ==============================================================================
+# INDEX DE PARTITIONS EN MÉMOIRE
+# ==============================================================================
+
+def sort_by_partitions(df):
+    """Trie le dataframe par clés de partition pour rendre chaque année contiguë"""
+    return df.sort_values(PARTITION_KEYS, kind='stable').reset_index(drop=True)
+
+def build_partition_index(df):
+    """Construit l'index {année: [(début, fin), ...]} d'un dataframe trié par année"""
+    index = {'n_rows': 0, 'bornes': {}}
+    return extend_partition_index(index, df, 0)
+
+def extend_partition_index(index, df_ajout, debut):
+    """
+    Ajoute à l'index les plages d'un bloc de lignes trié par année,
+    placé à partir de la position `debut` (ajout incrémental sans re-tri).
+    """
+    if index is None:
+        return None
+    annees = df_ajout['Année'].to_numpy()
+    if len(annees) == 0:
+        return index
+    if np.any(annees[1:] < annees[:-1]):
+        return None
+
+    debuts = np.concatenate(([0], np.flatnonzero(annees[1:] != annees[:-1]) + 1))
+    fins = np.append(debuts[1:], len(annees))
+    for d, f in zip(debuts, fins):
+        plage = (debut + int(d), debut + int(f))
+        plages = index['bornes'].setdefault(int(annees[d]), [])
+        # Fusion avec la plage précédente si elle est contiguë
+        if plages and plages[-1][1] == plage[0]:
+            plages[-1] = (plages[-1][0], plage[1])
+        else:
+            plages.append(plage)
+    index['n_rows'] = debut + len(annees)
+    return index
+
+def prune_partitions(df, years, index):
+    """Retourne uniquement les lignes des années sélectionnées sans parcourir les autres"""
+    if index is None or index['n_rows'] != len(df):
+        return df[df['Année'].isin(years)]
+
+    annees_selectionnees = set(years)
+    plages = sorted(
+        plage
+        for annee, plages_annee in index['bornes'].items()
+        if annee in annees_selectionnees
+        for plage in plages_annee
+    )
+    tranches = [df.iloc[debut:fin] for debut, fin in plages]
+    if not tranches:
+        return df.iloc[0:0]
+    if len(tranches) == 1:
+        return tranches[0]
+    return pd.concat(tranches)
+
+if __name__ == "__main__":
+    # Conversion du fichier plat en partitions : python -m utils.partitions
+    source = get_data_path()
+    if source is None:
+        raise SystemExit("Fichier de données introuvable")
+    fichiers = write_partitions(pd.read_csv(source))
+    print(f"{len(fichiers)} partitions écrites dans {PARTITIONS_DIR}")
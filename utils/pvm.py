@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+from utils.comparisons import same_day
+
+# ==============================================================================
+# PONT PRIX / VOLUME / MIX ENTRE DEUX PÉRIODES
+# ==============================================================================
+# L'écart de CA entre une période de référence (0) et une période comparée (1)
+# est décomposé par cellule produit x dimension (pays ou client), avec
+# q la quantité, p = CA / q le prix unitaire effectif (Prix_Unitaire est
+# plafonné dans l'export, le CA ne l'est pas), Q et P̄ = R / Q les totaux :
+#   volume        = (Q1 - Q0) P̄0
+#   mix produits  = Σ_produits Q1_j P0_j - Q1 P̄0
+#   mix dimension = Σ_cellules q1_c p0_c - Σ_produits Q1_j P0_j
+#   prix          = Σ_cellules q1_c (p1_c - p0_c)
+# La somme télescopique vaut exactement R1 - R0. Une cellule absente en
+# période 0 prend le prix de référence de son produit, un produit absent son
+# propre prix en période 1 (son CA est alors entièrement un effet de mix).
+
+PVM_DIMENSIONS = ['Date_Commande', 'Gamme_de_Produits', 'Code_Produit', 'Pays', 'Nom_du_Client']
+PVM_MESURES = {'Quantité_Commandée': 'sum', "Chiffre d'Affaires": 'sum'}
+EFFETS = ['Volume', 'Mix produits', 'Mix dimension', 'Prix']
+
+def build_daily_sales(df):
+    """Ventes journalières par produit, pays et client (quantités et CA)"""
+    return df.groupby(PVM_DIMENSIONS, sort=True).agg(PVM_MESURES)
+
+def merge_daily_sales(ventes, ventes_ajout):
+    """Fusionne les ventes journalières avec celles des lignes ajoutées"""
+    return ventes.add(ventes_ajout, fill_value=0)
+
+register_aggregate('ventes_jour', build_daily_sales, merge_daily_sales)
+
+def period_cells(ventes, debut, fin, dimension):
+    """Quantités et CA par cellule (produit, dimension) entre deux dates incluses"""
+    dates = ventes.index.get_level_values('Date_Commande')
+    periode = ventes[(dates >= debut) & (dates <= fin)]
+    cellules = periode.groupby(level=['Gamme_de_Produits', 'Code_Produit', dimension]).sum()
+    return cellules.rename(columns={'Quantité_Commandée': 'q', "Chiffre d'Affaires": 'r'})
+
+def pvm_bridge(cellules_0, cellules_1):
+    """
+    Effets volume, mix produits, mix dimension et prix par produit entre deux
+    périodes (cellules indexées par gamme, produit et dimension).
+    """
+    index = cellules_0.index.union(cellules_1.index)
+    q0, r0 = (cellules_0.reindex(index, fill_value=0)[c].to_numpy(dtype=np.float64) for c in ['q', 'r'])
+    q1, r1 = (cellules_1.reindex(index, fill_value=0)[c].to_numpy(dtype=np.float64) for c in ['q', 'r'])
+    codes, produits = pd.factorize(index.get_level_values('Code_Produit'), sort=True)
+    n = len(produits)
+    gammes = np.empty(n, dtype=object)
+    gammes[codes] = index.get_level_values('Gamme_de_Produits')
+
+    # Agrégats par produit (bincount sur les codes produit)
+    Q0_j, R0_j = np.bincount(codes, q0, n), np.bincount(codes, r0, n)
+    Q1_j, R1_j = np.bincount(codes, q1, n), np.bincount(codes, r1, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        P1_j = R1_j / Q1_j
+        P0_j = np.where(Q0_j > 0, R0_j / Q0_j, P1_j)
+        p1 = r1 / q1
+        p0 = np.where(q0 > 0, r0 / q0, P0_j[codes])
+    Q0, R0, Q1 = Q0_j.sum(), R0_j.sum(), Q1_j.sum()
+    P0 = R0 / Q0 if Q0 > 0 else 0.0
+    S0_j = Q0_j / Q0 if Q0 > 0 else np.zeros(n)
+    S1_j = Q1_j / Q1 if Q1 > 0 else np.zeros(n)
+    vendus = q1 > 0
+
+    # Répartition par produit : les effets d'un produit se somment à R1_j - R0_j
+    # et chaque effet à son total (Σ S0_j P0_j = P̄0)
+    prix = np.bincount(codes, np.where(vendus, q1 * (p1 - p0), 0.0), n)
+    mix_dimension = np.bincount(codes, np.where(vendus, q1 * p0, 0.0), n) - np.where(Q1_j > 0, Q1_j * P0_j, 0.0)
+    mix_produits = np.where(S1_j + S0_j > 0, Q1 * (S1_j - S0_j) * P0_j, 0.0)
+    volume = np.where(S0_j > 0, (Q1 - Q0) * S0_j * P0_j, 0.0)
+    return pd.DataFrame({
+        'Gamme_de_Produits': gammes,
+        'CA_Reference': R0_j,
+        'Volume': volume,
+        'Mix produits': mix_produits,
+        'Mix dimension': mix_dimension,
+        'Prix': prix,
+        'CA_Compare': R1_j
+    }, index=pd.Index(produits, name='Code_Produit')).fillna(0)
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_pvm(version, years, countries, productlines, dimension):
+    """Pont PVM à date vs N-1, mis en cache par version des données et sélection"""
+    ventes = get_aggregate('ventes_jour')
+    index = ventes.index
+    ventes = ventes[
+        index.get_level_values('Pays').isin(countries) &
+        index.get_level_values('Gamme_de_Produits').isin(productlines)
+    ]
+    dates = ventes.index.get_level_values('Date_Commande')
+    selection = dates[dates.year.isin(years)]
+    if selection.empty:
+        return None
+
+    # Dernière année sélectionnée à date, comparée à la même période de l'année précédente
+    date_limite = selection.max()
+    annee = date_limite.year
+    debut_1, fin_1 = pd.Timestamp(year=annee, month=1, day=1), date_limite
+    debut_0, fin_0 = pd.Timestamp(year=annee - 1, month=1, day=1), same_day(date_limite, annee - 1)
+    cellules_0 = period_cells(ventes, debut_0, fin_0, dimension)
+    if cellules_0.empty:
+        return None
+    produits = pvm_bridge(cellules_0, period_cells(ventes, debut_1, fin_1, dimension))
+    return {
+        'annee': annee,
+        'date_limite': date_limite,
+        'produits': produits,
+        'gammes': produits.groupby('Gamme_de_Produits').sum()
+    }
+
+def get_pvm_bridge(filters, dimension='Pays'):
+    """
+    Décomposition prix / volume / mix de l'écart de CA entre la dernière année
+    sélectionnée à date et la même période de l'année précédente.
+    """
+    return _cached_pvm(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        dimension
+    )
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+from utils.customers import slice_orders
+from utils.cube import CUBE_DIMENSIONS
+
+# ==============================================================================
+# SKETCHES DE QUANTILES FUSIONNABLES (COMPACTEURS DE TYPE KLL)
+# ==============================================================================
+# Chaque cellule du cube (dimensions du cube x Taille de Transaction) garde
+# pour chaque mesure un échantillon pondéré : un élément de niveau h pèse 2^h.
+# Quand un niveau d'une cellule dépasse CAPACITE_SKETCH éléments, il est trié
+# et un élément sur deux (décalage aléatoire) monte au niveau supérieur avec
+# un poids doublé. Toutes les cellules et tous les niveaux sont compactés en
+# même temps (tri lexicographique), et la fusion de deux sketches est une
+# simple concaténation suivie d'une compaction.
+#
+# Erreur de rang : une compaction au niveau h déplace au plus 2^h de masse,
+# et une cellule de n valeurs subit au plus n / (k 2^h) compactions à ce
+# niveau : l'erreur relative de rang d'une union de cellules est donc bornée
+# par H / k, H étant le nombre de niveaux compactés (0 tant que les cellules
+# tiennent dans le sketch : quantiles exacts).
+
+CAPACITE_SKETCH = 128
+MESURES_SKETCH = {
+    'Montant de ligne': "Chiffre d'Affaires",
+    'Prix unitaire': 'Prix_Unitaire',
+    'Quantité commandée': 'Quantité_Commandée'
+}
+MESURE_COMMANDE = 'Montant de commande'
+CELLULE_SKETCH = CUBE_DIMENSIONS + ['Taille de Transaction']
+CELLULE_SKETCH_COMMANDE = ['Année', 'Mois', 'Pays']
+PROBABILITES = [0.1, 0.5, 0.9, 0.99]
+NB_CLASSES_HISTOGRAMME = 40
+
+def compact(cles, valeurs, niveaux, capacite=CAPACITE_SKETCH, seed=0):
+    """
+    Compacte des éléments pondérés (codes de cellule, valeurs, niveaux) jusqu'à
+    ce qu'aucun niveau d'aucune cellule ne dépasse `capacite` éléments.
+    """
+    rng = np.random.default_rng(seed)
+    cles, valeurs, niveaux = np.asarray(cles, np.int64), np.asarray(valeurs, np.float64), np.asarray(niveaux, np.int64)
+    while len(valeurs):
+        # Groupes (cellule, niveau), éléments triés par valeur dans chaque groupe
+        ordre = np.lexsort((valeurs, niveaux, cles))
+        cles, valeurs, niveaux = cles[ordre], valeurs[ordre], niveaux[ordre]
+        debuts = np.flatnonzero(np.concatenate(([True], (cles[1:] != cles[:-1]) | (niveaux[1:] != niveaux[:-1]))))
+        tailles = np.diff(np.append(debuts, len(valeurs)))
+        if tailles.max() <= capacite:
+            break
+        groupe = np.repeat(np.arange(len(debuts)), tailles)
+        rang = np.arange(len(valeurs)) - debuts[groupe]
+        pleins = (tailles > capacite)[groupe]
+        # Nombre pair d'éléments compactés ; l'éventuel dernier reste à son niveau
+        compactes = pleins & (rang < (tailles - tailles % 2)[groupe])
+        decalage = rng.integers(2, size=len(debuts))[groupe]
+        gardes = ~compactes | (rang % 2 == decalage)
+        niveaux = niveaux + (compactes & gardes)
+        cles, valeurs, niveaux = cles[gardes], valeurs[gardes], niveaux[gardes]
+    return cles, valeurs, niveaux
+
+def _sketch_frame(cellules, valeurs, niveaux, capacite):
+    """Compacte les éléments par cellule et les restitue avec les clés de cellule"""
+    codes, uniques = pd.MultiIndex.from_frame(cellules).factorize()
+    codes, valeurs, niveaux = compact(codes, valeurs, niveaux, capacite)
+    table = pd.DataFrame(list(uniques), columns=cellules.columns).iloc[codes].reset_index(drop=True)
+    table['valeur'] = valeurs
+    table['niveau'] = niveaux.astype(np.int8)
+    return table
+
+def build_sketch_table(cellules, valeurs, capacite=CAPACITE_SKETCH):
+    """Sketches par cellule (DataFrame des clés) d'un vecteur de valeurs"""
+    return _sketch_frame(cellules, valeurs, np.zeros(len(valeurs), dtype=np.int64), capacite)
+
+def merge_sketch_tables(table, table_ajout, cles, capacite=CAPACITE_SKETCH):
+    """Fusionne deux tables de sketches (concaténation puis compaction par cellule)"""
+    fusion = pd.concat([table, table_ajout], ignore_index=True)
+    return _sketch_frame(fusion[cles], fusion['valeur'].to_numpy(), fusion['niveau'].to_numpy(), capacite)
+
+def build_line_sketches(df):
+    """Sketches des mesures de ligne par cellule du cube et taille de transaction"""
+    return {
+        colonne: build_sketch_table(df[CELLULE_SKETCH], df[colonne].to_numpy(dtype=np.float64))
+        for colonne in MESURES_SKETCH.values()
+    }
+
+def merge_line_sketches(sketches, sketches_ajout):
+    """Fusionne les sketches de ligne avec ceux des lignes ajoutées"""
+    return {
+        colonne: merge_sketch_tables(table, sketches_ajout[colonne], CELLULE_SKETCH)
+        for colonne, table in sketches.items()
+    }
+
+register_aggregate('sketches', build_line_sketches, merge_line_sketches)
+
+def weighted_quantiles(valeurs, poids, probabilites):
+    """Quantiles d'un échantillon pondéré (premier élément de poids cumulé >= p)"""
+    ordre = np.argsort(valeurs, kind='stable')
+    cumuls = np.cumsum(poids[ordre])
+    positions = np.searchsorted(cumuls, np.asarray(probabilites) * cumuls[-1], side='left')
+    return valeurs[ordre][np.minimum(positions, len(valeurs) - 1)]
+
+def rank_error_bound(niveaux, capacite=CAPACITE_SKETCH):
+    """Borne de l'erreur relative de rang d'une union de sketches"""
+    return float(niveaux.max()) / capacite if len(niveaux) else 0.0
+
+def _select_cells(table, filters):
+    """Éléments des cellules correspondant aux filtres de session"""
+    masque = table['Année'].isin(filters['years']) & table['Pays'].isin(filters['countries'])
+    if 'Gamme_de_Produits' in table:
+        masque &= table['Gamme_de_Produits'].isin(filters['productlines'])
+    return table[masque]
+
+def _summarize(valeurs, poids, niveaux, groupes=None):
+    """Quantiles, effectif et histogramme d'un échantillon pondéré (par groupe le cas échéant)"""
+    colonnes = [f"P{round(p * 100)}" for p in PROBABILITES]
+    lignes = {'Ensemble': np.append(weighted_quantiles(valeurs, poids, PROBABILITES), poids.sum())}
+    if groupes is not None:
+        for nom in pd.unique(groupes):
+            masque = groupes == nom
+            lignes[nom] = np.append(weighted_quantiles(valeurs[masque], poids[masque], PROBABILITES), poids[masque].sum())
+    quantiles = pd.DataFrame.from_dict(lignes, orient='index', columns=colonnes + ['Effectif'])
+    quantiles['Effectif'] = quantiles['Effectif'].astype(np.int64)
+
+    bornes = np.linspace(valeurs.min(), valeurs.max(), NB_CLASSES_HISTOGRAMME + 1)
+    histogramme = pd.DataFrame({'Borne_Basse': bornes[:-1], 'Borne_Haute': bornes[1:]})
+    if groupes is None:
+        histogramme['Effectif'] = np.histogram(valeurs, bornes, weights=poids)[0]
+    else:
+        for nom in pd.unique(groupes):
+            masque = groupes == nom
+            histogramme[nom] = np.histogram(valeurs[masque], bornes, weights=poids[masque])[0]
+    return {'quantiles': quantiles, 'histogramme': histogramme, 'erreur_rang': rank_error_bound(niveaux)}
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_order_sketches(version):
+    """Sketches des montants de commande par année, mois et pays (toutes gammes)"""
+    table = get_aggregate('orders')
+    commandes = table['commandes']
+    cellules = commandes[['Année', 'Pays']].assign(Mois=commandes['Date_Commande'].dt.month)
+    return build_sketch_table(cellules[CELLULE_SKETCH_COMMANDE], table['ca'].sum(axis=1).to_numpy(dtype=np.float64))
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_distribution(version, years, countries, productlines, mesure):
+    """Distribution d'une mesure pour une sélection, mise en cache par version des données"""
+    filters = {'years': list(years), 'countries': list(countries), 'productlines': list(productlines)}
+    if mesure == MESURE_COMMANDE:
+        gammes = get_aggregate('orders')['ca'].columns
+        if set(gammes) <= set(productlines):
+            elements = _select_cells(_cached_order_sketches(version), filters)
+        else:
+            # Sélection partielle des gammes : montants restreints lus dans la table des commandes
+            montants = slice_orders(get_aggregate('orders'), filters)["Chiffre d'Affaires"]
+            elements = pd.DataFrame({'valeur': montants.to_numpy(dtype=np.float64), 'niveau': 0})
+        groupes = None
+    else:
+        elements = _select_cells(get_aggregate('sketches')[MESURES_SKETCH[mesure]], filters)
+        groupes = elements['Taille de Transaction'].to_numpy()
+    if elements.empty:
+        return None
+    niveaux = elements['niveau'].to_numpy(dtype=np.int64)
+    return _summarize(elements['valeur'].to_numpy(), np.ldexp(1.0, niveaux), niveaux, groupes)
+
+def get_distribution(filters, mesure):
+    """
+    Quantiles (P10, P50, P90, P99), effectif et histogramme d'une mesure pour
+    les filtres de session, par taille de transaction pour les mesures de ligne,
+    avec la borne d'erreur relative de rang des sketches.
+    """
+    return _cached_distribution(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        mesure
+    )
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# SCORING ET SEGMENTATION RFM (RÉCENCE, FRÉQUENCE, MONTANT)
+# ==============================================================================
+# Chaque client reçoit un score de 1 à 5 par dimension selon son quantile
+# parmi les clients de la sélection (5 = meilleur). Le segment est lu dans
+# une grille Récence x Fréquence : tous les clients sont scorés en une passe.
+
+RFM_QUANTILES = 5
+
+# Grille des segments : ligne = score R (1 à 5), colonne = score F (1 à 5)
+SEGMENTS_RF = np.array([
+    ['Perdus', 'En hibernation', 'À risque', 'À ne pas perdre', 'À ne pas perdre'],
+    ['En hibernation', 'En hibernation', 'À risque', 'À risque', 'À ne pas perdre'],
+    ['À réveiller', 'À réveiller', "Besoin d'attention", 'Fidèles', 'Fidèles'],
+    ['Prometteurs', 'Fidèles potentiels', 'Fidèles potentiels', 'Fidèles', 'Champions'],
+    ['Nouveaux', 'Prometteurs', 'Fidèles potentiels', 'Champions', 'Champions'],
+])
+
+# Ordre d'affichage des segments, du plus au moins engagé
+ORDRE_SEGMENTS = [
+    'Champions', 'Fidèles', 'Fidèles potentiels', 'Nouveaux', 'Prometteurs',
+    "Besoin d'attention", 'À réveiller', 'À risque', 'À ne pas perdre',
+    'En hibernation', 'Perdus'
+]
+
+def quantile_scores(valeurs, croissant=True):
+    """Score 1..5 selon le rang centile (ex aequo au rang moyen)"""
+    rangs = pd.Series(valeurs).rank(method='average', pct=True).to_numpy()
+    scores = np.ceil(rangs * RFM_QUANTILES).clip(1, RFM_QUANTILES).astype(np.int64)
+    return scores if croissant else RFM_QUANTILES + 1 - scores
+
+def score_rfm(features):
+    """Ajoute les scores R, F, M, le code RFM et le segment à la table clients"""
+    scores = features.copy()
+    scores['Score_R'] = quantile_scores(scores['Recence_Jours'].to_numpy(), croissant=False)
+    scores['Score_F'] = quantile_scores(scores['Nb_Commandes'].to_numpy())
+    scores['Score_M'] = quantile_scores(scores["Chiffre d'Affaires"].to_numpy())
+    scores['Code_RFM'] = (
+        scores['Score_R'].astype(str) + scores['Score_F'].astype(str) + scores['Score_M'].astype(str)
+    )
+    scores['Score_RFM'] = scores['Score_R'] + scores['Score_F'] + scores['Score_M']
+    scores['Segment'] = SEGMENTS_RF[scores['Score_R'].to_numpy() - 1, scores['Score_F'].to_numpy() - 1]
+    return scores
+
+def summarize_segments(scores):
+    """Synthèse par segment : clients, CA, part du CA et profil RFM moyen"""
+    synthese = scores.groupby('Segment').agg(
+        Nb_Clients=('Segment', 'size'),
+        CA_Total=("Chiffre d'Affaires", 'sum'),
+        Recence_Moyenne=('Recence_Jours', 'mean'),
+        Frequence_Moyenne=('Nb_Commandes', 'mean'),
+        Montant_Moyen=("Chiffre d'Affaires", 'mean')
+    )
+    synthese['Part_CA'] = synthese['CA_Total'] / synthese['CA_Total'].sum() * 100
+    ordre = [s for s in ORDRE_SEGMENTS if s in synthese.index]
+    return synthese.loc[ordre]
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate
+from utils.cube import monthly_series
+
+# ==============================================================================
+# MÉTRIQUES GLISSANTES ET COMPARAISONS N-1 SUR SÉRIES MENSUELLES
+# ==============================================================================
+# Les séries mensuelles (total, gammes, pays) sont lues dans le cube sous forme
+# de matrice séries x mois. Une seule somme cumulée par ligne suffit pour tous
+# les cumuls glissants : cumul(t, w) = C[t + 1] - C[t + 1 - w]. Toutes les
+# fenêtres et toutes les séries sont donc obtenues sans relire les mois.
+
+FENETRES_GLISSANTES = [3, 6, 12]
+DECALAGE_ANNEE = 12
+
+def rolling_sums(Y, fenetres):
+    """
+    Cumuls glissants de chaque ligne de Y pour chaque fenêtre (en mois).
+    Les positions sans historique complet valent NaN.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    S, T = Y.shape
+    cumul = np.zeros((S, T + 1))
+    np.cumsum(Y, axis=1, out=cumul[:, 1:])
+    resultats = {}
+    for w in fenetres:
+        sommes = np.full((S, T), np.nan)
+        if w <= T:
+            sommes[:, w - 1:] = cumul[:, w:] - cumul[:, :T + 1 - w]
+        resultats[w] = sommes
+    return resultats
+
+def rolling_means(Y, fenetres):
+    """Moyennes mobiles de chaque ligne de Y, déduites des cumuls glissants"""
+    return {w: sommes / w for w, sommes in rolling_sums(Y, fenetres).items()}
+
+def lag(Y, decalage=DECALAGE_ANNEE):
+    """Valeur de la même ligne `decalage` mois plus tôt (NaN avant le début)"""
+    Y = np.asarray(Y, dtype=np.float64)
+    decale = np.full(Y.shape, np.nan)
+    if decalage < Y.shape[1]:
+        decale[:, decalage:] = Y[:, :Y.shape[1] - decalage]
+    return decale
+
+def variation(actuel, reference):
+    """Variation relative en %, NaN si la référence est absente ou nulle"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(reference > 0, (actuel - reference) / reference * 100, np.nan)
+
+def rolling_metrics(series, fenetres=FENETRES_GLISSANTES):
+    """
+    Métriques glissantes d'une matrice de séries mensuelles : valeur du mois,
+    cumuls et moyennes mobiles par fenêtre, mêmes quantités un an plus tôt
+    et variations N-1 alignées sur la période.
+    """
+    Y = series.to_numpy(dtype=np.float64)
+    cumuls = rolling_sums(Y, fenetres)
+
+    def cadre(valeurs):
+        return pd.DataFrame(valeurs, index=series.index, columns=series.columns)
+
+    mensuel_n1 = lag(Y)
+    resultat = {
+        'mensuel': series,
+        'mensuel_n1': cadre(mensuel_n1),
+        'variation_mensuelle_n1': cadre(variation(Y, mensuel_n1)),
+        'cumuls': {},
+        'moyennes': {},
+        'cumuls_n1': {},
+        'variations_n1': {}
+    }
+    for w, sommes in cumuls.items():
+        sommes_n1 = lag(sommes)
+        resultat['cumuls'][w] = cadre(sommes)
+        resultat['moyennes'][w] = cadre(sommes / w)
+        resultat['cumuls_n1'][w] = cadre(sommes_n1)
+        resultat['variations_n1'][w] = cadre(variation(sommes, sommes_n1))
+    return resultat
+
+def _restrict(valeur, colonnes):
+    """Restreint une matrice (ou un dictionnaire de matrices) aux mois donnés"""
+    if isinstance(valeur, dict):
+        return {cle: matrice.loc[:, colonnes] for cle, matrice in valeur.items()}
+    return valeur.loc[:, colonnes]
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_rolling_metrics(version, years, countries, productlines, mesure, fenetres):
+    """Métriques glissantes mises en cache par version des données et sélection"""
+    cube = get_aggregate('cube')
+    # Les fenêtres et comparaisons N-1 s'appuient sur tout l'historique, puis
+    # seuls les mois des années sélectionnées sont restitués
+    annees = sorted(cube.index.get_level_values('Année').unique())
+    filters = {'years': annees, 'countries': list(countries), 'productlines': list(productlines)}
+    series = monthly_series(cube, filters, mesure)
+    series = series[series.abs().sum(axis=1) > 0]
+    if series.empty:
+        return None
+    colonnes = series.columns[series.columns.year.isin(years)]
+    return {nom: _restrict(valeur, colonnes) for nom, valeur in rolling_metrics(series, fenetres).items()}
+
+def get_rolling_metrics(filters, mesure="Chiffre d'Affaires", fenetres=FENETRES_GLISSANTES):
+    """Cumuls glissants, moyennes mobiles et variations N-1 des séries de la sélection"""
+    return _cached_rolling_metrics(
+        get_data_version(),
+        tuple(filters['years']),
+        tuple(filters['countries']),
+        tuple(filters['productlines']),
+        mesure,
+        tuple(fenetres)
+    )
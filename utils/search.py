@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import CACHE_TTL
+from utils.data_loader import get_data_version
+from utils.ingestion import get_aggregate, register_aggregate
+
+# ==============================================================================
+# RECHERCHE PAR INDEX INVERSÉ (CLIENTS, VILLES, PRODUITS, ADRESSES)
+# ==============================================================================
+# Chaque entité recherchable (client, ville, code postal, adresse, produit,
+# pays) est découpée en tokens normalisés (minuscules, sans accents). Le
+# vocabulaire est trié : tous les tokens commençant par un préfixe forment une
+# plage contiguë, trouvée par deux recherches dichotomiques. Les listes
+# d'entités (postings) sont rangées dans l'ordre du vocabulaire au format CSR :
+# la plage de tokens d'un préfixe correspond à une seule tranche du tableau
+# des postings. Une requête de plusieurs mots intersecte les entités de
+# chaque préfixe. La barre latérale liste les entités classées par type puis
+# popularité dans une liste de sélection filtrée pendant la frappe.
+
+TYPES_ENTITES = ['Client', 'Pays', 'Ville', 'Code postal', 'Adresse', 'Produit']
+CLES_ENTITE = ['Type', 'Libelle', 'Detail', 'Pays', 'Client', 'Gamme']
+NB_RESULTATS = 8
+FIN_PREFIXE = '{'  # caractère suivant 'z' : borne haute des tokens d'un préfixe
+
+def _entities(df, type_entite, colonne, detail=None, avec_pays=True, avec_client=False, avec_gamme=False):
+    """Entités d'un type (valeurs distinctes d'une colonne) et leur nombre de lignes"""
+    vide = pd.Series('', index=df.index)
+    entites = pd.DataFrame({
+        'Type': type_entite,
+        'Libelle': df[colonne].astype(str),
+        'Detail': df[detail].astype(str) if detail else vide,
+        'Pays': df['Pays'] if avec_pays else vide,
+        'Client': df['Nom_du_Client'] if avec_client else vide,
+        'Gamme': df['Gamme_de_Produits'] if avec_gamme else vide
+    })[df[colonne].notna()]
+    return entites.groupby(CLES_ENTITE, sort=False).size().rename('Nb_Lignes').reset_index()
+
+def build_search_entities(df):
+    """Table des entités recherchables avec leur nombre de lignes (popularité)"""
+    return pd.concat([
+        _entities(df, 'Client', 'Nom_du_Client', detail='Ville', avec_client=True),
+        _entities(df, 'Pays', 'Pays'),
+        _entities(df, 'Ville', 'Ville'),
+        _entities(df, 'Code postal', 'Code_Postal', detail='Ville'),
+        _entities(df, 'Adresse', 'Adresse_Ligne_1', detail='Ville', avec_client=True),
+        _entities(df, 'Produit', 'Code_Produit', detail='Gamme_de_Produits', avec_pays=False, avec_gamme=True)
+    ], ignore_index=True)
+
+def merge_search_entities(entites, entites_ajout):
+    """Fusionne les entités avec celles des lignes ajoutées (nombres de lignes sommés)"""
+    fusion = pd.concat([entites, entites_ajout], ignore_index=True)
+    return fusion.groupby(CLES_ENTITE, sort=False)['Nb_Lignes'].sum().reset_index()
+
+register_aggregate('entites_recherche', build_search_entities, merge_search_entities)
+
+def normalize(textes):
+    """Textes en minuscules, sans accents ni ponctuation (Series)"""
+    return (
+        pd.Series(textes, dtype=object).astype(str)
+        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+        .str.lower().str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+    )
+
+def build_inverted_index(entites):
+    """Vocabulaire trié des tokens et postings (entités) au format CSR"""
+    libelles = normalize(entites['Libelle'])
+    tokens = libelles.str.split().explode().dropna()
+    tokens = tokens[tokens != '']
+    codes, vocabulaire = pd.factorize(tokens.to_numpy(), sort=True)
+    entite = tokens.index.to_numpy(dtype=np.int64)
+    # Paires (token, entité) distinctes, triées par token puis entité
+    paires = pd.unique(codes.astype(np.int64) * len(entites) + entite)
+    paires.sort()
+    tokens_paires, postings = np.divmod(paires, len(entites))
+    indptr = np.zeros(len(vocabulaire) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tokens_paires, minlength=len(vocabulaire)), out=indptr[1:])
+    return {
+        'vocabulaire': np.asarray(vocabulaire, dtype=str),
+        'indptr': indptr,
+        'postings': postings,
+        'libelles': libelles.to_numpy(dtype=str),
+        'rang_type': pd.Categorical(entites['Type'], categories=TYPES_ENTITES).codes,
+        'popularite': entites['Nb_Lignes'].to_numpy(dtype=np.int64)
+    }
+
+def prefix_postings(index, prefixe):
+    """Entités ayant au moins un token commençant par `prefixe`"""
+    vocabulaire = index['vocabulaire']
+    debut = np.searchsorted(vocabulaire, prefixe, side='left')
+    fin = np.searchsorted(vocabulaire, prefixe + FIN_PREFIXE, side='left')
+    return pd.unique(index['postings'][index['indptr'][debut]:index['indptr'][fin]])
+
+def search(index, requete, limite=NB_RESULTATS):
+    """
+    Positions des entités correspondant à tous les mots de la requête (préfixes),
+    classées : libellé commençant par la requête, type d'entité, popularité.
+    """
+    requete = normalize([requete]).iloc[0]
+    termes = requete.split()
+    if not termes:
+        return np.array([], dtype=np.int64)
+    # Termes du plus long (le plus sélectif) au plus court
+    termes.sort(key=len, reverse=True)
+    resultats = prefix_postings(index, termes[0])
+    for terme in termes[1:]:
+        if not len(resultats):
+            break
+        resultats = np.intersect1d(resultats, prefix_postings(index, terme), assume_unique=True)
+    if not len(resultats):
+        return resultats
+    debut_exact = np.char.startswith(index['libelles'][resultats], requete)
+    ordre = np.lexsort((-index['popularite'][resultats], index['rang_type'][resultats], ~debut_exact))
+    return resultats[ordre[:limite]]
+
+@st.cache_data(ttl=CACHE_TTL)
+def _cached_search_index(version):
+    """Index inversé des entités, construit une fois par version des données"""
+    entites = get_aggregate('entites_recherche')
+    index = build_inverted_index(entites)
+    ordre = np.lexsort((-index['popularite'], index['rang_type']))
+    return {'entites': entites, 'index': index, 'options': entites.iloc[ordre].reset_index(drop=True)}
+
+def search_entities(requete, limite=NB_RESULTATS):
+    """Entités (type, libellé, détail, pays, client, gamme) correspondant à la requête"""
+    recherche = _cached_search_index(get_data_version())
+    positions = search(recherche['index'], requete, limite)
+    return recherche['entites'].iloc[positions].reset_index(drop=True)
+
+def search_options():
+    """Toutes les entités recherchables, classées par type puis popularité"""
+    return _cached_search_index(get_data_version())['options']
@@ -10,6 +10,8 @@ def initialize_session_state(df):
         'data_loaded': True,
         'df_original': df,
         'pending_action': None,
+        'search_target': None,
+        'search_message': None,
         # AJOUT DES FILTRES INDICATEURS
         'indicator_years': sorted(df['Année'].unique()),
         'indicator_countries': sorted(df['Pays'].unique()),
@@ -40,10 +42,34 @@ def handle_pending_actions(df):
             st.session_state.selected_productlines = sorted(df['Gamme_de_Produits'].unique())
             st.session_state.filters_applied = True
         
+        elif action == "search_jump":
+            _apply_search_target(st.session_state.search_target)
+            st.session_state.filters_applied = True
+        
         # Réinitialiser l'action
         st.session_state.pending_action = None
         st.rerun()
 
+def _apply_search_target(cible):
+    """
+    Applique le résultat de recherche choisi : fiche client ou filtre pays /
+    gamme. Seuls les filtres selected_* sont écrits ; l'état des widgets est
+    effacé pour qu'ils soient recréés avec ces filtres comme valeur par défaut.
+    """
+    if cible['Client']:
+        st.session_state.client_360 = cible['Client']
+        st.session_state.search_message = f"Fiche de {cible['Client']} ouverte dans l'onglet Segmentation Clientèle"
+    elif cible['Type'] == 'Produit':
+        st.session_state.selected_productlines = [cible['Gamme']]
+        st.session_state.pop('productlines_multiselect', None)
+        st.session_state.search_message = f"Filtre gamme : {cible['Gamme']} (produit {cible['Libelle']})"
+    else:
+        st.session_state.selected_countries = [cible['Pays']]
+        # La recherche de pays restreint les options : elle doit contenir la cible
+        for cle in ('countries_multiselect', 'country_search'):
+            st.session_state.pop(cle, None)
+        st.session_state.search_message = f"Filtre pays : {cible['Pays']}"
+
 def get_session_filters():
     """Retourne les filtres actuels de la session"""
     return {
@@ -0,0 +1,253 @@
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import QUERY_BACKEND, SQL_DATABASE_PATH
+from utils.ingestion import get_dataset_state, refresh_dataset, register_row_store
+
+try:
+    import duckdb
+except ImportError:  # DuckDB est optionnel : SQLite (bibliothèque standard) sinon
+    duckdb = None
+
+# ==============================================================================
+# MOTEUR SQL EMBARQUÉ (DUCKDB / SQLITE SUR FICHIER)
+# ==============================================================================
+# Les filtres de la barre latérale et les agrégats par groupe sont traduits en
+# SQL et exécutés par la base : seules les lignes (ou groupes) résultants sont
+# matérialisés en pandas. La table est le stockage des lignes de l'ingestion :
+# la source est lue par morceaux écrits directement dans la table, puis chaque
+# ajout y est inséré ; aucun dataset pandas complet n'est chargé. La table est
+# associée à l'empreinte du contenu de la source : une base créée par un autre
+# processus est reprise telle quelle si la source n'a pas changé depuis.
+
+TABLE_VENTES = "ventes"
+COLONNE_POSITION = "_position"  # position de la ligne dans l'ordre de lecture
+COLONNE_EFFECTIF = "_n_lignes"  # effectif par groupe, contrôle des agrégats délégués
+
+COLONNES_FILTRES = {
+    'years': 'Année',
+    'countries': 'Pays',
+    'productlines': 'Gamme_de_Produits'
+}
+
+# Fonctions d'agrégation pandas -> SQL
+AGREGATS_SQL = {
+    'sum': 'SUM({col})',
+    'mean': 'AVG({col})',
+    'min': 'MIN({col})',
+    'max': 'MAX({col})',
+    'count': 'COUNT({col})',
+    'size': 'COUNT(*)',
+    'nunique': 'COUNT(DISTINCT {col})'
+}
+# 'first' n'a pas d'équivalent SQL : il n'est délégué (MIN) que pour les
+# colonnes constantes pour une clé de regroupement (attributs d'un produit)
+ATTRIBUTS_CONSTANTS = {
+    'Code_Produit': ('Gamme_de_Produits', 'Prix Conseil')
+}
+
+def _quote(colonne):
+    """Protège un nom de colonne (accents, espaces, apostrophes)"""
+    return '"' + colonne.replace('"', '""') + '"'
+
+@st.cache_resource
+def _get_connection(chemin=SQL_DATABASE_PATH):
+    """Connexion partagée à la base embarquée"""
+    if duckdb is not None:
+        connexion = duckdb.connect(chemin)
+    else:
+        connexion = sqlite3.connect(chemin, check_same_thread=False)
+    return {'connexion': connexion, 'lock': threading.Lock(), 'table': False}
+
+def _execute(connexion, requete, parametres=()):
+    """Exécute une requête et retourne un dataframe"""
+    if duckdb is not None:
+        return connexion.execute(requete, list(parametres)).df()
+    return pd.read_sql_query(requete, connexion, params=list(parametres))
+
+def _insert(connexion, df, creer):
+    """Insère (ou crée avec) un bloc de lignes dans la table des ventes"""
+    if duckdb is not None:
+        connexion.register('bloc', df)
+        if creer:
+            connexion.execute(f"CREATE OR REPLACE TABLE {TABLE_VENTES} AS SELECT * FROM bloc")
+        else:
+            connexion.execute(f"INSERT INTO {TABLE_VENTES} SELECT * FROM bloc")
+        connexion.unregister('bloc')
+    else:
+        df.to_sql(TABLE_VENTES, connexion, if_exists='replace' if creer else 'append', index=False)
+        if creer:
+            colonnes = ', '.join(_quote(c) for c in COLONNES_FILTRES.values())
+            connexion.execute(f"CREATE INDEX idx_filtres ON {TABLE_VENTES} ({colonnes})")
+        connexion.commit()
+
+def _read_meta(connexion):
+    """Lit l'empreinte de la source et le nombre de lignes de la table"""
+    try:
+        meta = _execute(connexion, "SELECT source, empreinte, n_rows FROM _meta")
+    except Exception:
+        return None
+    return meta.iloc[0].to_dict() if not meta.empty else None
+
+def _write_meta(connexion, source, empreinte, n_rows):
+    """Enregistre l'état de la table"""
+    connexion.execute("DROP TABLE IF EXISTS _meta")
+    connexion.execute("CREATE TABLE _meta (source TEXT, empreinte TEXT, n_rows INTEGER)")
+    connexion.execute("INSERT INTO _meta VALUES (?, ?, ?)", [source, empreinte, n_rows])
+    if duckdb is None:
+        connexion.commit()
+
+def _open_table(source, empreinte):
+    """
+    Prépare la table pour un chargement complet : reprise si elle contient
+    déjà ce contenu de la source (True), sinon supprimée (False).
+    """
+    ressource = _get_connection()
+    with ressource['lock']:
+        connexion = ressource['connexion']
+        meta = _read_meta(connexion)
+        ressource['table'] = meta is not None and meta['source'] == source and meta['empreinte'] == empreinte
+        if not ressource['table']:
+            connexion.execute(f"DROP TABLE IF EXISTS {TABLE_VENTES}")
+            connexion.execute("DROP TABLE IF EXISTS _meta")
+            if duckdb is None:
+                connexion.commit()
+        return ressource['table']
+
+def _insert_rows(bloc):
+    """
+    Écrit un bloc de lignes (index = positions) dans la table. L'état
+    enregistré est effacé d'abord : une écriture interrompue n'est pas reprise.
+    """
+    ressource = _get_connection()
+    with ressource['lock']:
+        connexion = ressource['connexion']
+        connexion.execute("DROP TABLE IF EXISTS _meta")
+        _insert(connexion, bloc.assign(**{COLONNE_POSITION: bloc.index.to_numpy()}), creer=not ressource['table'])
+        ressource['table'] = True
+
+def _validate_table(source, empreinte, n_rows):
+    """Enregistre le contenu de la source que la table reflète"""
+    ressource = _get_connection()
+    with ressource['lock']:
+        _write_meta(ressource['connexion'], source, empreinte, n_rows)
+
+def _as_rows(df):
+    """Lignes lues dans la table : dates typées, index = positions dans le dataset"""
+    df['Date_Commande'] = pd.to_datetime(df['Date_Commande'])
+    positions = df.pop(COLONNE_POSITION).to_numpy(dtype='int64')
+    df.index = positions
+    return df, positions
+
+def _read_rows(positions):
+    """Lignes de la table aux positions données, dans cet ordre (index = positions)"""
+    positions = np.asarray(positions, dtype=np.int64)
+    ressource = _get_connection()
+    position = _quote(COLONNE_POSITION)
+    with ressource['lock']:
+        connexion = ressource['connexion']
+        if len(positions) == 0 or np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+            # Plage contiguë (relecture par blocs) : simple filtre sur la position
+            bornes = (int(positions[0]), int(positions[-1])) if len(positions) else (0, -1)
+            df = _execute(
+                connexion,
+                f"SELECT * FROM {TABLE_VENTES} WHERE {position} BETWEEN ? AND ? ORDER BY {position}",
+                bornes
+            )
+        else:
+            # Positions quelconques (lignes d'un client) : jointure sur une table temporaire
+            selection = pd.DataFrame({'p': np.unique(positions)})
+            if duckdb is not None:
+                connexion.register('selection', selection)
+                df = _execute(connexion, f"SELECT v.* FROM {TABLE_VENTES} v JOIN selection s ON v.{position} = s.p")
+                connexion.unregister('selection')
+            else:
+                selection.to_sql('selection', connexion, if_exists='replace', index=False)
+                df = _execute(connexion, f"SELECT v.* FROM {TABLE_VENTES} v JOIN selection s ON v.{position} = s.p")
+                connexion.execute("DROP TABLE selection")
+    df, _ = _as_rows(df)
+    return df.loc[positions]
+
+def _loaded_connection():
+    """Connexion à la base, le dataset étant chargé (la table est alimentée par l'ingestion)"""
+    if get_dataset_state()['source'] is None and refresh_dataset() is None:
+        raise FileNotFoundError("Aucune source de données : table des ventes indisponible")
+    return _get_connection()
+
+def _where(filters):
+    """Clause WHERE paramétrée correspondant aux filtres de session"""
+    conditions, parametres = [], []
+    for cle, colonne in COLONNES_FILTRES.items():
+        valeurs = [v.item() if hasattr(v, 'item') else v for v in filters[cle]]
+        if not valeurs:
+            return "WHERE 1 = 0", []
+        conditions.append(f"{_quote(colonne)} IN ({', '.join('?' * len(valeurs))})")
+        parametres.extend(valeurs)
+    return "WHERE " + " AND ".join(conditions), parametres
+
+def query_filtered(filters):
+    """
+    Lignes correspondant aux filtres, filtrées par la base, et leurs
+    positions dans le dataset (aussi utilisées comme index)
+    """
+    ressource = _loaded_connection()
+    where, parametres = _where(filters)
+    with ressource['lock']:
+        df = _execute(
+            ressource['connexion'],
+            f"SELECT * FROM {TABLE_VENTES} {where} ORDER BY {_quote(COLONNE_POSITION)}",
+            parametres
+        )
+    # Index = positions dans le dataset, comme les lignes filtrées par pandas
+    return _as_rows(df)
+
+def _sql_function(by, colonne, fonction):
+    """Expression SQL d'une agrégation pandas, None si elle n'a pas d'équivalent exact"""
+    if fonction == 'first':
+        constante = any(colonne in ATTRIBUTS_CONSTANTS.get(cle, ()) for cle in by)
+        return 'MIN({col})' if constante else None
+    return AGREGATS_SQL.get(fonction) if isinstance(fonction, str) else None
+
+def supports_aggregates(by, aggs):
+    """Indique si toutes les fonctions d'agrégation ont un équivalent SQL exact pour ces groupes"""
+    by = [by] if isinstance(by, str) else list(by)
+    return all(_sql_function(by, colonne, fonction) is not None for colonne, fonction in aggs.items())
+
+def query_frame_aggregate(df, by, aggs):
+    """
+    Agrégat par groupe des lignes de `df` calculé par la base : les filtres
+    sont les valeurs d'Année, Pays et Gamme présentes dans `df`, et le
+    résultat n'est retenu que si la base compte autant de lignes que `df`
+    (sinon `df` n'est pas la tranche complète de ces filtres : None).
+    """
+    filters = {cle: pd.unique(df[colonne]) for cle, colonne in COLONNES_FILTRES.items()}
+    resultat = query_aggregate(by, {**aggs, COLONNE_EFFECTIF: 'size'}, filters)
+    if resultat.pop(COLONNE_EFFECTIF).sum() != len(df):
+        return None
+    return resultat
+
+def query_aggregate(by, aggs, filters):
+    """Agrégat par groupe calculé par la base (équivalent de groupby(by).agg(aggs))"""
+    by = [by] if isinstance(by, str) else list(by)
+    if not supports_aggregates(by, aggs):
+        raise ValueError(f"Agrégation sans équivalent SQL exact : {aggs}")
+    ressource = _loaded_connection()
+    where, parametres = _where(filters)
+    cles = ', '.join(_quote(c) for c in by)
+    mesures = ', '.join(
+        f"{_sql_function(by, colonne, fonction).format(col=_quote(colonne))} AS {_quote(colonne)}"
+        for colonne, fonction in aggs.items()
+    )
+    with ressource['lock']:
+        resultat = _execute(
+            ressource['connexion'],
+            f"SELECT {cles}, {mesures} FROM {TABLE_VENTES} {where} GROUP BY {cles} ORDER BY {cles}",
+            parametres
+        )
+    return resultat.set_index(by if len(by) > 1 else by[0])
+
+# Moteur SQL : la table remplace le dataset en mémoire de l'ingestion
+if QUERY_BACKEND == 'sql':
+    register_row_store(_open_table, _insert_rows, _validate_table, _read_rows)